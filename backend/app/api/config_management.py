@@ -1,164 +1,172 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Dict, Optional, Tuple
+import asyncio
 import json
-import yaml
+import os
+import uuid
 from pathlib import Path
 from app.core.config import settings
-
-# 尝试导入pandas，如果失败则使用替代方案
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    print("Warning: pandas not available, using alternative CSV parsing")
+from app.services.config_store import ConfigDocument, PreconditionFailed, etag_matches, get_config_store
+from app.services.keyword_matcher import ContradictionMatcher, ContradictionRuleError
+from app.services.knowledge_catalog import get_knowledge_catalog
+from app.services.knowledge_upload import CSVValidationError, StreamingCSVValidator
+from app.services.response_scorer import LexiconError, ResponseScorer
+from app.services.risk_engine import reload_shared_risk_engine, update_shared_knowledge_table
+from app.services.rule_compiler import CompiledRuleSet, RuleSyntaxError
 
 router = APIRouter()
 
+# 上传文件每次读取的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # 响应模型
 class ConfigResponse(BaseModel):
     success: bool
     data: dict
     message: str
 
-def _simple_csv_parse(file_path: Path) -> Dict:
-    """简单的CSV解析替代方案"""
+# 各配置在响应中的字段名和提示文案
+CONFIG_VIEWS = {
+    "risk-rules": ("rules", "风险规则"),
+    "weight-config": ("config", "权重配置"),
+    "contradiction-rules": ("rules", "矛盾规则"),
+}
+# 写入前用引擎相同的编译逻辑校验，避免把无法编译的配置落盘
+CONFIG_VALIDATORS = {
+    "risk-rules": CompiledRuleSet,
+    "weight-config": lambda config: ResponseScorer(config.get("response_lexicons")),
+    "contradiction-rules": ContradictionMatcher,
+}
+# 校验失败时抛出的异常
+CONFIG_ERRORS = (RuleSyntaxError, ContradictionRuleError, LexiconError)
+# 长轮询最长等待时间（秒）
+MAX_CHANGES_TIMEOUT = 60.0
+
+# 按配置版本缓存已序列化的GET响应体
+_rendered_configs: Dict[str, Tuple[int, bytes]] = {}
+
+
+def _config_headers(document: ConfigDocument) -> Dict[str, str]:
+    headers = {"X-Config-Version": str(document.version)}
+    if document.etag:
+        headers["ETag"] = document.etag
+    return headers
+
+
+def _render_config(document: ConfigDocument) -> bytes:
+    cached = _rendered_configs.get(document.name)
+    if cached is not None and cached[0] == document.version:
+        return cached[1]
+    key, label = CONFIG_VIEWS[document.name]
+    if document.data is None:
+        body = ConfigResponse(success=False, data={}, message=f"{label}文件不存在")
+    else:
+        body = ConfigResponse(success=True, data={key: document.data}, message=f"获取{label}成功")
+    content = body.model_dump_json().encode("utf-8")
+    _rendered_configs[document.name] = (document.version, content)
+    return content
+
+
+def _get_config(name: str, if_none_match: Optional[str]) -> Response:
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            if len(lines) < 2:
-                return {"filename": file_path.name, "rows": 0, "columns": [], "preview": []}
-            
-            headers = lines[0].strip().split(',')
-            data = []
-            
-            for line in lines[1:4]:  # 只取前3行作为预览
-                values = line.strip().split(',')
-                if len(values) == len(headers):
-                    row = {}
-                    for i, header in enumerate(headers):
-                        row[header] = values[i]
-                    data.append(row)
-            
-            return {
-                "filename": file_path.name,
-                "rows": len(lines) - 1,
-                "columns": headers,
-                "preview": data
-            }
+        document = get_config_store().get(name)
     except Exception as e:
-        print(f"简单CSV解析失败: {e}")
-        return {"filename": file_path.name, "rows": 0, "columns": [], "preview": []}
+        raise HTTPException(status_code=500, detail=f"获取{CONFIG_VIEWS[name][1]}失败: {str(e)}")
+    headers = _config_headers(document)
+    if etag_matches(if_none_match, document.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=_render_config(document), media_type="application/json", headers=headers)
 
-@router.get("/risk-rules", response_model=ConfigResponse)
-async def get_risk_rules():
-    """获取风险规则配置"""
+
+async def _update_config(name: str, data: Dict, if_match: Optional[str], response: Response) -> ConfigResponse:
+    key, label = CONFIG_VIEWS[name]
+    validator = CONFIG_VALIDATORS.get(name)
+    if validator is not None:
+        try:
+            validator(data)
+        except CONFIG_ERRORS as e:
+            raise HTTPException(status_code=400, detail=f"{label}格式错误: {str(e)}")
     try:
-        rules_file = Path(settings.config_dir) / "risk_rules.json"
-        if rules_file.exists():
-            with open(rules_file, 'r', encoding='utf-8') as f:
-                rules = json.load(f)
-            return ConfigResponse(
-                success=True,
-                data={"rules": rules},
-                message="获取风险规则成功"
-            )
-        else:
-            return ConfigResponse(
-                success=False,
-                data={},
-                message="风险规则文件不存在"
-            )
+        document = await get_config_store().update(name, data, if_match)
+    except PreconditionFailed as e:
+        headers = {"ETag": e.current_etag} if e.current_etag else None
+        raise HTTPException(status_code=412, detail=f"{label}已被修改，请刷新后重试", headers=headers)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取风险规则失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"更新{label}失败: {str(e)}")
+    reload_shared_risk_engine()
+    response.headers.update(_config_headers(document))
+    return ConfigResponse(success=True, data={key: document.data}, message=f"更新{label}成功")
+
+
+@router.get("/risk-rules", response_model=ConfigResponse)
+async def get_risk_rules(if_none_match: Optional[str] = Header(None)):
+    """获取风险规则配置（支持ETag / If-None-Match）"""
+    return _get_config("risk-rules", if_none_match)
 
 @router.post("/risk-rules", response_model=ConfigResponse)
-async def update_risk_rules(rules: Dict):
-    """更新风险规则配置"""
-    try:
-        rules_file = Path(settings.config_dir) / "risk_rules.json"
-        rules_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(rules_file, 'w', encoding='utf-8') as f:
-            json.dump(rules, f, ensure_ascii=False, indent=2)
-        
-        return ConfigResponse(
-            success=True,
-            data={"rules": rules},
-            message="更新风险规则成功"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"更新风险规则失败: {str(e)}")
+async def update_risk_rules(rules: Dict, response: Response, if_match: Optional[str] = Header(None)):
+    """更新风险规则配置；带If-Match时仅在配置未被他人修改时写入，否则返回412"""
+    return await _update_config("risk-rules", rules, if_match, response)
 
 @router.get("/weight-config", response_model=ConfigResponse)
-async def get_weight_config():
-    """获取权重配置"""
-    try:
-        config_file = Path(settings.config_dir) / "weight_config.yaml"
-        if config_file.exists():
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            return ConfigResponse(
-                success=True,
-                data={"config": config},
-                message="获取权重配置成功"
-            )
-        else:
-            return ConfigResponse(
-                success=False,
-                data={},
-                message="权重配置文件不存在"
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取权重配置失败: {str(e)}")
+async def get_weight_config(if_none_match: Optional[str] = Header(None)):
+    """获取权重配置（支持ETag / If-None-Match）"""
+    return _get_config("weight-config", if_none_match)
 
 @router.post("/weight-config", response_model=ConfigResponse)
-async def update_weight_config(config: Dict):
-    """更新权重配置"""
-    try:
-        config_file = Path(settings.config_dir) / "weight_config.yaml"
-        config_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(config_file, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
-        
-        return ConfigResponse(
-            success=True,
-            data={"config": config},
-            message="更新权重配置成功"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"更新权重配置失败: {str(e)}")
+async def update_weight_config(config: Dict, response: Response, if_match: Optional[str] = Header(None)):
+    """更新权重配置；带If-Match时仅在配置未被他人修改时写入，否则返回412"""
+    return await _update_config("weight-config", config, if_match, response)
+
+@router.get("/contradiction-rules", response_model=ConfigResponse)
+async def get_contradiction_rules(if_none_match: Optional[str] = Header(None)):
+    """获取矛盾规则（互斥词组）配置（支持ETag / If-None-Match）"""
+    return _get_config("contradiction-rules", if_none_match)
+
+@router.post("/contradiction-rules", response_model=ConfigResponse)
+async def update_contradiction_rules(rules: Dict, response: Response, if_match: Optional[str] = Header(None)):
+    """更新矛盾规则配置；带If-Match时仅在配置未被他人修改时写入，否则返回412"""
+    return await _update_config("contradiction-rules", rules, if_match, response)
+
+@router.get("/config-changes")
+async def wait_config_changes(
+    since: int = Query(0, ge=0, description="上次看到的配置版本号"),
+    timeout: float = Query(30.0, ge=0, description="最长等待秒数")
+):
+    """长轮询配置变化：有版本号大于since的变化时立即返回，否则最多等待timeout秒"""
+    store = get_config_store()
+    changes = await store.wait_for_changes(since, min(timeout, MAX_CHANGES_TIMEOUT))
+    return {"version": store.version, "changes": changes}
+
+@router.get("/config-changes/stream")
+async def stream_config_changes(since: int = Query(0, ge=0, description="上次看到的配置版本号")):
+    """配置变化SSE：每次变化推送change事件，空闲时定期发送注释保活"""
+    store = get_config_store()
+    
+    async def event_stream():
+        cursor = since
+        while True:
+            changes = await store.wait_for_changes(cursor, 15.0)
+            if not changes:
+                yield ": keepalive\n\n"
+                continue
+            for change in changes:
+                yield f"event: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+            cursor = max(change["version"] for change in changes)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/knowledge-base", response_model=ConfigResponse)
 async def get_knowledge_base():
-    """获取知识库列表"""
+    """获取知识库列表（按文件签名缓存，只统计新增或变化的文件）"""
     try:
-        knowledge_dir = Path(settings.knowledge_dir)
-        knowledge_files = {}
-        
-        if knowledge_dir.exists():
-            for csv_file in knowledge_dir.glob("*.csv"):
-                try:
-                    if PANDAS_AVAILABLE:
-                        df = pd.read_csv(csv_file, encoding='utf-8')
-                        knowledge_files[csv_file.stem] = {
-                            "filename": csv_file.name,
-                            "rows": len(df),
-                            "columns": list(df.columns),
-                            "preview": df.head(3).to_dict('records')
-                        }
-                    else:
-                        # 使用简单CSV解析
-                        result = _simple_csv_parse(csv_file)
-                        knowledge_files[csv_file.stem] = result
-                except Exception as e:
-                    print(f"读取知识库文件失败 {csv_file}: {e}")
-                    # 尝试简单解析
-                    result = _simple_csv_parse(csv_file)
-                    knowledge_files[csv_file.stem] = result
-        
+        knowledge_files = await get_knowledge_catalog().list_files()
         return ConfigResponse(
             success=True,
             data={"knowledge_files": knowledge_files},
@@ -167,51 +175,64 @@ async def get_knowledge_base():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取知识库列表失败: {str(e)}")
 
+def _write_and_validate(f, validator: StreamingCSVValidator, chunk: bytes):
+    f.write(chunk)
+    validator.feed(chunk)
+
+
 @router.post("/upload-knowledge", response_model=ConfigResponse)
 async def upload_knowledge(file: UploadFile = File(...)):
-    """上传知识库文件"""
+    """上传知识库文件 - 分块写入临时文件并逐行校验，通过后原子替换，共享引擎只更新该表"""
+    filename = Path(file.filename or "").name
+    if not filename.endswith('.csv') or filename.startswith('.'):
+        raise HTTPException(status_code=400, detail="只支持CSV文件")
+    max_bytes = settings.knowledge_upload_max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"文件超过大小上限{max_bytes}字节")
+    
+    knowledge_dir = Path(settings.knowledge_dir)
+    knowledge_dir.mkdir(parents=True, exist_ok=True)
+    file_path = knowledge_dir / filename
+    # 临时文件不以.csv结尾，不会被引擎和目录扫描到；校验失败时原文件保持不变
+    tmp_path = knowledge_dir / f".{filename}.{uuid.uuid4().hex}.upload"
+    validator = StreamingCSVValidator()
+    size = 0
     try:
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="只支持CSV文件")
-        
-        knowledge_dir = Path(settings.knowledge_dir)
-        knowledge_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = knowledge_dir / file.filename
-        
-        # 保存文件
-        content = await file.read()
-        with open(file_path, 'wb') as f:
-            f.write(content)
-        
-        # 验证CSV格式
-        try:
-            if PANDAS_AVAILABLE:
-                df = pd.read_csv(file_path, encoding='utf-8')
-                result = {
-                    "filename": file.filename,
-                    "rows": len(df),
-                    "columns": list(df.columns)
-                }
-            else:
-                # 使用简单CSV解析
-                result = _simple_csv_parse(file_path)
-                result["filename"] = file.filename
-            
-            return ConfigResponse(
-                success=True,
-                data=result,
-                message="上传知识库文件成功"
-            )
-        except Exception as e:
-            # 如果CSV格式错误，删除文件
-            file_path.unlink()
-            raise HTTPException(status_code=400, detail=f"CSV格式错误: {str(e)}")
-            
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"文件超过大小上限{max_bytes}字节")
+                await asyncio.to_thread(_write_and_validate, f, validator, chunk)
+            await asyncio.to_thread(validator.finish)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except CSVValidationError as e:
+        raise HTTPException(status_code=400, detail=f"CSV格式错误: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
         raise HTTPException(status_code=500, detail=f"上传文件失败: {str(e)}")
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    
+    stat = file_path.stat()
+    table = validator.build_table((stat.st_mtime_ns, stat.st_size))
+    info = validator.info(filename)
+    get_knowledge_catalog().update(file_path, info)
+    # 新表已在接收时构建，共享引擎只替换该表并重建其索引
+    await asyncio.to_thread(update_shared_knowledge_table, file_path, table)
+    
+    return ConfigResponse(
+        success=True,
+        data={"filename": filename, "rows": info["rows"], "columns": info["columns"], "bytes": size},
+        message="上传知识库文件成功"
+    )
 
 @router.get("/health")
 async def health_check():
@@ -1,17 +1,60 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
-from app.services.risk_engine import RiskEngine
+from app.core.config import settings
+from app.services.batch_scan import run_batch_scan
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.deadline import set_deadline
+from app.services.degradation import degradation_scope
+from app.services.risk_engine import RiskEngine, get_shared_risk_engine
+from app.services.llm_cache import get_llm_cache, llm_cache_bypass
+from app.services.llm_governor import get_llm_governor
 
-router = APIRouter()
+
+async def apply_llm_cache_control(
+    cache_control: Optional[str] = Header(None),
+    no_cache: bool = False
+):
+    """按请求决定是否绕过LLM缓存：Cache-Control: no-cache 或 ?no_cache=true"""
+    bypass = no_cache or bool(cache_control and "no-cache" in cache_control.lower())
+    llm_cache_bypass.set(bypass)
+
+
+async def apply_request_deadline(
+    x_request_deadline_ms: Optional[int] = Header(None),
+    deadline_ms: Optional[int] = None
+):
+    """设置请求预算：?deadline_ms= 优先于 X-Request-Deadline-Ms，都未给出时用默认预算；显式传0表示不限
+
+    各阶段LLM调用超时取剩余预算
+    """
+    if deadline_ms is not None and deadline_ms < 0:
+        raise HTTPException(status_code=400, detail="deadline_ms不能为负数")
+    if x_request_deadline_ms is not None and x_request_deadline_ms < 0:
+        raise HTTPException(status_code=400, detail="X-Request-Deadline-Ms不能为负数")
+    if deadline_ms is not None:
+        budget = deadline_ms
+    elif x_request_deadline_ms is not None:
+        budget = x_request_deadline_ms
+    else:
+        budget = settings.request_deadline_default_ms
+    set_deadline(budget)
+
+
+router = APIRouter(dependencies=[Depends(apply_llm_cache_control), Depends(apply_request_deadline)])
 
 # 请求模型
 class RiskAnalysisRequest(BaseModel):
     input_text: str
     user_response: Optional[str] = None
+    fused: Optional[bool] = None  # 融合模式：一次LLM调用完成风险分析和话术生成
 
 class StaticScanRequest(BaseModel):
     text: str
+    fused: bool = False  # 为True时ai_analysis中附带话术，/generate-tactics可直接复用
 
 class DynamicAnalysisRequest(BaseModel):
     response_text: str
@@ -32,10 +75,10 @@ class RiskAnalysisResponse(BaseModel):
     data: dict
     message: str
 
-# 依赖注入
+# 依赖注入 - 复用进程级共享引擎，配置变化由引擎自行热重载
 def get_risk_engine():
     try:
-        return RiskEngine()
+        return get_shared_risk_engine()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"风控引擎初始化失败: {str(e)}")
 
@@ -46,7 +89,7 @@ async def static_risk_scan(
 ):
     """静态风险扫描"""
     try:
-        result = await risk_engine.static_risk_scan(request.text)
+        result = await risk_engine.static_risk_scan(request.text, fused=request.fused)
         return RiskAnalysisResponse(
             success=True,
             data=result,
@@ -55,6 +98,90 @@ async def static_risk_scan(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"静态扫描失败: {str(e)}")
 
+def _to_batch_item(index: int, value) -> tuple:
+    """把一条批量输入转换为 (序号, ID, 文本, 错误)，支持字符串或 {"id", "text"} 对象"""
+    if isinstance(value, str):
+        return index, None, value, None
+    if isinstance(value, dict):
+        item_id = value.get("id")
+        item_id = str(item_id) if item_id is not None else None
+        text = value.get("text")
+        if isinstance(text, str):
+            return index, item_id, text, None
+        return index, item_id, None, "缺少text字段"
+    return index, None, None, "条目必须是字符串或包含text字段的对象"
+
+async def _iter_json_items(request: Request):
+    """JSON数组或 {"items": [...]} 请求体"""
+    try:
+        body = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"JSON格式错误: {str(e)}")
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="请求体必须是数组或包含items数组的对象")
+    
+    async def generate():
+        for index, value in enumerate(items):
+            yield _to_batch_item(index, value)
+    return generate()
+
+async def _iter_ndjson_items(request: Request):
+    """NDJSON请求体，边接收边逐行解析，空行跳过
+    
+    请求体需在开始返回响应前读完：StreamingResponse会占用receive通道监听客户端断开。
+    """
+    parsed = []
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                parsed.append(_parse_ndjson_line(len(parsed), line))
+    if buffer.strip():
+        parsed.append(_parse_ndjson_line(len(parsed), buffer))
+    
+    async def generate():
+        for item in parsed:
+            yield item
+    return generate()
+
+def _parse_ndjson_line(index: int, line: bytes) -> tuple:
+    try:
+        return _to_batch_item(index, json.loads(line))
+    except ValueError as e:
+        return index, None, None, f"第{index + 1}行JSON格式错误: {str(e)}"
+
+@router.post("/static-scan/batch")
+async def batch_static_risk_scan(
+    request: Request,
+    concurrency: Optional[int] = None,
+    risk_engine: RiskEngine = Depends(get_risk_engine)
+):
+    """批量静态风险扫描 - 输入JSON数组或NDJSON，按完成顺序返回NDJSON
+    
+    每行结果: {"index", "id", "success", "data"/"error"}，最后一行为 {"summary": {...}}
+    """
+    concurrency = concurrency or settings.batch_scan_concurrency
+    if concurrency < 1 or concurrency > settings.batch_scan_max_concurrency:
+        raise HTTPException(
+            status_code=400,
+            detail=f"concurrency必须在1到{settings.batch_scan_max_concurrency}之间"
+        )
+    
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = await _iter_ndjson_items(request)
+    else:
+        items = await _iter_json_items(request)
+    
+    async def result_lines():
+        async for result in run_batch_scan(risk_engine, items, concurrency):
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+    
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
 @router.post("/dynamic-analysis", response_model=RiskAnalysisResponse)
 async def dynamic_risk_analysis(
     request: DynamicAnalysisRequest,
@@ -71,6 +198,39 @@ async def dynamic_risk_analysis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"动态分析失败: {str(e)}")
 
+@router.post("/dynamic-analysis/batch", response_model=RiskAnalysisResponse)
+async def batch_score_responses(
+    request: Request,
+    risk_engine: RiskEngine = Depends(get_risk_engine)
+):
+    """本地词表批量评分回答（不调用AI）- 输入JSON数组或 {"items": [...]}
+    
+    条目为字符串或 {"id", "text"}，结果按输入顺序返回 {"index", "id", "success", "data"/"error"}
+    """
+    items = [item async for item in await _iter_json_items(request)]
+    if len(items) > settings.response_score_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次最多评分{settings.response_score_batch_max_items}条"
+        )
+    valid = [(index, item_id, text) for index, item_id, text, error in items if error is None]
+    scores = await asyncio.to_thread(risk_engine.score_responses, [text for _, _, text in valid])
+    
+    results = [
+        {"index": index, "id": item_id, "success": False, "error": error}
+        for index, item_id, _, error in items if error is not None
+    ]
+    results.extend(
+        {"index": index, "id": item_id, "success": True, "data": score}
+        for (index, item_id, _), score in zip(valid, scores)
+    )
+    results.sort(key=lambda result: result["index"])
+    return RiskAnalysisResponse(
+        success=True,
+        data={"results": results, "total": len(results), "failed": len(items) - len(valid)},
+        message="批量回答评分完成"
+    )
+
 @router.post("/generate-tactics", response_model=RiskAnalysisResponse)
 async def generate_verification_tactics(
     request: GenerateTacticsRequest,
@@ -83,16 +243,20 @@ async def generate_verification_tactics(
         ai_analysis = request.ai_analysis if hasattr(request, 'ai_analysis') else {}
         
         # 基于已有的AI分析结果生成话术
-        verification_tactics = await risk_engine.generate_verification_tactics(
-            rules, 
-            ai_analysis
-        )
+        with degradation_scope() as degradation:
+            verification_tactics = await risk_engine.generate_verification_tactics(
+                rules, 
+                ai_analysis,
+                request.input_text
+            )
         
         # 返回话术结果
         tactics_result = {
             "verification_tactics": verification_tactics,
             "rules": rules,
-            "ai_analysis": ai_analysis
+            "ai_analysis": ai_analysis,
+            "degraded": degradation.degraded,
+            "degraded_reasons": degradation.reasons
         }
         
         return RiskAnalysisResponse(
@@ -134,7 +298,8 @@ async def full_risk_analysis(
     try:
         result = await risk_engine.full_risk_analysis(
             request.input_text,
-            request.user_response
+            request.user_response,
+            fused=request.fused
         )
         return RiskAnalysisResponse(
             success=True,
@@ -144,7 +309,116 @@ async def full_risk_analysis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"完整分析失败: {str(e)}")
 
+def _format_sse(event: str, data) -> str:
+    """格式化一条Server-Sent Event"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@router.post("/full-analysis/stream")
+async def full_risk_analysis_stream(
+    request: RiskAnalysisRequest,
+    risk_engine: RiskEngine = Depends(get_risk_engine)
+):
+    """完整风控分析（SSE流式）- 每个阶段完成即推送，最后推送result事件"""
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def on_event(event: str, data):
+        queue.put_nowait((event, data))
+    
+    async def run_analysis():
+        try:
+            result = await risk_engine.full_risk_analysis(
+                request.input_text,
+                request.user_response,
+                on_event=on_event,
+                fused=request.fused
+            )
+            queue.put_nowait(("result", result))
+        except Exception as e:
+            queue.put_nowait(("error", {"detail": f"完整分析失败: {str(e)}"}))
+        finally:
+            queue.put_nowait(None)
+    
+    async def event_stream():
+        task = asyncio.create_task(run_analysis())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield _format_sse(*item)
+        finally:
+            # 客户端断开时停止后台分析
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate-tactics/stream")
+async def generate_verification_tactics_stream(
+    request: GenerateTacticsRequest,
+    risk_engine: RiskEngine = Depends(get_risk_engine)
+):
+    """生成验证话术（SSE流式）- 每条话术生成完即推送tactic事件，最后推送result事件"""
+    async def event_stream():
+        tactics = []
+        try:
+            with degradation_scope() as degradation:
+                async for tactic in risk_engine.stream_verification_tactics(
+                    request.rules, request.ai_analysis, request.input_text
+                ):
+                    tactics.append(tactic)
+                    yield _format_sse("tactic", tactic)
+            yield _format_sse("result", {
+                "verification_tactics": tactics,
+                "rules": request.rules,
+                "ai_analysis": request.ai_analysis,
+                "degraded": degradation.degraded,
+                "degraded_reasons": degradation.reasons
+            })
+        except Exception as e:
+            yield _format_sse("error", {"detail": f"话术生成失败: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats():
+    """LLM缓存命中统计"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.delete("/llm-cache")
+async def clear_llm_cache():
+    """清空LLM缓存"""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.clear()
+    return {"success": True, "message": "LLM缓存已清空"}
+
+@router.get("/llm-governor")
+async def get_llm_governor_stats():
+    """DeepSeek出站调度状态（限速、当前并发上限、排队数）"""
+    return get_llm_governor().stats()
+
+@router.get("/rule-costs")
+async def get_rule_costs(engine: RiskEngine = Depends(get_risk_engine)):
+    """编译后风险规则的单遍扫描耗时及每条规则的累计求值开销"""
+    snapshot = engine.snapshot
+    return {"version": snapshot.version, **snapshot.rule_matcher.costs()}
+
 @router.get("/health")
 async def health_check():
-    """健康检查"""
-    return {"status": "healthy", "service": "risk_analysis"}
+    """健康检查 - LLM熔断打开时服务仍可用，但结果为本地降级结果"""
+    breaker = get_circuit_breaker().stats()
+    status = "healthy" if breaker["state"] == "closed" else "degraded"
+    return {"status": status, "service": "risk_analysis", "llm_circuit": breaker}
@@ -26,6 +26,50 @@ if PYDANTIC_SETTINGS_AVAILABLE:
         deepseek_model: str = "deepseek-chat"
         deepseek_max_tokens: int = 1000
         
+        # DeepSeek HTTP连接池配置
+        deepseek_timeout: float = 30.0
+        deepseek_connect_timeout: float = 5.0
+        deepseek_pool_timeout: float = 5.0
+        deepseek_max_connections: int = 100
+        deepseek_max_keepalive_connections: int = 20
+        deepseek_keepalive_expiry: float = 30.0
+        deepseek_http2: bool = False
+        
+        # DeepSeek出站调度（令牌桶限速、自适应并发、退避重试；限速0表示不限）
+        deepseek_rate_limit: float = 10.0
+        deepseek_rate_burst: int = 20
+        deepseek_concurrency_initial: int = 16
+        deepseek_concurrency_min: int = 2
+        deepseek_concurrency_max: int = 64
+        deepseek_target_latency: float = 15.0
+        deepseek_max_retries: int = 2
+        deepseek_backoff_base: float = 0.5
+        deepseek_backoff_max: float = 8.0
+        
+        # DeepSeek熔断器（连续失败次数、打开后多久半开探测、半开探测数、慢调用阈值秒）
+        deepseek_breaker_failure_threshold: int = 5
+        deepseek_breaker_recovery_timeout: float = 30.0
+        deepseek_breaker_half_open_max_calls: int = 1
+        deepseek_breaker_slow_call: float = 20.0
+        
+        # LLM结果缓存配置
+        llm_cache_enabled: bool = True
+        llm_cache_max_entries: int = 1024
+        llm_cache_ttl: float = 600.0
+        
+        # 批量静态扫描的DeepSeek并发（默认值/上限）
+        batch_scan_concurrency: int = 4
+        batch_scan_max_concurrency: int = 32
+        
+        # 本地回答批量评分单次请求的最大条数
+        response_score_batch_max_items: int = 10000
+        
+        # 融合分析模式默认开关（一次LLM调用完成风险分析和话术生成）
+        fused_analysis_default: bool = False
+        
+        # 请求默认预算（毫秒，0表示不限；可用X-Request-Deadline-Ms请求头或deadline_ms参数覆盖）
+        request_deadline_default_ms: int = 0
+        
         # 风控配置
         risk_threshold_terminate: int = 75
         risk_threshold_warning: int = 40
@@ -36,6 +80,28 @@ if PYDANTIC_SETTINGS_AVAILABLE:
         config_dir: str = "config"
         knowledge_dir: str = "knowledge"
         
+        # 知识库内存映射目录（为空表示不使用；多worker共享同一份转换后的列式文件）
+        knowledge_mmap_dir: Optional[str] = None
+        
+        # 话术生成时每条规则检索注入的政策知识条数（0表示不注入）
+        knowledge_top_k: int = 3
+        
+        # 知识库CSV上传大小上限（字节）
+        knowledge_upload_max_bytes: int = 50 * 1024 * 1024
+        
+        # 配置热重载（秒，0表示关闭文件监听）
+        config_watch_interval: float = 2.0
+        
+        # AI分析前置预判：本地规则分数达到该值时跳过AI分析（0表示关闭）；未加载预判模型时AI请求仍与本地阶段同时发出，饱和后取消
+        ai_precheck_saturation_score: int = 100
+        # 离线训练的预判模型（.npz，需要numpy），判定为明显低风险的置信度下限
+        preclassifier_model_path: Optional[str] = None
+        preclassifier_confidence: float = 0.9
+        # 静态扫描结果日志（JSONL，包含用户文本），用于训练预判模型
+        analysis_log_path: Optional[str] = None
+        # 静态分已决定最终决策时跳过AI动态分析，只做本地词表评分
+        dynamic_short_circuit: bool = True
+        
         class Config:
             env_file = ".env"
             env_file_encoding = "utf-8"
@@ -52,12 +118,49 @@ else:
             self.deepseek_api_base = "https://api.deepseek.com"
             self.deepseek_model = "deepseek-chat"
             self.deepseek_max_tokens = 1000
+            self.deepseek_timeout = 30.0
+            self.deepseek_connect_timeout = 5.0
+            self.deepseek_pool_timeout = 5.0
+            self.deepseek_max_connections = 100
+            self.deepseek_max_keepalive_connections = 20
+            self.deepseek_keepalive_expiry = 30.0
+            self.deepseek_http2 = False
+            self.deepseek_rate_limit = 10.0
+            self.deepseek_rate_burst = 20
+            self.deepseek_concurrency_initial = 16
+            self.deepseek_concurrency_min = 2
+            self.deepseek_concurrency_max = 64
+            self.deepseek_target_latency = 15.0
+            self.deepseek_max_retries = 2
+            self.deepseek_backoff_base = 0.5
+            self.deepseek_backoff_max = 8.0
+            self.deepseek_breaker_failure_threshold = 5
+            self.deepseek_breaker_recovery_timeout = 30.0
+            self.deepseek_breaker_half_open_max_calls = 1
+            self.deepseek_breaker_slow_call = 20.0
+            self.llm_cache_enabled = True
+            self.llm_cache_max_entries = 1024
+            self.llm_cache_ttl = 600.0
+            self.batch_scan_concurrency = 4
+            self.batch_scan_max_concurrency = 32
+            self.response_score_batch_max_items = 10000
+            self.fused_analysis_default = False
+            self.request_deadline_default_ms = 0
             self.risk_threshold_terminate = 75
             self.risk_threshold_warning = 40
             self.static_weight = 0.6
             self.dynamic_weight = 0.4
             self.config_dir = "config"
             self.knowledge_dir = "knowledge"
+            self.knowledge_mmap_dir = None
+            self.knowledge_top_k = 3
+            self.knowledge_upload_max_bytes = 50 * 1024 * 1024
+            self.config_watch_interval = 2.0
+            self.ai_precheck_saturation_score = 100
+            self.preclassifier_model_path = None
+            self.preclassifier_confidence = 0.9
+            self.analysis_log_path = None
+            self.dynamic_short_circuit = True
             
             # 从环境变量加载配置
             self._load_from_env()
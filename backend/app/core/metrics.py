@@ -0,0 +1,280 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+# Prometheus文本格式的轻量实现，不依赖prometheus_client
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}需要标签{self.labelnames}，实际为{tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """进入时+1，退出时-1"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 标签 -> [各桶计数, 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，render输出Prometheus文本格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标{metric.name}重复注册")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def track_in_progress(gauge: Gauge, **labels):
+    """异步函数装饰器：执行期间gauge+1"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with gauge.track_inprogress(**labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ---- 应用指标 ----
+
+RISK_STAGE_DURATION = Histogram(
+    "risk_stage_duration_seconds",
+    "风控分析各阶段耗时",
+    ["stage"]
+)
+RISK_ANALYSIS_IN_FLIGHT = Gauge(
+    "risk_analysis_in_flight",
+    "正在进行的风控分析数量",
+    ["operation"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "正在处理的HTTP请求数量"
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时",
+    ["method", "route", "status"]
+)
+DEEPSEEK_CALLS = Counter(
+    "deepseek_calls_total",
+    "DeepSeek调用结果计数（success/non_200/exception/circuit_open/deadline_exceeded/json_parse_failure/fallback）",
+    ["outcome"]
+)
+DEEPSEEK_REQUEST_DURATION = Histogram(
+    "deepseek_request_duration_seconds",
+    "DeepSeek HTTP请求耗时"
+)
+DEEPSEEK_REQUESTS_IN_FLIGHT = Gauge(
+    "deepseek_requests_in_flight",
+    "正在进行的DeepSeek HTTP请求数量"
+)
+DEEPSEEK_QUEUE_WAIT = Histogram(
+    "deepseek_queue_wait_seconds",
+    "DeepSeek调用在限速和并发队列中的等待时间"
+)
+DEEPSEEK_CONCURRENCY_LIMIT = Gauge(
+    "deepseek_concurrency_limit",
+    "DeepSeek当前自适应并发上限"
+)
+DEEPSEEK_RETRIES = Counter(
+    "deepseek_retries_total",
+    "DeepSeek调用重试次数",
+    ["reason"]
+)
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state",
+    "LLM熔断器状态（0=closed, 1=open, 2=half_open）",
+    ["dependency"]
+)
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_transitions_total",
+    "LLM熔断器状态切换次数",
+    ["dependency", "state"]
+)
+LLM_CIRCUIT_REJECTED = Counter(
+    "llm_circuit_rejected_total",
+    "熔断器打开期间被直接拒绝的调用数",
+    ["dependency"]
+)
+DEGRADED_RESULTS = Counter(
+    "risk_degraded_total",
+    "走降级路径的次数",
+    ["reason"]
+)
+DEEPSEEK_TOKENS = Counter(
+    "deepseek_tokens_total",
+    "DeepSeek消耗的token数量",
+    ["type"]
+)
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "LLM缓存查询结果（hit/miss/coalesced/bypass）",
+    ["result"]
+)
+AI_PRECHECK_DECISIONS = Counter(
+    "ai_precheck_decisions_total",
+    "静态扫描AI分析前置预判结果（saturated/low_risk跳过AI，uncertain/disabled调用AI）",
+    ["outcome"]
+)
+DYNAMIC_SHORT_CIRCUITS = Counter(
+    "dynamic_analysis_short_circuits_total",
+    "决策已由静态分确定而跳过AI动态分析的次数",
+    ["decision"]
+)
@@ -1,13 +1,77 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.metrics import (
+    CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, REGISTRY
+)
+import asyncio
+import time
 import uvicorn
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期 - 每个worker创建共享风控引擎、监听配置变化、预热知识库目录，关闭时释放连接池"""
+    watcher = None
+    config_watcher = None
+    catalog_warmup = None
+    try:
+        from app.core.config import settings as app_settings
+        from app.services.risk_engine import get_shared_risk_engine
+        engine = get_shared_risk_engine()
+        app.state.risk_engine = engine
+        if app_settings.config_watch_interval > 0:
+            watcher = asyncio.create_task(
+                engine.watch_config_files(app_settings.config_watch_interval)
+            )
+    except Exception as e:
+        # 引擎创建失败时不阻止启动，请求时会返回明确错误
+        print(f"⚠️  Warning: 风控引擎初始化失败: {e}")
+    
+    try:
+        from app.core.config import settings as app_settings
+        from app.services.config_store import get_config_store
+        # 其他worker写入配置后，本worker上等待变更的客户端也能收到通知
+        if app_settings.config_watch_interval > 0:
+            config_watcher = asyncio.create_task(
+                get_config_store().watch_files(app_settings.config_watch_interval)
+            )
+    except Exception as e:
+        print(f"⚠️  Warning: 配置存储初始化失败: {e}")
+    
+    try:
+        from app.services.knowledge_catalog import get_knowledge_catalog
+        # 后台统计知识库文件信息，配置页首次打开时无需等待
+        catalog_warmup = asyncio.create_task(get_knowledge_catalog().list_files())
+    except Exception as e:
+        print(f"⚠️  Warning: 知识库目录预热失败: {e}")
+    
+    yield
+    
+    if catalog_warmup and not catalog_warmup.done():
+        catalog_warmup.cancel()
+    for task in (watcher, config_watcher):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    try:
+        from app.services.http_client import close_http_client
+        await close_http_client()
+    except Exception as e:
+        print(f"⚠️  Warning: 关闭HTTP连接池失败: {e}")
+
+
 # 创建 FastAPI 应用实例
 app = FastAPI(
     title="婚恋风控系统",
     description="AI驱动的婚恋风险评估系统",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS配置
@@ -19,6 +83,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def _route_template(request: Request) -> str:
+    """请求匹配到的路由模板，未匹配时返回unmatched"""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = request.url.path
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        # 部分FastAPI版本中route不含include_router的前缀，从实际路径中补回
+        for index, char in enumerate(path):
+            if char == "/" and index > 0 and regex.match(path[index:]):
+                return path[:index] + template
+    return template
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """记录HTTP请求耗时和并发数；流式响应只统计到响应头发出为止"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    start = time.perf_counter()
+    status = 500
+    with HTTP_REQUESTS_IN_FLIGHT.track_inprogress():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # 使用路由模板作为标签，避免路径参数导致标签基数膨胀
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=_route_template(request),
+                status=status
+            )
+
 # 尝试导入API模块，如果失败则创建空的router
 try:
     from app.api import risk_analysis, config_management
@@ -77,6 +179,11 @@ async def health_check():
             "timestamp": "2024-01-01T00:00:00Z"
         }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus指标"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/health")
 async def api_health_check():
     """API健康检查"""
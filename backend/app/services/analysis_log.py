@@ -0,0 +1,51 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from app.core.config import settings
+
+# 训练预判模型所需的字段
+RECORD_FIELDS = ("text", "keyword_score", "pattern_score", "rule_count", "ai_score", "warning_threshold")
+
+
+class AnalysisLog:
+    """静态扫描结果日志（JSONL，每行一条），作为离线训练预判模型的样本
+
+    只记录AI分析实际执行且未降级的扫描；多worker以追加模式写同一个文件，单行写入不会交错。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict):
+        line = json.dumps({"ts": time.time(), **record}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def read_analysis_log(path: Path) -> Iterator[Dict]:
+    """逐行读取分析记录，跳过无法解析或字段不全的行"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and all(key in record for key in RECORD_FIELDS):
+                yield record
+
+
+# 进程级共享日志（未配置路径时为None）
+_log: Optional[AnalysisLog] = None
+
+
+def get_analysis_log() -> Optional[AnalysisLog]:
+    global _log
+    if _log is None and settings.analysis_log_path:
+        _log = AnalysisLog(Path(settings.analysis_log_path))
+    return _log
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+# 批量条目: (序号, 业务ID, 文本, 输入错误)；输入错误不为None时该条直接返回错误
+BatchItem = Tuple[int, Optional[str], Optional[str], Optional[str]]
+
+
+async def run_batch_scan(
+    engine,
+    items: AsyncIterator[BatchItem],
+    concurrency: int
+) -> AsyncIterator[Dict]:
+    """并发执行批量静态扫描，按完成顺序产出结果
+
+    worker数量即同时进行的static_risk_scan数量，每次扫描最多一次DeepSeek调用，
+    因此concurrency同时也是DeepSeek并发上限。单条失败只影响该条结果。
+    """
+    started = time.perf_counter()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue()
+    counts = {"total": 0, "succeeded": 0, "failed": 0}
+
+    async def produce():
+        try:
+            async for item in items:
+                await pending.put(item)
+        except Exception as e:
+            await results.put({"index": None, "success": False, "error": f"读取批量输入失败: {str(e)}"})
+        finally:
+            for _ in range(concurrency):
+                await pending.put(None)
+
+    async def work():
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            index, item_id, text, error = item
+            if error is not None:
+                await results.put({"index": index, "id": item_id, "success": False, "error": error})
+                continue
+            try:
+                data = await engine.static_risk_scan(text)
+                await results.put({"index": index, "id": item_id, "success": True, "data": data})
+            except Exception as e:
+                await results.put({"index": index, "id": item_id, "success": False, "error": f"静态扫描失败: {str(e)}"})
+
+    producer = asyncio.create_task(produce())
+    workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+    finished = asyncio.gather(*workers)
+    finished.add_done_callback(lambda _: results.put_nowait(None))
+
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            counts["total"] += 1
+            counts["succeeded" if result["success"] else "failed"] += 1
+            yield result
+    finally:
+        # 调用方中途停止（如客户端断开）时取消剩余任务
+        producer.cancel()
+        for worker in workers:
+            worker.cancel()
+
+    yield {
+        "summary": {
+            **counts,
+            "concurrency": concurrency,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    }
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import LLM_CIRCUIT_REJECTED, LLM_CIRCUIT_STATE, LLM_CIRCUIT_TRANSITIONS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 指标中的状态编码
+STATE_CODES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """LLM依赖熔断器
+
+    连续失败（含超时和慢调用）达到阈值后打开，打开期间直接拒绝调用，由调用方立即走本地降级；
+    经过recovery_timeout后进入半开状态，放行少量探测请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        slow_call_threshold: float = 20.0,
+        name: str = "deepseek"
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.slow_call_threshold = slow_call_threshold
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        LLM_CIRCUIT_STATE.set(STATE_CODES[CLOSED], dependency=name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        print(f"🔌 熔断器[{self.name}]状态变化: {self.state} -> {state}")
+        self.state = state
+        LLM_CIRCUIT_STATE.set(STATE_CODES[state], dependency=self.name)
+        LLM_CIRCUIT_TRANSITIONS.inc(dependency=self.name, state=state)
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == HALF_OPEN:
+            self._half_open_calls = 0
+        else:
+            self.opened_at = None
+            self.consecutive_failures = 0
+
+    def allow_request(self) -> bool:
+        """是否放行本次调用；半开状态下占用一个探测名额"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    LLM_CIRCUIT_REJECTED.inc(dependency=self.name)
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    LLM_CIRCUIT_REJECTED.inc(dependency=self.name)
+                    return False
+                self._half_open_calls += 1
+            return True
+
+    def record_success(self, duration: float = 0.0):
+        if duration > self.slow_call_threshold:
+            # 慢调用按失败计，避免服务端变慢时仍持续占用请求
+            self.record_failure()
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def record_cancelled(self):
+        """调用被取消（无结果），归还半开探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 2)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "retry_in": retry_in,
+                "rejected": self.rejected
+            }
+
+
+# 进程级共享熔断器
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker(
+            failure_threshold=settings.deepseek_breaker_failure_threshold,
+            recovery_timeout=settings.deepseek_breaker_recovery_timeout,
+            half_open_max_calls=settings.deepseek_breaker_half_open_max_calls,
+            slow_call_threshold=settings.deepseek_breaker_slow_call
+        )
+    return _breaker
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from app.core.config import settings
+
+# 跨进程写锁（仅POSIX），不可用时只保证进程内互斥
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+class PreconditionFailed(Exception):
+    """If-Match与当前版本不一致"""
+
+    def __init__(self, current_etag: Optional[str]):
+        super().__init__("配置已被修改")
+        self.current_etag = current_etag
+
+
+@dataclass(frozen=True)
+class ConfigDocument:
+    """某一版本的配置文档；文件不存在时data和etag为None"""
+    name: str
+    data: Any
+    version: int
+    etag: Optional[str]
+    signature: Optional[Tuple[int, int]]
+
+
+def _etag(content: bytes) -> str:
+    """按文件内容计算ETag，各worker对同一内容得到相同ETag"""
+    return '"' + hashlib.sha256(content).hexdigest()[:20] + '"'
+
+
+def _dump_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _dump_yaml(data: Any) -> bytes:
+    return yaml.dump(data, default_flow_style=False, allow_unicode=True).encode("utf-8")
+
+
+def etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """If-Match / If-None-Match 是否命中（支持*、多个值和弱校验前缀W/）"""
+    if not header or etag is None:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ConfigStore:
+    """版本化配置存储
+
+    以文件为准，内存中保存解析后的配置和内容ETag。每次变化（本进程写入或其他worker改了文件）
+    版本号加一并唤醒等待变更的请求。写入在文件锁内比对If-Match后写临时文件再原子替换。
+    版本号在本进程内单调递增；跨worker判断是否同一内容请使用ETag。
+    """
+
+    def __init__(self, config_dir: Path):
+        self.config_dir = config_dir
+        self._formats: Dict[str, Tuple[Path, Callable[[bytes], Any], Callable[[Any], bytes]]] = {
+            "risk-rules": (config_dir / "risk_rules.json", json.loads, _dump_json),
+            "weight-config": (config_dir / "weight_config.yaml", lambda raw: yaml.safe_load(raw) or {}, _dump_yaml),
+            "contradiction-rules": (config_dir / "contradiction_rules.json", json.loads, _dump_json),
+        }
+        self.version = 0
+        self._documents: Dict[str, ConfigDocument] = {}
+        self._write_lock = threading.Lock()
+        self._changed = asyncio.Event()
+        for name in self._formats:
+            self._load(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._formats)
+
+    def _signature(self, path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _publish(self, document: ConfigDocument):
+        self._documents[document.name] = document
+        # 唤醒当前所有等待者，后续等待者使用新的事件
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _load(self, name: str) -> ConfigDocument:
+        path, parse, _ = self._formats[name]
+        signature = self._signature(path)
+        if signature is None:
+            data, etag = None, None
+        else:
+            raw = path.read_bytes()
+            data, etag = parse(raw), _etag(raw)
+        current = self._documents.get(name)
+        if current is not None and current.etag == etag:
+            # 内容未变（如仅touch），只更新签名
+            document = ConfigDocument(name, current.data, current.version, etag, signature)
+            self._documents[name] = document
+            return document
+        self.version += 1
+        document = ConfigDocument(name, data, self.version, etag, signature)
+        self._publish(document)
+        return document
+
+    def get(self, name: str) -> ConfigDocument:
+        """当前配置；文件被其他进程修改时重新加载"""
+        document = self._documents[name]
+        if self._signature(self._formats[name][0]) != document.signature:
+            try:
+                document = self._load(name)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                # 文件正在被写或内容有误时继续提供上一版本
+                print(f"⚠️ 配置文件{name}读取失败，继续使用v{document.version}: {e}")
+        return document
+
+    def refresh(self) -> List[str]:
+        """检查所有配置文件，返回发生变化的配置名"""
+        before = {name: document.version for name, document in self._documents.items()}
+        for name in self._formats:
+            self.get(name)
+        return [name for name, document in self._documents.items() if document.version != before.get(name)]
+
+    @contextmanager
+    def _file_lock(self):
+        lock_path = self.config_dir / ".config.lock"
+        with self._write_lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, name: str, content: bytes, if_match: Optional[str]) -> Tuple[Optional[Tuple[int, int]], bool]:
+        """在文件锁内校验If-Match并原子写入，返回(文件签名, 是否实际写入)"""
+        path = self._formats[name][0]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            current = path.read_bytes() if path.exists() else None
+            current_etag = _etag(current) if current is not None else None
+            if if_match is not None and not etag_matches(if_match, current_etag):
+                raise PreconditionFailed(current_etag)
+            if current == content:
+                return self._signature(path), False
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            return self._signature(path), True
+
+    async def update(self, name: str, data: Any, if_match: Optional[str] = None) -> ConfigDocument:
+        """写入新配置；if_match不为空时要求与文件当前内容的ETag一致，否则抛出PreconditionFailed"""
+        path, parse, dump = self._formats[name]
+        content = dump(data)
+        signature, _ = await asyncio.to_thread(self._write, name, content, if_match)
+        etag = _etag(content)
+        current = self._documents.get(name)
+        if current is not None and current.etag == etag:
+            # 内容未变，或写入期间已被get()重新加载
+            document = ConfigDocument(name, current.data, current.version, etag, signature)
+            self._documents[name] = document
+            return document
+        self.version += 1
+        document = ConfigDocument(name, parse(content), self.version, etag, signature)
+        self._publish(document)
+        return document
+
+    def changes_since(self, since: int) -> List[Dict]:
+        return sorted(
+            (
+                {"name": document.name, "version": document.version, "etag": document.etag}
+                for document in self._documents.values() if document.version > since
+            ),
+            key=lambda change: change["version"]
+        )
+
+    async def wait_for_changes(self, since: int, timeout: float) -> List[Dict]:
+        """等待版本号大于since的变化，超时返回空列表"""
+        self.refresh()
+        changes = self.changes_since(since)
+        if changes:
+            return changes
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.changes_since(since)
+
+    async def watch_files(self, interval: float):
+        """后台轮询配置文件，其他worker写入后本进程的等待者也能及时收到通知"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ 配置文件检查失败: {e}")
+
+
+# 进程级共享配置存储
+_store: Optional[ConfigStore] = None
+
+
+def get_config_store() -> ConfigStore:
+    global _store
+    if _store is None:
+        _store = ConfigStore(Path(settings.config_dir))
+    return _store
@@ -0,0 +1,34 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# 当前请求的截止时间（time.monotonic()时间点），None表示不限
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(budget_ms: Optional[int]):
+    """按剩余预算（毫秒）设置当前上下文的截止时间，预算为空或<=0时不设置"""
+    if budget_ms and budget_ms > 0:
+        _deadline.set(time.monotonic() + budget_ms / 1000)
+
+
+def remaining() -> Optional[float]:
+    """剩余预算（秒），未设置截止时间时返回None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    budget = remaining()
+    return budget is not None and budget <= 0
+
+
+def stage_timeout(default: Optional[float] = None) -> Optional[float]:
+    """阶段超时：取默认超时与剩余预算中较小者"""
+    budget = remaining()
+    if budget is None:
+        return default
+    budget = max(0.0, budget)
+    return budget if default is None else min(default, budget)
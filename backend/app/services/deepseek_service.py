@@ -1,24 +1,77 @@
+import asyncio
 import httpx
 import json
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from app.core.config import settings
+from app.core.metrics import (
+    DEEPSEEK_CALLS, DEEPSEEK_REQUEST_DURATION, DEEPSEEK_REQUESTS_IN_FLIGHT, DEEPSEEK_TOKENS
+)
+from app.services.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from app.services.deadline import stage_timeout
+from app.services.degradation import mark_degraded
+from app.services.http_client import get_http_client
+from app.services.json_stream import JSONArrayStreamParser
+from app.services.llm_governor import RETRYABLE_STATUS, GovernedResponse, LLMGovernor, get_llm_governor
+from app.services.llm_cache import LLMCache, get_llm_cache, llm_cache_bypass, make_cache_key
+from app.services.response_scorer import ResponseScorer
 
 class DeepSeekService:
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[LLMCache] = None,
+        governor: Optional[LLMGovernor] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
         self.api_key = settings.deepseek_api_key
         self.api_base = settings.deepseek_api_base
         self.model = settings.deepseek_model
         self.max_tokens = settings.deepseek_max_tokens
+        # 未显式传入客户端时使用进程级共享连接池
+        self._client = client
+        # LLM结果缓存（配置关闭时为None）
+        self.cache = cache or get_llm_cache()
+        # 出站调度器（限速、并发、重试），默认进程级共享
+        self.governor = governor or get_llm_governor()
+        # 熔断器打开时不发请求，调用方直接走本地降级
+        self.breaker = breaker or get_circuit_breaker()
+        # 本地回答评分器（降级分析用），风控引擎按weight_config中的词表替换
+        self.response_scorer = ResponseScorer()
         
         if not self.api_key:
             raise ValueError("DeepSeek API密钥未配置")
     
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+    
+    async def _post_chat_completion(self, request_data: Dict) -> GovernedResponse:
+        """通过调度器排队后调用 chat/completions 接口，可重试错误自动退避重试"""
+        return await self.governor.call(lambda: self._send_chat_completion(request_data))
+    
+    async def _send_chat_completion(self, request_data: Dict) -> httpx.Response:
+        """单次HTTP请求（通过共享连接池）"""
+        with DEEPSEEK_REQUESTS_IN_FLIGHT.track_inprogress(), DEEPSEEK_REQUEST_DURATION.time():
+            return await self.client.post(
+                f"{self.api_base}/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=request_data
+            )
+    
     async def generate_verification_tactic(
         self, 
         rule_name: str, 
-        knowledge_item: Dict[str, str]
-    ) -> str:
-        """生成验证话术"""
+        knowledge_item: Dict[str, str],
+        expect_json: bool = False
+    ) -> Optional[str]:
+        """生成验证话术；expect_json为True时只缓存可解析为JSON的回复
+
+        expect_json为True时调用失败（熔断、超出预算、接口错误）返回None，由调用方返回结构化的降级结果，
+        否则返回本地备用话术。
+        """
         print(f"🤖 DeepSeek服务: 开始生成话术")
         print(f"📋 规则名称: {rule_name}")
         print(f"📚 知识信息: {knowledge_item}")
@@ -41,57 +94,275 @@ class DeepSeekService:
             """
             print(f"📤 使用标准prompt，长度: {len(prompt)}")
         
+        content = await self._cached_completion(
+            prompt, 0.7, cacheable=self._is_json_content if expect_json else None
+        )
+        if content is None:
+            DEEPSEEK_CALLS.inc(outcome="fallback")
+            if expect_json:
+                return None
+            return self._fallback_tactic(rule_name, knowledge_item)
+        return content
+    
+    async def _cached_completion(
+        self,
+        prompt: str,
+        temperature: float,
+        cacheable: Callable[[str], bool] = None
+    ) -> Optional[str]:
+        """带缓存的补全调用，失败返回None"""
+        if self.cache is None:
+            return await self._request_completion(prompt, temperature)
+        key = make_cache_key(self.model, temperature, prompt)
+        return await self.cache.get_or_call(
+            key,
+            lambda: self._request_completion(prompt, temperature),
+            bypass=llm_cache_bypass.get(),
+            cacheable=cacheable
+        )
+    
+    async def _request_completion(self, prompt: str, temperature: float) -> Optional[str]:
+        """调用DeepSeek API并提取回复内容，失败、熔断或超出请求预算时返回None
+
+        设置了请求截止时间时，排队、重试和HTTP请求的总耗时以剩余预算为上限。
+        """
+        timeout = stage_timeout()
+        if timeout is not None and timeout <= 0:
+            print(f"⏰ 请求预算已用完，跳过DeepSeek调用直接降级")
+            DEEPSEEK_CALLS.inc(outcome="deadline_exceeded")
+            mark_degraded("deadline_exceeded")
+            return None
+        
+        if not self.breaker.allow_request():
+            print(f"⚡ DeepSeek熔断中，跳过调用直接降级")
+            DEEPSEEK_CALLS.inc(outcome="circuit_open")
+            mark_degraded("circuit_open")
+            return None
+        
         try:
             print(f"🌐 准备调用DeepSeek API")
             print(f"🔑 API密钥: {self.api_key[:10]}...")
             print(f"🌍 API地址: {self.api_base}")
             print(f"🤖 模型: {self.model}")
             
-            async with httpx.AsyncClient() as client:
-                request_data = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "max_tokens": self.max_tokens,
-                    "temperature": 0.7
-                }
-                
-                print(f"📤 发送请求数据: {json.dumps(request_data, ensure_ascii=False, indent=2)}")
-                
-                response = await client.post(
-                    f"{self.api_base}/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=request_data,
-                    timeout=30.0
-                )
-                
-                print(f"📥 收到响应，状态码: {response.status_code}")
-                print(f"📋 响应头: {dict(response.headers)}")
+            request_data = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "max_tokens": self.max_tokens,
+                "temperature": temperature
+            }
+            
+            print(f"📤 发送请求数据: {json.dumps(request_data, ensure_ascii=False, indent=2)}")
+            
+            governed = await asyncio.wait_for(self._post_chat_completion(request_data), timeout=timeout)
+            response = governed.response
+            
+            print(f"📥 收到响应，状态码: {response.status_code}")
+            print(f"📋 响应头: {dict(response.headers)}")
+            
+            if response.status_code == 200:
+                result = response.json()
+                print(f"✅ API调用成功，响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"✅ API调用成功，响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
-                    
-                    content = result["choices"][0]["message"]["content"].strip()
-                    print(f"📝 提取的内容: {content}")
-                    return content
+                content = result["choices"][0]["message"]["content"].strip()
+                print(f"📝 提取的内容: {content}")
+                DEEPSEEK_CALLS.inc(outcome="success")
+                self._record_usage(result.get("usage"))
+                # 只按最后一次HTTP尝试计时，排队和退避等待不算慢调用
+                self.breaker.record_success(governed.duration)
+                return content
+            else:
+                print(f"❌ API调用失败: {response.status_code}")
+                print(f"📋 错误响应: {response.text}")
+                DEEPSEEK_CALLS.inc(outcome="non_200")
+                if response.status_code in RETRYABLE_STATUS:
+                    self.breaker.record_failure()
                 else:
-                    print(f"❌ API调用失败: {response.status_code}")
-                    print(f"📋 错误响应: {response.text}")
-                    return self._fallback_tactic(rule_name, knowledge_item)
+                    # 4xx说明服务可达，是请求本身的问题，不计入熔断
+                    self.breaker.record_success(governed.duration)
+                return None
                     
+        except asyncio.TimeoutError:
+            # 请求预算耗尽不代表DeepSeek故障，不计入熔断
+            print(f"⏰ DeepSeek调用超出请求预算（{timeout:.2f}秒），直接降级")
+            DEEPSEEK_CALLS.inc(outcome="deadline_exceeded")
+            mark_degraded("deadline_exceeded")
+            self.breaker.record_cancelled()
+            return None
         except Exception as e:
+            DEEPSEEK_CALLS.inc(outcome="exception")
+            self.breaker.record_failure()
             print(f"❌ DeepSeek API调用异常: {e}")
             import traceback
             print(f"📋 异常堆栈: {traceback.format_exc()}")
-            return self._fallback_tactic(rule_name, knowledge_item)
+            return None
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+    
+    async def stream_json_array(self, prompt: str, key: str, temperature: float = 0.7) -> AsyncIterator[Any]:
+        """流式调用，回复JSON中key数组的每个元素完成即产出；调用失败时提前结束，由调用方降级"""
+        parser = JSONArrayStreamParser(key)
+        async for delta in self.stream_completion(prompt, temperature, cacheable=self._is_json_content):
+            for item in parser.feed(delta):
+                yield item
+    
+    async def stream_completion(
+        self,
+        prompt: str,
+        temperature: float,
+        cacheable: Callable[[str], bool] = None
+    ) -> AsyncIterator[str]:
+        """流式调用DeepSeek（stream=true），逐段产出回复内容
+
+        缓存命中时一次性产出缓存内容；失败、熔断或超出请求预算时提前结束，不抛异常。
+        完整回复满足cacheable时写入缓存，非流式调用可直接复用。
+        """
+        cache_key = make_cache_key(self.model, temperature, prompt)
+        if self.cache is not None:
+            cached = self.cache.lookup(cache_key, bypass=llm_cache_bypass.get())
+            if cached is not None:
+                yield cached
+                return
+        
+        timeout = stage_timeout()
+        if timeout is not None and timeout <= 0:
+            print(f"⏰ 请求预算已用完，跳过DeepSeek流式调用直接降级")
+            DEEPSEEK_CALLS.inc(outcome="deadline_exceeded")
+            mark_degraded("deadline_exceeded")
+            return
+        if not self.breaker.allow_request():
+            print(f"⚡ DeepSeek熔断中，跳过流式调用直接降级")
+            DEEPSEEK_CALLS.inc(outcome="circuit_open")
+            mark_degraded("circuit_open")
+            return
+        
+        request_data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        print(f"🌐 准备流式调用DeepSeek API，prompt长度: {len(prompt)}")
+        governed = None
+        overloaded = False
+        chunks = []
+        try:
+            # 并发名额在响应体读完、连接关闭后才归还
+            governed = await asyncio.wait_for(
+                self.governor.open_stream(lambda: self._open_chat_stream(request_data)), timeout=timeout
+            )
+            response = governed.response
+            if response.status_code != 200:
+                body = await response.aread()
+                print(f"❌ 流式API调用失败: {response.status_code}")
+                print(f"📋 错误响应: {body.decode('utf-8', errors='replace')}")
+                DEEPSEEK_CALLS.inc(outcome="non_200")
+                if response.status_code in RETRYABLE_STATUS:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success(governed.duration)
+                return
+            
+            async for delta in self._iter_stream_deltas(response):
+                chunks.append(delta)
+                yield delta
+            
+            content = "".join(chunks)
+            print(f"✅ 流式API调用完成，内容长度: {len(content)}")
+            DEEPSEEK_CALLS.inc(outcome="success")
+            self.breaker.record_success(governed.duration)
+            if self.cache is not None:
+                self.cache.store(cache_key, content.strip(), cacheable)
+        except asyncio.TimeoutError:
+            print(f"⏰ DeepSeek流式调用超出请求预算，已收到{len(chunks)}段")
+            DEEPSEEK_CALLS.inc(outcome="deadline_exceeded")
+            mark_degraded("deadline_exceeded")
+            self.breaker.record_cancelled()
+        except Exception as e:
+            DEEPSEEK_CALLS.inc(outcome="exception")
+            self.breaker.record_failure()
+            overloaded = isinstance(e, httpx.TransportError)
+            print(f"❌ DeepSeek流式调用异常: {e}")
+        except BaseException:
+            # 调用方提前停止读取或任务被取消
+            self.breaker.record_cancelled()
+            raise
+        finally:
+            if governed is not None:
+                await governed.aclose(overloaded)
+    
+    async def _open_chat_stream(self, request_data: Dict) -> httpx.Response:
+        """发送流式请求，返回已收到响应头、尚未读取响应体的响应"""
+        request = self.client.build_request(
+            "POST",
+            f"{self.api_base}/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json=request_data
+        )
+        with DEEPSEEK_REQUESTS_IN_FLIGHT.track_inprogress(), DEEPSEEK_REQUEST_DURATION.time():
+            return await self.client.send(request, stream=True)
+    
+    @staticmethod
+    async def _iter_stream_deltas(response: httpx.Response) -> AsyncIterator[str]:
+        """解析SSE响应体，逐个产出delta.content；每行等待时间以剩余请求预算为上限"""
+        lines = response.aiter_lines()
+        while True:
+            try:
+                line = await asyncio.wait_for(anext(lines), timeout=stage_timeout())
+            except StopAsyncIteration:
+                return
+            line = line.strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                yield delta
+    
+    @staticmethod
+    def _record_usage(usage: Optional[Dict]):
+        """累计token用量"""
+        if not usage:
+            return
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            count = usage.get(token_type)
+            if isinstance(count, (int, float)):
+                DEEPSEEK_TOKENS.inc(count, type=token_type.replace("_tokens", ""))
+    
+    @staticmethod
+    def _strip_code_fence(content: str) -> str:
+        """去掉包裹内容的markdown代码块标记"""
+        content = content.strip()
+        if content.startswith("```json"):
+            content = content[7:]
+        elif content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        return content.strip()
+    
+    @classmethod
+    def _is_json_content(cls, content: str) -> bool:
+        """判断回复是否为可解析的JSON（只缓存结构正确的结果）"""
+        try:
+            json.loads(cls._strip_code_fence(content))
+            return True
+        except ValueError:
+            return False
     
     async def analyze_response_risk(self, response_text: str, verification_tactics: List[Dict] = None) -> Dict[str, any]:
         """分析用户回答的风险特征"""
@@ -160,71 +431,29 @@ class DeepSeekService:
         }}
         """
         
+        print(f"🌐 准备调用DeepSeek API进行动态分析")
+        print(f"📤 用户回答: {response_text}")
+        content = await self._cached_completion(prompt, 0.3, cacheable=self._is_json_content)
+        if content is None:
+            print(f"❌ 动态分析API调用失败")
+            DEEPSEEK_CALLS.inc(outcome="fallback")
+            return self._fallback_analysis(response_text)
+        
+        print(f"📝 AI返回的原始内容: {content}")
+        # 尝试解析JSON，处理可能被代码块包裹的情况
         try:
-            print(f"🌐 准备调用DeepSeek API进行动态分析")
-            print(f"🔑 API密钥: {self.api_key[:10]}...")
-            print(f"📤 用户回答: {response_text}")
-            
-            async with httpx.AsyncClient() as client:
-                request_data = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "max_tokens": self.max_tokens,
-                    "temperature": 0.3
-                }
-                
-                print(f"📤 发送动态分析请求")
-                
-                response = await client.post(
-                    f"{self.api_base}/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=request_data,
-                    timeout=30.0
-                )
-                
-                print(f"📥 收到响应，状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"✅ 动态分析API调用成功")
-                    content = result["choices"][0]["message"]["content"].strip()
-                    print(f"📝 AI返回的原始内容: {content}")
-                    
-                    # 尝试解析JSON，处理可能被代码块包裹的情况
-                    try:
-                        # 如果内容被```json```包裹，先提取出来
-                        if content.startswith("```json") and content.endswith("```"):
-                            content = content[7:-3].strip()  # 移除```json和```
-                            print(f"🧹 移除JSON代码块标记后: {content}")
-                        elif content.startswith("```") and content.endswith("```"):
-                            content = content[3:-3].strip()  # 移除```和```
-                            print(f"🧹 移除代码块标记后: {content}")
-                        
-                        analysis = json.loads(content)
-                        print(f"✅ 动态分析JSON解析成功: {analysis}")
-                        return analysis
-                    except json.JSONDecodeError:
-                        print(f"❌ 动态分析JSON解析失败: {content}")
-                        return self._fallback_analysis(response_text)
-                else:
-                    print(f"❌ 动态分析API调用失败: {response.status_code}")
-                    print(f"📋 错误响应: {response.text}")
-                    return self._fallback_analysis(response_text)
-                    
-        except Exception as e:
-            print(f"DeepSeek API调用异常: {e}")
+            analysis = json.loads(self._strip_code_fence(content))
+            print(f"✅ 动态分析JSON解析成功: {analysis}")
+            return analysis
+        except json.JSONDecodeError:
+            print(f"❌ 动态分析JSON解析失败: {content}")
+            DEEPSEEK_CALLS.inc(outcome="json_parse_failure")
+            DEEPSEEK_CALLS.inc(outcome="fallback")
             return self._fallback_analysis(response_text)
     
     def _fallback_tactic(self, rule_name: str, knowledge_item: Dict[str, str]) -> str:
         """备用话术生成"""
+        mark_degraded("tactic_fallback")
         industry = knowledge_item.get("影响行业", "相关行业")
         policy = knowledge_item.get("政策名称", "新政策")
         clause = knowledge_item.get("关键条款", "重要条款")
@@ -232,49 +461,6 @@ class DeepSeekService:
         return f"听说{industry}最近{policy}变化很大，{clause}，您有了解吗？"
     
     def _fallback_analysis(self, response_text: str) -> Dict[str, any]:
-        """备用风险分析"""
-        # 扩展的关键词匹配分析
-        fuzzy_words = ["大概", "可能", "不清楚", "不太确定", "应该吧", "不知道", "忘了", "记不清", "说不准"]
-        attack_words = ["现实", "查户口", "太物质", "问太细", "商业机密", "不想说", "不方便", "隐私"]
-        topic_shift_words = ["换个话题", "说点别的", "这个不重要", "先不说这个"]
-        
-        # 计算各项分数
-        fuzzy_score = sum(25 for word in fuzzy_words if word in response_text)
-        attack_score = sum(40 for word in attack_words if word in response_text)
-        topic_shift_score = sum(30 for word in topic_shift_words if word in response_text)
-        
-        # 如果回答太短（少于5个字），增加模糊回避分数
-        if len(response_text.strip()) < 5:
-            fuzzy_score += 20
-        
-        # 如果回答包含否定词，增加模糊回避分数
-        negative_words = ["不", "没", "无", "否", "别", "莫"]
-        if any(word in response_text for word in negative_words):
-            fuzzy_score += 15
-        
-        # 计算精准回答分数（反向计算，但确保不为负数）
-        total_risk = fuzzy_score + attack_score + topic_shift_score
-        precise_score = max(0, 100 - total_risk)
-        
-        # 计算总体风险分数
-        overall_score = min(total_risk, 100)
-        
-        # 生成风险标签
-        risk_tags = []
-        if fuzzy_score > 0:
-            risk_tags.append("模糊回避")
-        if attack_score > 0:
-            risk_tags.append("情绪攻击")
-        if topic_shift_score > 0:
-            risk_tags.append("话题转移")
-        if precise_score < 50:
-            risk_tags.append("信息不足")
-        
-        return {
-            "fuzzy_evasion": min(fuzzy_score, 100),
-            "emotional_attack": min(attack_score, 100),
-            "topic_shift": min(topic_shift_score, 100),
-            "precise_answer": max(precise_score, 0),
-            "risk_tags": [tag for tag in risk_tags if tag],
-            "overall_risk_score": overall_score
-        }
+        """备用风险分析 - 本地词表评分"""
+        mark_degraded("dynamic_analysis_fallback")
+        return self.response_scorer.score(response_text)
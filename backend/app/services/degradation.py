@@ -0,0 +1,64 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+from app.core.metrics import DEGRADED_RESULTS
+
+
+@dataclass
+class DegradationTracker:
+    """记录一次分析过程中是否走了降级路径（本地规则/默认话术代替LLM结果）"""
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.reasons)
+
+    def mark(self, reason: str):
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+
+
+# 当前分析的降级记录，随异步上下文传递到各阶段（含并发子任务）
+_current_tracker: ContextVar[Optional[DegradationTracker]] = ContextVar("degradation_tracker", default=None)
+
+
+def current_degradation() -> Optional[DegradationTracker]:
+    return _current_tracker.get()
+
+
+def mark_degraded(reason: str):
+    """标记当前分析使用了降级路径，不在分析上下文中时只计入指标"""
+    DEGRADED_RESULTS.inc(reason=reason)
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.mark(reason)
+
+
+@contextmanager
+def degradation_scope():
+    """建立降级记录作用域；已在作用域内时（嵌套调用）复用外层记录"""
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        yield tracker
+        return
+    tracker = DegradationTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def reports_degradation(func):
+    """异步函数装饰器：在降级记录作用域内执行，并在dict结果中写入degraded/degraded_reasons"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with degradation_scope() as tracker:
+            result = await func(*args, **kwargs)
+        if isinstance(result, dict):
+            result["degraded"] = tracker.degraded
+            result["degraded_reasons"] = list(tracker.reasons)
+        return result
+    return wrapper
@@ -0,0 +1,57 @@
+import asyncio
+import httpx
+from typing import Optional
+from app.core.config import settings
+
+# HTTP/2 需要额外安装 h2（pip install "httpx[http2]"），未安装时自动退回 HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 进程级共享客户端，复用连接池避免每次调用重复 DNS/TCP/TLS 握手
+_client: Optional[httpx.AsyncClient] = None
+# 连接池中的连接绑定创建时的事件循环
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """按配置创建带连接池的异步HTTP客户端"""
+    http2 = settings.deepseek_http2 and HTTP2_AVAILABLE
+    if settings.deepseek_http2 and not HTTP2_AVAILABLE:
+        print("⚠️  Warning: 未安装h2，DeepSeek客户端使用HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.deepseek_max_connections,
+        max_keepalive_connections=settings.deepseek_max_keepalive_connections,
+        keepalive_expiry=settings.deepseek_keepalive_expiry
+    )
+    timeout = httpx.Timeout(
+        settings.deepseek_timeout,
+        connect=settings.deepseek_connect_timeout,
+        pool=settings.deepseek_pool_timeout
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享HTTP客户端，首次调用、关闭后或事件循环变化时重新创建"""
+    global _client, _client_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = build_http_client()
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client():
+    """关闭共享HTTP客户端（应用关闭时调用）"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+        print("🔌 DeepSeek HTTP连接池已关闭")
@@ -0,0 +1,89 @@
+import json
+from typing import Any, List, Optional
+
+
+class JSONArrayStreamParser:
+    """增量解析流式返回的JSON，顶层对象中指定key的数组每完成一个元素就立即产出
+
+    只跟踪字符串/转义状态和括号深度，不要求输入在任何时刻是合法JSON，
+    因此前面的```json代码块标记、说明文字等都会被忽略。只产出对象或数组类型的元素。
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._key_matched = False
+        self._array_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self.finished = False
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        """追加一段文本，返回本段中完成的数组元素"""
+        self._buffer += chunk
+        if self.finished:
+            return []
+        items = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._array_depth is None:
+                        self._last_key = buffer[self._string_start + 1:i]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                self._key_matched = self._depth == 1 and self._last_key == self.key
+            elif char == ",":
+                if self._depth == 1:
+                    self._last_key = None
+                    self._key_matched = False
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._key_matched and self._depth == 2 and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif self._array_depth is not None and self._depth == self._array_depth + 1 and self._element_start is None:
+                    self._element_start = i
+            elif char in "}]":
+                if self._array_depth is not None:
+                    if self._depth == self._array_depth + 1 and self._element_start is not None:
+                        element = self._decode(buffer[self._element_start:i + 1])
+                        self._element_start = None
+                        if element is not None:
+                            items.append(element)
+                            self.emitted += 1
+                    elif char == "]" and self._depth == self._array_depth:
+                        self.finished = True
+                        self._depth -= 1
+                        self._pos = i + 1
+                        return items
+                self._depth -= 1
+            i += 1
+        self._pos = i
+        return items
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    @property
+    def text(self) -> str:
+        """目前收到的全部文本"""
+        return self._buffer
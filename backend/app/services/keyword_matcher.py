@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式串自动机 - 一次扫描找出文本中所有模式串"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        self._built = False
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str):
+        """添加模式串，空串会被忽略"""
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        if pattern not in self._output[node]:
+            self._output[node] = self._output[node] + (pattern,)
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """按BFS顺序计算失败指针，并把失败链上的输出合并到当前节点"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+        return self
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """逐个产出 (起始位置, 模式串)，包含重叠匹配"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                for pattern in output[node]:
+                    yield index - len(pattern) + 1, pattern
+
+
+class ContradictionRuleError(ValueError):
+    """contradiction_rules.json 中的规则写法有误"""
+
+    def __init__(self, rule_name: str, message: str):
+        super().__init__(f"矛盾规则「{rule_name}」: {message}")
+        self.rule_name = rule_name
+
+
+def _contradiction_groups(rule_name: str, rule_config) -> List[List[str]]:
+    """校验一条矛盾规则并返回去掉空词后的互斥词组，写法有误时抛出ContradictionRuleError"""
+    if not isinstance(rule_config, dict):
+        raise ContradictionRuleError(rule_name, "规则配置必须是对象")
+    if not isinstance(rule_config.get("风险值", 0), (int, float)):
+        raise ContradictionRuleError(rule_name, "风险值必须是数字")
+    groups = rule_config.get("互斥词组", [])
+    if not isinstance(groups, list) or not all(
+        isinstance(group, list) and all(isinstance(term, str) for term in group) for group in groups
+    ):
+        raise ContradictionRuleError(rule_name, "互斥词组必须是字符串数组的数组")
+    groups = [[term for term in group if term] for group in groups]
+    if sum(1 for group in groups if group) < 2:
+        raise ContradictionRuleError(rule_name, "至少需要两组非空的互斥词")
+    return groups
+
+
+class ContradictionMatcher:
+    """把 contradiction_rules.json 中所有互斥词组编译成一个自动机
+
+    每条矛盾规则包含若干组互斥的词，文本中出现两组及以上的词即视为矛盾。
+    规则写法有误时抛出ContradictionRuleError，配置接口写入前用同一逻辑校验。
+    """
+
+    def __init__(self, contradiction_rules: Dict):
+        if not isinstance(contradiction_rules, dict):
+            raise ContradictionRuleError("*", "矛盾规则配置必须是对象")
+        self._rules: List[Tuple[str, Dict, List[List[str]]]] = []
+        # 词 -> [(规则序号, 词组序号)]
+        self._owners: Dict[str, List[Tuple[int, int]]] = {}
+        automaton = AhoCorasick()
+        for rule_index, (rule_name, rule_config) in enumerate(contradiction_rules.items()):
+            groups = _contradiction_groups(rule_name, rule_config)
+            self._rules.append((rule_name, rule_config, groups))
+            for group_index, group in enumerate(groups):
+                for term in group:
+                    self._owners.setdefault(term, []).append((rule_index, group_index))
+                    automaton.add(term)
+        self._automaton = automaton.build()
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._rules)
+
+    def scan(self, text: str) -> List[Dict]:
+        """单次扫描文本，按配置顺序返回命中两组及以上互斥词的规则及各词出现位置"""
+        # 规则序号 -> 词组序号 -> 词 -> 位置
+        hits: Dict[int, Dict[int, Dict[str, List[int]]]] = {}
+        for start, term in self._automaton.finditer(text):
+            for rule_index, group_index in self._owners[term]:
+                hits.setdefault(rule_index, {}).setdefault(group_index, {}).setdefault(term, []).append(start)
+
+        contradictions = []
+        for rule_index in sorted(hits):
+            groups = hits[rule_index]
+            if len(groups) < 2:
+                continue
+            rule_name, rule_config, _ = self._rules[rule_index]
+            contradictions.append({
+                "rule_name": rule_name,
+                "risk_value": rule_config.get("风险值", 0),
+                "terms": [
+                    {"term": term, "group": group_index, "offsets": offsets}
+                    for group_index in sorted(groups)
+                    for term, offsets in groups[group_index].items()
+                ]
+            })
+        return contradictions
@@ -0,0 +1,99 @@
+import asyncio
+import csv
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# 预览行数
+PREVIEW_ROWS = 3
+
+
+def describe_csv(csv_file: Path, preview_rows: int = PREVIEW_ROWS) -> Dict:
+    """流式读取CSV，统计行数并取前几行预览，不把整个文件读入内存"""
+    with open(csv_file, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        columns = [name.strip() for name in next(reader, [])]
+        preview = []
+        rows = 0
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            rows += 1
+            if len(preview) < preview_rows:
+                preview.append(dict(zip(columns, (value.strip() for value in values))))
+    return {
+        "filename": csv_file.name,
+        "rows": rows,
+        "columns": columns,
+        "preview": preview
+    }
+
+
+class KnowledgeCatalog:
+    """知识库文件目录缓存
+
+    每个文件的行数、列名和预览按(mtime_ns, size)签名缓存，只有新增或变化的文件才重新流式统计，
+    统计放到线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, knowledge_dir: Path):
+        self.knowledge_dir = knowledge_dir
+        self._entries: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        self._lock = asyncio.Lock()
+
+    def _cached(self, csv_file: Path, signature: Tuple[int, int]) -> Optional[Dict]:
+        entry = self._entries.get(csv_file.name)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return None
+
+    def _describe(self, csv_file: Path, signature: Tuple[int, int]) -> Dict:
+        try:
+            info = describe_csv(csv_file)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"读取知识库文件失败 {csv_file}: {e}")
+            info = {"filename": csv_file.name, "rows": 0, "columns": [], "preview": [], "error": str(e)}
+        self._entries[csv_file.name] = (signature, info)
+        return info
+
+    def update(self, csv_file: Path, info: Dict):
+        """写入已知的文件信息（如上传时已统计过），避免再次读取"""
+        stat = csv_file.stat()
+        self._entries[csv_file.name] = ((stat.st_mtime_ns, stat.st_size), info)
+
+    async def list_files(self) -> Dict[str, Dict]:
+        """返回 文件名(不含扩展名) -> 文件信息"""
+        files = {}
+        if self.knowledge_dir.exists():
+            for csv_file in sorted(self.knowledge_dir.glob("*.csv")):
+                try:
+                    stat = csv_file.stat()
+                except OSError:
+                    continue
+                files[csv_file] = (stat.st_mtime_ns, stat.st_size)
+
+        stale = [(path, signature) for path, signature in files.items() if self._cached(path, signature) is None]
+        if stale:
+            # 串行化重新统计，避免并发请求重复读取同一批大文件
+            async with self._lock:
+                for path, signature in stale:
+                    if self._cached(path, signature) is None:
+                        await asyncio.to_thread(self._describe, path, signature)
+
+        present = {path.name for path in files}
+        for name in list(self._entries):
+            if name not in present:
+                del self._entries[name]
+        return {path.stem: self._entries[path.name][1] for path, signature in files.items() if path.name in self._entries}
+
+
+# 进程级共享目录缓存
+_catalog: Optional[KnowledgeCatalog] = None
+
+
+def get_knowledge_catalog() -> KnowledgeCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = KnowledgeCatalog(Path(settings.knowledge_dir))
+    return _catalog
@@ -0,0 +1,129 @@
+import heapq
+import math
+import random
+import re
+from array import array
+from operator import add, itemgetter
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.services.knowledge_store import KnowledgeTable
+
+# 列权重：命中行业、政策名称比命中条款正文更能说明相关
+DEFAULT_COLUMN_WEIGHTS = {"影响行业": 2.0, "政策名称": 1.5, "关键条款": 1.0}
+# 单次检索最多累加的倒排项数量，超出后更高频的检索词不再参与打分
+DEFAULT_POSTINGS_BUDGET = 2048
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]*|[\u4e00-\u9fff]+")
+
+
+def text_terms(text: str) -> Set[str]:
+    """切分检索词：中文取相邻二字组（单字保留原字），英文按整词小写；纯数字忽略"""
+    terms = set()
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token.isascii() or len(token) == 1:
+            terms.add(token)
+        else:
+            terms.update(map(add, token, token[1:]))
+    return terms
+
+
+class KnowledgeIndex:
+    """知识库表的倒排索引
+
+    检索内容完全相同的行（各列切分出的检索词一致）合并为一个文档，倒排表只记录文档，
+    政策库中大量重复的行业/条款组合因此不会放大索引和检索开销。
+    检索词 -> (文档号数组, 列权重数组)；同一检索词出现在文档的多列时各列权重累加。
+    打分为命中检索词的 idf * 列权重之和，低频词优先累加。
+    """
+
+    def __init__(self, table: KnowledgeTable, column_weights: Optional[Dict[str, float]] = None):
+        weights = DEFAULT_COLUMN_WEIGHTS if column_weights is None else column_weights
+        self.size = len(table)
+        # 列权重按x10存入单字节数组
+        column_scale = [max(1, min(255, round(weights.get(name, 1.0) * 10))) for name in table.columns]
+
+        # 字符串下标 -> 检索词集合编号（切分结果相同的字符串共用编号）
+        term_set_ids: Dict[frozenset, int] = {}
+        string_term_set = []
+        for string_id in range(table.string_count):
+            terms = frozenset(text_terms(table.string(string_id)))
+            string_term_set.append(term_set_ids.setdefault(terms, len(term_set_ids)))
+        term_sets = list(term_set_ids)
+        # 各列检索词集合编号组成的元组 -> 文档号
+        doc_ids: Dict[Tuple[int, ...], int] = {}
+        row_docs = array("I")
+        lookup = string_term_set.__getitem__
+        for row in range(self.size):
+            key = tuple(map(lookup, table.row_string_ids(row)))
+            row_docs.append(doc_ids.setdefault(key, len(doc_ids)))
+
+        # 按列把文档归到各自的检索词集合下，再按集合整批写入倒排表
+        column_docs: List[Dict[int, array]] = [{} for _ in column_scale]
+        for key, doc in doc_ids.items():
+            for position, set_id in enumerate(key):
+                docs = column_docs[position].get(set_id)
+                if docs is None:
+                    docs = column_docs[position][set_id] = array("I")
+                docs.append(doc)
+        postings: Dict[str, Tuple[array, array]] = {}
+        for docs_by_set, scale in zip(column_docs, column_scale):
+            for set_id, docs in docs_by_set.items():
+                scales = array("B", [scale]) * len(docs)
+                for term in term_sets[set_id]:
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = (array("I"), array("B"))
+                    entry[0].extend(docs)
+                    entry[1].extend(scales)
+        self.postings = postings
+        self.documents = len(doc_ids)
+
+        # 文档 -> 行号（按文档分组的连续数组 + 偏移）
+        counts = array("I", [0]) * (self.documents + 1)
+        for doc in row_docs:
+            counts[doc + 1] += 1
+        for doc in range(self.documents):
+            counts[doc + 1] += counts[doc]
+        self._doc_offsets = counts
+        cursor = array("I", counts[:-1])
+        doc_rows = array("I", [0]) * self.size
+        for row, doc in enumerate(row_docs):
+            doc_rows[cursor[doc]] = row
+            cursor[doc] += 1
+        self._doc_rows = doc_rows
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        postings_budget: int = DEFAULT_POSTINGS_BUDGET,
+        rng: random.Random = random
+    ) -> List[Tuple[int, float]]:
+        """返回最相关的top_k行: [(行号, 得分)]，得分从高到低；内容相同的行中随机取一行"""
+        matched = [self.postings[term] for term in text_terms(query) if term in self.postings]
+        if not matched or top_k <= 0:
+            return []
+        matched.sort(key=lambda entry: len(entry[0]))
+
+        scores: Dict[int, float] = {}
+        visited = 0
+        for docs, scales in matched:
+            df = len(docs)
+            if scores and visited + df > postings_budget:
+                # 剩余都是更高频（idf更低）的检索词
+                break
+            idf = math.log(1 + self.documents / df) / 10
+            limit = postings_budget - visited
+            get = scores.get
+            for doc, scale in zip(docs[:limit], scales[:limit]):
+                scores[doc] = get(doc, 0.0) + idf * scale
+            visited += min(df, limit)
+
+        results = []
+        for doc, score in heapq.nlargest(top_k, scores.items(), key=itemgetter(1)):
+            start, end = self._doc_offsets[doc], self._doc_offsets[doc + 1]
+            results.append((self._doc_rows[rng.randrange(start, end)], score))
+        return results
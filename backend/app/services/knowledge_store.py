@@ -0,0 +1,248 @@
+import csv
+import json
+import mmap
+import os
+import random
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 内存映射文件格式：魔数 + 头长度 + JSON头 + 单元格下标 + 字符串偏移 + 字符串数据
+MMAP_MAGIC = b"KBT1"
+MMAP_SUFFIX = ".kbt"
+_ALIGN = 8
+
+
+def _pad(length: int) -> int:
+    return (-length) % _ALIGN
+
+
+class KnowledgeTable:
+    """列式知识库表
+
+    所有单元格字符串去重后按UTF-8拼接成一块连续数据，单元格只保存4字节的字符串下标，
+    避免每行一个dict、每个单元格一个str对象。读取时只解码用到的单元格。
+    数据既可以在进程内存中（array/bytes），也可以来自多个worker共享的内存映射文件。
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        cells: Sequence[int],
+        offsets: Sequence[int],
+        blob,
+        source: Optional[Tuple[int, int]] = None,
+        mapped: Optional[mmap.mmap] = None,
+        skipped_rows: int = 0
+    ):
+        self.columns = list(columns)
+        self._cells = cells
+        self._offsets = offsets
+        self._blob = blob
+        self.source = source
+        # 加载CSV时因列数与表头不符而跳过的行数
+        self.skipped_rows = skipped_rows
+        # 持有映射对象，保证表存活期间映射有效
+        self._mapped = mapped
+        self._width = len(self.columns)
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return len(self._cells) // self._width if self._width else 0
+
+    @property
+    def mmapped(self) -> bool:
+        return self._mapped is not None
+
+    @property
+    def nbytes(self) -> int:
+        """单元格、偏移和字符串数据占用的字节数"""
+        return len(self._cells) * 4 + len(self._offsets) * 8 + len(self._blob)
+
+    def _string(self, index: int) -> str:
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    @property
+    def string_count(self) -> int:
+        """去重后的字符串数量"""
+        return len(self._offsets) - 1
+
+    def string(self, index: int) -> str:
+        """按字符串下标解码"""
+        return self._string(index)
+
+    def row_string_ids(self, row: int) -> Sequence[int]:
+        """该行各列的字符串下标（相同字符串下标相同）"""
+        base = row * self._width
+        return self._cells[base:base + self._width]
+
+    def value(self, row: int, column: str) -> str:
+        return self._string(self._cells[row * self._width + self._column_index[column]])
+
+    def row(self, row: int) -> Dict[str, str]:
+        """按需生成单行dict"""
+        if row < 0:
+            row += len(self)
+        base = row * self._width
+        return {name: self._string(self._cells[base + i]) for i, name in enumerate(self.columns)}
+
+    def random_row(self, rng: random.Random = random) -> Dict[str, str]:
+        return self.row(rng.randrange(len(self)))
+
+    def column(self, name: str) -> Iterator[str]:
+        """逐行读取某一列"""
+        position = self._column_index[name]
+        for start in range(position, len(self._cells), self._width):
+            yield self._string(self._cells[start])
+
+    @classmethod
+    def from_rows(cls, columns: List[str], rows, source: Optional[Tuple[int, int]] = None) -> "KnowledgeTable":
+        """从行迭代器构建，相同字符串只保存一份"""
+        builder = KnowledgeTableBuilder(columns)
+        for values in rows:
+            builder.add(values)
+        return builder.build(source)
+
+    @classmethod
+    def from_csv(cls, csv_file: Path) -> "KnowledgeTable":
+        """流式读取CSV，空行跳过；列数与表头不符的行跳过并告警，跳过行数记在skipped_rows"""
+        stat = csv_file.stat()
+        skipped: List[int] = []
+        with open(csv_file, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            builder = KnowledgeTableBuilder([name.strip() for name in next(reader, [])])
+            for values in reader:
+                if len(values) == len(builder.columns):
+                    builder.add([value.strip() for value in values])
+                elif any(value.strip() for value in values):
+                    skipped.append(reader.line_num)
+        if skipped:
+            lines = "、".join(str(line) for line in skipped[:10]) + ("等" if len(skipped) > 10 else "")
+            print(f"⚠️ 知识库文件{csv_file.name}有{len(skipped)}行列数与表头不符，已跳过（第{lines}行）")
+        return builder.build(source=(stat.st_mtime_ns, stat.st_size), skipped_rows=len(skipped))
+
+    def save(self, path: Path):
+        """写入内存映射格式，先写临时文件再原子替换"""
+        header = json.dumps({
+            "columns": self.columns,
+            "cells": len(self._cells),
+            "strings": len(self._offsets) - 1,
+            "source": list(self.source) if self.source else None,
+            "skipped_rows": self.skipped_rows,
+            "byteorder": sys.byteorder
+        }, ensure_ascii=False).encode("utf-8")
+        header += b" " * _pad(8 + len(header))
+        cells = self._cells if isinstance(self._cells, array) else array("I", self._cells)
+        offsets = self._offsets if isinstance(self._offsets, array) else array("Q", self._offsets)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(MMAP_MAGIC)
+                f.write(len(header).to_bytes(4, "little"))
+                f.write(header)
+                f.write(cells.tobytes())
+                f.write(b"\0" * _pad(len(cells) * 4))
+                f.write(offsets.tobytes())
+                f.write(bytes(self._blob))
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    @classmethod
+    def open_mmap(cls, path: Path, source: Optional[Tuple[int, int]] = None) -> Optional["KnowledgeTable"]:
+        """以只读方式映射文件；格式不符或与源文件签名不一致时返回None"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < 8:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:4] != MMAP_MAGIC:
+            return None
+        header_len = int.from_bytes(mapped[4:8], "little")
+        header = json.loads(mapped[8:8 + header_len].decode("utf-8"))
+        stored = tuple(header["source"]) if header.get("source") else None
+        if header.get("byteorder") != sys.byteorder or (source is not None and stored != source):
+            return None
+
+        view = memoryview(mapped)
+        start = 8 + header_len
+        cells_end = start + header["cells"] * 4
+        offsets_start = cells_end + _pad(cells_end - start)
+        offsets_end = offsets_start + (header["strings"] + 1) * 8
+        cells = view[start:cells_end].cast("I")
+        offsets = view[offsets_start:offsets_end].cast("Q")
+        blob = view[offsets_end:offsets_end + offsets[-1]]
+        return cls(
+            header["columns"], cells, offsets, blob,
+            source=stored, mapped=mapped, skipped_rows=header.get("skipped_rows", 0)
+        )
+
+
+class KnowledgeTableBuilder:
+    """逐行构建KnowledgeTable（如上传时边接收边构建），相同字符串只保存一份"""
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self._width = len(self.columns)
+        self._interned: Dict[str, int] = {}
+        self._cells = array("I")
+        self._offsets = array("Q", [0])
+        self._blob = bytearray()
+
+    def add(self, values: Sequence[str]):
+        """追加一行，多余的列忽略，缺少的列补空字符串"""
+        if len(values) != self._width:
+            values = list(values[:self._width]) + [""] * (self._width - len(values))
+        interned = self._interned
+        for value in values:
+            index = interned.get(value)
+            if index is None:
+                index = len(interned)
+                interned[value] = index
+                self._blob += value.encode("utf-8")
+                self._offsets.append(len(self._blob))
+            self._cells.append(index)
+
+    def build(self, source: Optional[Tuple[int, int]] = None, skipped_rows: int = 0) -> KnowledgeTable:
+        return KnowledgeTable(
+            self.columns, self._cells, self._offsets, bytes(self._blob), source=source, skipped_rows=skipped_rows
+        )
+
+
+def share_knowledge_table(csv_file: Path, table: KnowledgeTable, mmap_dir: Optional[Path]) -> KnowledgeTable:
+    """配置了mmap_dir时把已构建的表写成映射文件并改为映射读取，其他worker重载时可直接映射"""
+    if mmap_dir is None:
+        return table
+    cache_file = mmap_dir / f"{csv_file.stem}{MMAP_SUFFIX}"
+    try:
+        table.save(cache_file)
+        return KnowledgeTable.open_mmap(cache_file, table.source) or table
+    except OSError as e:
+        print(f"⚠️ 知识库映射文件写入失败，使用进程内存储 {cache_file}: {e}")
+        return table
+
+
+def load_knowledge_table(csv_file: Path, mmap_dir: Optional[Path] = None) -> KnowledgeTable:
+    """加载知识库表
+
+    配置了mmap_dir时，优先映射与CSV签名一致的已转换文件（多个worker共享同一份物理页）；
+    不存在或已过期则由当前进程转换写入后再映射。
+    """
+    if mmap_dir is None:
+        return KnowledgeTable.from_csv(csv_file)
+
+    stat = csv_file.stat()
+    source = (stat.st_mtime_ns, stat.st_size)
+    cache_file = mmap_dir / f"{csv_file.stem}{MMAP_SUFFIX}"
+    if cache_file.exists():
+        try:
+            table = KnowledgeTable.open_mmap(cache_file, source)
+            if table is not None:
+                return table
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ 知识库映射文件无效，重新生成 {cache_file}: {e}")
+
+    return share_knowledge_table(csv_file, KnowledgeTable.from_csv(csv_file), mmap_dir)
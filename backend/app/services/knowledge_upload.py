@@ -0,0 +1,113 @@
+import codecs
+import csv
+from typing import Dict, List, Optional, Tuple
+
+from app.services.knowledge_catalog import PREVIEW_ROWS
+from app.services.knowledge_store import KnowledgeTable, KnowledgeTableBuilder
+
+
+class CSVValidationError(ValueError):
+    """上传的CSV格式错误"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"第{line}行: {message}" if line else message)
+        self.line = line
+
+
+class StreamingCSVValidator:
+    """逐块校验上传的CSV，边接收边构建知识库表
+
+    按行切分后只解析到最后一条完整记录（引号成对）为止，跨块的多行字段留到下一块再解析。
+    校验表头非空且不重复、每行列数与表头一致、内容为UTF-8；空行跳过。
+    """
+
+    def __init__(self, preview_rows: int = PREVIEW_ROWS):
+        self.preview_rows = preview_rows
+        # utf-8-sig 同时兼容带BOM的文件（Excel导出）
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pending = ""
+        # 尚未闭合引号的记录所占的行
+        self._carry: List[str] = []
+        self._open_quote = False
+        self._line = 0
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+        self.preview: List[Dict[str, str]] = []
+        self._builder: Optional[KnowledgeTableBuilder] = None
+
+    def feed(self, chunk: bytes):
+        self._consume(self._decode(chunk, final=False))
+
+    def finish(self):
+        """处理剩余数据并完成校验"""
+        self._consume(self._decode(b"", final=True) + "\n")
+        if self._carry:
+            raise CSVValidationError(self._line + 1, "引号未闭合")
+        if self.columns is None:
+            raise CSVValidationError(0, "文件为空或缺少表头")
+
+    def build_table(self, source: Optional[Tuple[int, int]] = None) -> KnowledgeTable:
+        """校验通过后返回接收过程中构建好的表"""
+        return self._builder.build(source)
+
+    def info(self, filename: str) -> Dict:
+        return {"filename": filename, "rows": self.rows, "columns": self.columns or [], "preview": self.preview}
+
+    def _decode(self, chunk: bytes, final: bool) -> str:
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            raise CSVValidationError(self._line + len(self._carry) + 1, "文件不是UTF-8编码")
+
+    def _consume(self, text: str):
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        # 保留换行符，引号内的多行字段才能原样还原
+        lines = [line + "\n" for line in lines]
+        complete = 0
+        open_quote = self._open_quote
+        for index, line in enumerate(lines):
+            if line.count('"') % 2:
+                open_quote = not open_quote
+            if not open_quote:
+                complete = index + 1
+        self._open_quote = open_quote
+        if not complete:
+            self._carry.extend(lines)
+            return
+        batch = self._carry + lines[:complete]
+        self._carry = lines[complete:]
+        self._parse(batch)
+
+    def _parse(self, lines: List[str]):
+        reader = csv.reader(lines)
+        try:
+            for values in reader:
+                line = self._line + reader.line_num
+                if self.columns is None:
+                    self._set_header(values, line)
+                elif not any(value.strip() for value in values):
+                    continue
+                elif len(values) != len(self.columns):
+                    raise CSVValidationError(line, f"有{len(values)}列，表头为{len(self.columns)}列")
+                else:
+                    values = [value.strip() for value in values]
+                    self.rows += 1
+                    if len(self.preview) < self.preview_rows:
+                        self.preview.append(dict(zip(self.columns, values)))
+                    self._builder.add(values)
+        except csv.Error as e:
+            raise CSVValidationError(self._line + reader.line_num, str(e))
+        self._line += len(lines)
+
+    def _set_header(self, values: List[str], line: int):
+        columns = [value.strip() for value in values]
+        if not any(columns):
+            # 表头前的空行
+            return
+        if not all(columns):
+            raise CSVValidationError(line, "表头存在空列名")
+        if len(set(columns)) != len(columns):
+            raise CSVValidationError(line, "表头存在重复列名")
+        self.columns = columns
+        self._builder = KnowledgeTableBuilder(columns)
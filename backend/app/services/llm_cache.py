@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import LLM_CACHE_REQUESTS
+from app.services.deadline import stage_timeout
+
+# 当前请求是否绕过LLM缓存（由API层按请求设置，随异步上下文传递到各阶段）
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """归一化提示词：合并空白，避免缩进差异导致缓存失效"""
+    return " ".join(prompt.split())
+
+
+def make_cache_key(model: str, temperature: float, prompt: str) -> str:
+    """由模型、温度和归一化提示词生成缓存键"""
+    raw = f"{model}\x1f{temperature}\x1f{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """LLM结果缓存 - LRU + TTL淘汰，相同请求并发时只发起一次调用"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_call(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[Optional[str]]],
+        bypass: bool = False,
+        cacheable: Callable[[str], bool] = None
+    ) -> Optional[str]:
+        """命中直接返回；未命中时调用call，结果为None（调用失败）不缓存
+
+        相同key并发时只有一个调用方（领头）发起调用，其他调用方等待；领头方没有拿到结果时
+        （失败、被取消或超出它自己的预算），等待方不共享失败，而是重新查询或自己发起调用。
+        """
+        if bypass:
+            self.bypassed += 1
+            LLM_CACHE_REQUESTS.inc(result="bypass")
+            value = await call()
+            self.store(key, value, cacheable)
+            return value
+
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                LLM_CACHE_REQUESTS.inc(result="hit")
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # 同一请求正在进行中，在自己的剩余预算内等待它的结果
+            self.coalesced += 1
+            LLM_CACHE_REQUESTS.inc(result="coalesced")
+            try:
+                value = await asyncio.wait_for(asyncio.shield(inflight), timeout=stage_timeout())
+            except asyncio.TimeoutError:
+                # 自己的预算先用完，不再等待，由call按剩余预算走降级
+                value = await call()
+                self.store(key, value, cacheable)
+                return value
+            if value is not None:
+                return value
+            # 领头的调用被取消、超出它自己的预算或失败，没有可共享的结果，重新查询或自己发起调用
+
+        self.misses += 1
+        LLM_CACHE_REQUESTS.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        value = None
+        try:
+            value = await call()
+            self.store(key, value, cacheable)
+            return value
+        finally:
+            # 只有成功的结果会被等待方直接使用，None（失败、超时、被取消）时等待方自行重试
+            future.set_result(value)
+            self._inflight.pop(key, None)
+
+    def lookup(self, key: str, bypass: bool = False) -> Optional[str]:
+        """直接查询缓存并计入统计（流式调用无法合并并发请求，不走get_or_call）"""
+        if bypass:
+            self.bypassed += 1
+            LLM_CACHE_REQUESTS.inc(result="bypass")
+            return None
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            LLM_CACHE_REQUESTS.inc(result="hit")
+        else:
+            self.misses += 1
+            LLM_CACHE_REQUESTS.inc(result="miss")
+        return value
+
+    def store(self, key: str, value: Optional[str], cacheable: Callable[[str], bool] = None):
+        """写入结果；None或不满足cacheable的结果不缓存"""
+        if value is None or (cacheable and not cacheable(value)):
+            return
+        self.set(key, value)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+        }
+
+
+# 进程级共享缓存
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """获取共享LLM缓存，配置关闭时返回None"""
+    global _cache
+    if not settings.llm_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = LLMCache(settings.llm_cache_max_entries, settings.llm_cache_ttl)
+    return _cache
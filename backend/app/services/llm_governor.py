@@ -0,0 +1,296 @@
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import DEEPSEEK_CONCURRENCY_LIMIT, DEEPSEEK_QUEUE_WAIT, DEEPSEEK_RETRIES
+from app.services.deadline import remaining
+
+# 可重试的状态码：限流和服务端错误
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """令牌桶 - 限制请求发出速率，rate<=0时不限速"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            if self.rate <= 0:
+                return
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def defer(self, seconds: float):
+        """服务端要求等待（Retry-After）时，暂停所有调用方"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """自适应并发上限（AIMD）
+
+    延迟低于目标且无错误时每次成功加 1/limit（约每轮+1），遇到限流/5xx/超时或延迟超标时
+    乘性下降。下降有冷却时间，避免同一波失败把上限连续砍到底。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        target_latency: float,
+        decrease_factor: float = 0.7,
+        cooldown: float = 1.0
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        DEEPSEEK_CONCURRENCY_LIMIT.set(int(self.limit))
+
+    async def acquire(self):
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已分配但调用方被取消，归还名额
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, latency: float, overloaded: bool):
+        self.in_flight -= 1
+        self._adjust(latency, overloaded)
+        self._wake()
+
+    def _adjust(self, latency: float, overloaded: bool):
+        if overloaded or latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        DEEPSEEK_CONCURRENCY_LIMIT.set(int(self.limit))
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+
+class GovernedResponse:
+    """经调度器发出的一次调用结果：最后一次HTTP尝试的响应及其耗时
+
+    释放前占用一个并发名额；duration只统计最后一次尝试，不含排队、限速和退避等待。
+    """
+
+    def __init__(self, response: httpx.Response, started: float, limiter: AdaptiveConcurrencyLimiter):
+        self.response = response
+        self.started = started
+        self.finished: Optional[float] = None
+        self._limiter: Optional[AdaptiveConcurrencyLimiter] = limiter
+
+    @property
+    def duration(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    def release(self, overloaded: bool = False):
+        """归还并发名额并把耗时反馈给AIMD，重复调用无副作用"""
+        if self._limiter is None:
+            return
+        limiter, self._limiter = self._limiter, None
+        self.finished = time.perf_counter()
+        limiter.release(self.duration, overloaded or self.response.status_code in RETRYABLE_STATUS)
+
+    async def aclose(self, overloaded: bool = False):
+        """关闭响应（释放连接）并归还并发名额"""
+        try:
+            await self.response.aclose()
+        finally:
+            self.release(overloaded)
+
+    async def __aenter__(self) -> "GovernedResponse":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose(overloaded=isinstance(exc, httpx.TransportError))
+
+
+class LLMGovernor:
+    """出站LLM调用调度器 - 令牌桶限速 + 自适应并发 + 退避重试"""
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        initial_concurrency: int = 16,
+        min_concurrency: int = 2,
+        max_concurrency: int = 64,
+        target_latency: float = 15.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_concurrency, min_concurrency, max_concurrency, target_latency
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避 + 全抖动"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _fits_deadline(delay: float) -> bool:
+        """等待delay后是否还在请求截止时间之内"""
+        budget = remaining()
+        return budget is None or delay < budget
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]]) -> "GovernedResponse":
+        """排队后发送请求，限流/5xx/网络错误按退避重试
+
+        返回最后一次响应（可能仍为错误状态），响应体已由send读取，并发名额已归还；
+        重试耗尽的网络异常向上抛出。
+        """
+        governed = await self._send(send)
+        governed.release()
+        return governed
+
+    async def open_stream(self, send: Callable[[], Awaitable[httpx.Response]]) -> "GovernedResponse":
+        """与call相同，但用于流式响应：并发名额在响应关闭（aclose）前一直占用，
+        AIMD按整次调用（含读取响应体）的耗时调整"""
+        return await self._send(send)
+
+    async def _send(self, send: Callable[[], Awaitable[httpx.Response]]) -> "GovernedResponse":
+        """重试循环；返回的响应仍占用一个并发名额，由调用方释放"""
+        attempt = 0
+        while True:
+            queued_at = time.perf_counter()
+            await self.bucket.acquire()
+            await self.limiter.acquire()
+            DEEPSEEK_QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+
+            started = time.perf_counter()
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                self.limiter.release(time.perf_counter() - started, overloaded=True)
+                reason = "timeout" if isinstance(e, httpx.TimeoutException) else "transport"
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or not self._fits_deadline(delay):
+                    raise
+            except BaseException:
+                self.limiter.release(time.perf_counter() - started, overloaded=False)
+                raise
+            else:
+                governed = GovernedResponse(response, started, self.limiter)
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    return governed
+                reason = str(response.status_code)
+                delay = self._backoff(attempt)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    if retry_after > self.backoff_max:
+                        # 要求等待的时间超过上限，不再重试，交给调用方降级
+                        return governed
+                    delay = max(delay, retry_after)
+                    self.bucket.defer(retry_after)
+                if not self._fits_deadline(delay):
+                    # 等待重试会超过请求截止时间
+                    return governed
+                # 丢弃本次响应前关闭，流式响应否则会一直占用连接池中的连接
+                await governed.aclose()
+
+            DEEPSEEK_RETRIES.inc(reason=reason)
+            print(f"🔁 DeepSeek调用重试({attempt + 1}/{self.max_retries})，原因: {reason}，{delay:.2f}秒后重试")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        return {
+            "rate": self.bucket.rate,
+            "burst": self.bucket.capacity,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "queued": sum(1 for waiter in self.limiter._waiters if not waiter.done()),
+            "max_retries": self.max_retries
+        }
+
+
+# 进程级共享调度器，所有DeepSeek调用共用限速和并发上限
+_governor: Optional[LLMGovernor] = None
+
+
+def get_llm_governor() -> LLMGovernor:
+    global _governor
+    if _governor is None:
+        _governor = LLMGovernor(
+            rate=settings.deepseek_rate_limit,
+            burst=settings.deepseek_rate_burst,
+            initial_concurrency=settings.deepseek_concurrency_initial,
+            min_concurrency=settings.deepseek_concurrency_min,
+            max_concurrency=settings.deepseek_concurrency_max,
+            target_latency=settings.deepseek_target_latency,
+            max_retries=settings.deepseek_max_retries,
+            backoff_base=settings.deepseek_backoff_base,
+            backoff_max=settings.deepseek_backoff_max
+        )
+    return _governor
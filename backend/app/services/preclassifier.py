@@ -0,0 +1,225 @@
+import json
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 模型推理和训练依赖numpy，未安装时只启用第一级（本地分数饱和）判断
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 字符n-gram哈希特征维度
+DEFAULT_FEATURE_DIM = 1 << 15
+DEFAULT_NGRAM_RANGE = (1, 3)
+# 数值特征（按固定尺度归一化到0~1附近）
+NUMERIC_FEATURES = ("keyword_score", "pattern_score", "rule_count", "text_length")
+_NUMERIC_SCALES = (100.0, 100.0, 10.0, 500.0)
+
+
+def char_ngram_ids(text: str, dim: int, ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE) -> List[int]:
+    """文本中出现过的字符n-gram的哈希桶编号（去重，使用crc32保证跨进程稳定）"""
+    text = "".join(text.split())
+    ids = set()
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        for start in range(len(text) - n + 1):
+            ids.add(zlib.crc32(text[start:start + n].encode("utf-8")) % dim)
+    return sorted(ids)
+
+
+def numeric_features(keyword_score: float, pattern_score: float, rule_count: int, text_length: int) -> List[float]:
+    values = (keyword_score, pattern_score, rule_count, text_length)
+    return [min(value / scale, 1.0) for value, scale in zip(values, _NUMERIC_SCALES)]
+
+
+def record_label(record: Dict) -> int:
+    """分析记录的标签：加上AI分后静态分是否达到警告阈值"""
+    static_score = min(record["keyword_score"] + record["pattern_score"] + record["ai_score"], 100)
+    return int(static_score >= record["warning_threshold"])
+
+
+@dataclass(frozen=True)
+class PrecheckDecision:
+    """AI分析前置预判结果"""
+    run_ai: bool
+    # saturated: 本地分数已封顶；low_risk: 模型判定为明显低风险；uncertain/disabled: 需要AI分析
+    outcome: str
+    reason: str
+    probability: Optional[float] = None
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "skipped": not self.run_ai,
+            "outcome": self.outcome,
+            "reason": self.reason,
+            "probability": self.probability,
+            "elapsed_ms": round(self.elapsed_ms, 3)
+        }
+
+
+class RiskPreclassifier:
+    """字符n-gram哈希特征 + 数值特征的逻辑回归，预测加上AI分后是否达到警告阈值"""
+
+    def __init__(
+        self,
+        weights: "np.ndarray",
+        numeric_weights: "np.ndarray",
+        bias: float,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        metadata: Optional[Dict] = None
+    ):
+        self.weights = weights
+        self.numeric_weights = numeric_weights
+        self.bias = float(bias)
+        self.ngram_range = tuple(ngram_range)
+        self.metadata = metadata or {}
+
+    @property
+    def dim(self) -> int:
+        return len(self.weights)
+
+    def predict_proba(self, text: str, keyword_score: float, pattern_score: float, rule_count: int) -> float:
+        ids = char_ngram_ids(text, self.dim, self.ngram_range)
+        logit = self.bias
+        if ids:
+            # 二值特征按L2归一化，长短文本尺度一致
+            logit += float(self.weights[ids].sum()) / len(ids) ** 0.5
+        numeric = numeric_features(keyword_score, pattern_score, rule_count, len(text))
+        logit += float(np.dot(self.numeric_weights, numeric))
+        return float(1.0 / (1.0 + np.exp(-np.clip(logit, -30.0, 30.0))))
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                numeric_weights=self.numeric_weights,
+                bias=np.array([self.bias]),
+                ngram_range=np.array(self.ngram_range),
+                metadata=np.array(json.dumps(self.metadata, ensure_ascii=False))
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "RiskPreclassifier":
+        with np.load(path) as data:
+            return cls(
+                weights=data["weights"].astype(np.float32),
+                numeric_weights=data["numeric_weights"].astype(np.float32),
+                bias=float(data["bias"][0]),
+                ngram_range=tuple(int(n) for n in data["ngram_range"]),
+                metadata=json.loads(str(data["metadata"]))
+            )
+
+    @classmethod
+    def train(
+        cls,
+        records: Sequence[Dict],
+        dim: int = DEFAULT_FEATURE_DIM,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        epochs: int = 200,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4
+    ) -> "RiskPreclassifier":
+        """全量梯度下降训练，特征以稀疏形式(行号, 桶编号, 值)保存"""
+        rows, cols, values = [], [], []
+        numeric = np.zeros((len(records), len(NUMERIC_FEATURES)), dtype=np.float32)
+        for row, record in enumerate(records):
+            ids = char_ngram_ids(record["text"], dim, ngram_range)
+            if ids:
+                rows.extend([row] * len(ids))
+                cols.extend(ids)
+                values.extend([1.0 / len(ids) ** 0.5] * len(ids))
+            numeric[row] = numeric_features(
+                record["keyword_score"], record["pattern_score"], record["rule_count"], len(record["text"])
+            )
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        values = np.array(values, dtype=np.float32)
+        labels = np.array([record_label(record) for record in records], dtype=np.float32)
+
+        weights = np.zeros(dim, dtype=np.float32)
+        numeric_weights = np.zeros(len(NUMERIC_FEATURES), dtype=np.float32)
+        bias = 0.0
+        n = max(len(records), 1)
+        for _ in range(epochs):
+            logits = np.bincount(rows, weights=values * weights[cols], minlength=len(records))
+            logits += numeric @ numeric_weights + bias
+            residual = (1.0 / (1.0 + np.exp(-np.clip(logits, -30.0, 30.0))) - labels).astype(np.float32)
+            grad = np.bincount(cols, weights=values * residual[rows], minlength=dim) / n + l2 * weights
+            weights -= learning_rate * grad.astype(np.float32)
+            numeric_weights -= learning_rate * (numeric.T @ residual / n + l2 * numeric_weights)
+            bias -= learning_rate * float(residual.mean())
+
+        metadata = {"trained_at": time.time(), "samples": len(records), "positive": int(labels.sum())}
+        return cls(weights, numeric_weights, bias, ngram_range, metadata)
+
+
+class AIPrecheck:
+    """AI分析前置预判，决定静态扫描是否需要调用LLM
+
+    第一级：关键词和模式识别分数已达到饱和分（默认100，即静态分上限），AI分析无法再改变分数。
+    第二级：加载了离线模型时，预测加上AI分后仍低于警告阈值的概率不低于confidence，
+    且本地分数也低于警告阈值，视为明显低风险。其余情况照常调用AI。
+    """
+
+    def __init__(
+        self,
+        saturation_score: float = 100,
+        model: Optional[RiskPreclassifier] = None,
+        confidence: float = 0.9
+    ):
+        self.saturation_score = saturation_score
+        self.model = model
+        self.confidence = confidence
+
+    @property
+    def active(self) -> bool:
+        return self.saturation_score > 0 or self.model is not None
+
+    def decide(
+        self,
+        text: str,
+        keyword_score: float,
+        pattern_score: float,
+        rule_count: int,
+        warning_threshold: float
+    ) -> PrecheckDecision:
+        start = time.perf_counter()
+        local_score = keyword_score + pattern_score
+
+        def decision(run_ai: bool, outcome: str, reason: str, probability: Optional[float] = None):
+            return PrecheckDecision(run_ai, outcome, reason, probability, (time.perf_counter() - start) * 1000)
+
+        if self.saturation_score > 0 and local_score >= self.saturation_score:
+            return decision(False, "saturated", f"本地规则分数{local_score}已达到{self.saturation_score}，跳过AI分析")
+        if self.model is None:
+            return decision(True, "disabled", "未加载预判模型")
+        probability = self.model.predict_proba(text, keyword_score, pattern_score, rule_count)
+        if local_score < warning_threshold and probability <= 1 - self.confidence:
+            return decision(
+                False, "low_risk", f"预判模型判定为低风险（风险概率{probability:.3f}），跳过AI分析", probability
+            )
+        return decision(True, "uncertain", "预判模型无法确定，需要AI分析", probability)
+
+
+def load_preclassifier(path: Optional[str]) -> Optional[RiskPreclassifier]:
+    """加载离线训练的预判模型，未配置、缺少numpy或文件无效时返回None"""
+    if not path:
+        return None
+    if not NUMPY_AVAILABLE:
+        print("⚠️ 未安装numpy，预判模型不可用，仅使用本地分数饱和判断")
+        return None
+    try:
+        model = RiskPreclassifier.load(Path(path))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"⚠️ 预判模型加载失败 {path}: {e}")
+        return None
+    print(f"🧮 预判模型已加载: {path}（{model.metadata.get('samples', '?')}条样本训练）")
+    return model
+
@@ -0,0 +1,170 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# weight_config.yaml 中 pattern_analysis.repetition 的默认值
+DEFAULT_REPETITION_CONFIG = {
+    "min_length": 3,
+    "min_count": 4,
+    "max_results": 3,
+    "risk_value": 5,
+}
+# 报告的片段最长字数，更长的重复只报告其开头部分
+MAX_FRAGMENT_CHARS = 200
+# 参与排序去重的候选数: max(max_results * CANDIDATE_FACTOR, MIN_CANDIDATES)
+CANDIDATE_FACTOR = 16
+MIN_CANDIDATES = 64
+
+
+@dataclass(frozen=True)
+class RepeatedSubstring:
+    """重复出现的片段"""
+    text: str
+    count: int
+    # 第一次出现的起始位置
+    offset: int
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "count": self.count, "offset": self.offset}
+
+
+def find_repeated_substrings(
+    text: str,
+    min_length: int = 3,
+    min_count: int = 4,
+    max_results: int = 3,
+    max_fragment_chars: int = MAX_FRAGMENT_CHARS
+) -> List[RepeatedSubstring]:
+    """用后缀自动机在线性时间内找出出现至少min_count次、长度至少min_length的极大重复片段
+
+    不依赖分词，适用于没有空格的中文文本。只报告极大重复（不能向左或向右扩展而保持出现次数），
+    按覆盖字数（长度×次数）从大到小返回，第一次出现位置大半与已报告片段重叠的不再重复报告。
+    报告时去掉片段首尾的标点和空白，超过max_fragment_chars的片段只保留开头部分；
+    有效字符（汉字、字母、数字）少于min_length的片段忽略。
+    """
+    if min_length < 1 or min_count < 2 or len(text) < min_length + min_count - 1:
+        return []
+
+    # 状态: 最长串长度、后缀链接、转移、endpos大小、第一次出现的结束位置
+    length = [0]
+    link = [-1]
+    trans: List[Dict[str, int]] = [{}]
+    count = [0]
+    first_end = [-1]
+    # 构建循环是热点，预先绑定方法
+    add_length, add_link, add_trans = length.append, link.append, trans.append
+    add_count, add_first_end = count.append, first_end.append
+    states = 1
+    last = 0
+    for index, char in enumerate(text):
+        cur = states
+        states += 1
+        add_length(length[last] + 1)
+        add_link(0)
+        add_trans({})
+        add_count(1)
+        add_first_end(index)
+        p = last
+        while p != -1:
+            edges = trans[p]
+            if char in edges:
+                break
+            edges[char] = cur
+            p = link[p]
+        if p != -1:
+            q = trans[p][char]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = states
+                states += 1
+                add_length(length[p] + 1)
+                add_link(link[q])
+                add_trans(trans[q].copy())
+                add_count(0)
+                add_first_end(first_end[q])
+                while p != -1:
+                    edges = trans[p]
+                    if edges.get(char) != q:
+                        break
+                    edges[char] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        last = cur
+
+    # 按最长串长度计数排序后自底向上累加出现次数
+    buckets = [0] * (len(text) + 2)
+    for size in length:
+        buckets[size] += 1
+    for size in range(1, len(buckets)):
+        buckets[size] += buckets[size - 1]
+    order = [0] * len(length)
+    for state in range(len(length) - 1, -1, -1):
+        buckets[length[state]] -= 1
+        order[buckets[length[state]]] = state
+    for state in reversed(order):
+        if link[state] > 0:
+            count[link[state]] += count[state]
+
+    # 整个文本的后缀对应的状态（可在文本末尾结束，右侧无法扩展）
+    terminal = set()
+    state = last
+    while state > 0:
+        terminal.add(state)
+        state = link[state]
+
+    # 预处理去除首尾标点所需的数组，使每个状态的处理都是O(1)
+    # next_alnum[i]: 不小于i的第一个有效字符位置；prev_alnum_end[i]: 不大于i、且其前一个字符有效的最大位置
+    n = len(text)
+    next_alnum = [n] * (n + 1)
+    for index in range(n - 1, -1, -1):
+        next_alnum[index] = index if text[index].isalnum() else next_alnum[index + 1]
+    prev_alnum_end = [0] * (n + 1)
+    alnum_prefix = [0] * (n + 1)
+    for index in range(n):
+        is_alnum = text[index].isalnum()
+        prev_alnum_end[index + 1] = index + 1 if is_alnum else prev_alnum_end[index]
+        alnum_prefix[index + 1] = alnum_prefix[index] + is_alnum
+
+    def candidates():
+        """逐个产出 (得分, -起始位置, 状态, 起始, 结束)，只做整数运算不切片"""
+        for state in range(1, len(length)):
+            if count[state] < min_count or length[state] < min_length:
+                continue
+            # 只有一种后继字符且不在末尾时，向右扩展一个字符出现次数不变，不是极大重复
+            if len(trans[state]) == 1 and state not in terminal:
+                continue
+            end = first_end[state] + 1
+            start = next_alnum[end - length[state]]
+            if end - start > max_fragment_chars:
+                end = start + max_fragment_chars
+            end = prev_alnum_end[end]
+            if end <= start or alnum_prefix[end] - alnum_prefix[start] < min_length:
+                continue
+            yield (end - start) * count[state], -start, state, start, end
+
+    # 只取得分最高的若干候选，切片、精确计数和去重都只在这些候选上进行
+    top = heapq.nlargest(max(max_results * CANDIDATE_FACTOR, MIN_CANDIDATES), candidates())
+    results: List[RepeatedSubstring] = []
+    kept_ranges: List[Tuple[int, int]] = []
+    for _, _, state, start, end in top:
+        fragment_length = end - start
+        if fragment_length != length[state]:
+            # 去掉首尾或截断后的片段可能出现得更多，沿转移走到其所在状态取准确次数和第一次出现的位置
+            found = 0
+            for char in text[start:end]:
+                found = trans[found][char]
+            occurrences = count[found]
+            start = first_end[found] + 1 - fragment_length
+            end = start + fragment_length
+        else:
+            occurrences = count[state]
+        # 第一次出现位置有一半以上落在已报告片段内的不再重复报告（周期文本的各个错位版本即属此类）
+        if any(2 * (min(end, kept_end) - max(start, kept_start)) >= fragment_length for kept_start, kept_end in kept_ranges):
+            continue
+        kept_ranges.append((start, end))
+        results.append(RepeatedSubstring(text[start:end], occurrences, start))
+        if len(results) >= max_results:
+            break
+    return results
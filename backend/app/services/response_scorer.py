@@ -0,0 +1,185 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# weight_config.yaml 未配置 response_lexicons 时使用的默认词表
+DEFAULT_RESPONSE_LEXICONS = {
+    "fuzzy_evasion": {
+        "score": 25,
+        "words": ["大概", "可能", "不清楚", "不太确定", "应该吧", "不知道", "忘了", "记不清", "说不准"],
+    },
+    "emotional_attack": {
+        "score": 40,
+        "words": ["现实", "查户口", "太物质", "问太细", "商业机密", "不想说", "不方便", "隐私"],
+    },
+    "topic_shift": {
+        "score": 30,
+        "words": ["换个话题", "说点别的", "这个不重要", "先不说这个"],
+    },
+    "negative": {
+        "score": 15,
+        "words": ["不", "没", "无", "否", "别", "莫"],
+    },
+    "short_answer": {
+        "max_length": 5,
+        "score": 20,
+    },
+}
+
+# 逐词累加的维度（每个不同的命中词计一次分）
+SCORED_DIMENSIONS = ("fuzzy_evasion", "emotional_attack", "topic_shift")
+# 批量拼接时的分隔符，词表中不会出现
+_SEPARATOR = "\x00"
+# 回答中自带的分隔符替换成该字符再拼接，否则会错位后续回答的结果；两者都不会出现在词表中
+_SEPARATOR_REPLACEMENT = "\x01"
+# 评分结果缓存上限（按命中组合缓存，实际组合数通常很少）
+RESULT_CACHE_SIZE = 4096
+
+
+class LexiconError(ValueError):
+    """weight_config.yaml 中 response_lexicons 的写法有误"""
+
+    def __init__(self, name: str, message: str):
+        super().__init__(f"回答词表「{name}」: {message}")
+        self.name = name
+
+
+def _validate_lexicons(lexicons: Dict):
+    """校验合并默认值后的词表，写法有误时抛出LexiconError"""
+    for name in (*SCORED_DIMENSIONS, "negative"):
+        lexicon = lexicons[name]
+        if not isinstance(lexicon["score"], (int, float)):
+            raise LexiconError(name, "score必须是数字")
+        words = lexicon.get("words")
+        if words is not None and (not isinstance(words, list) or not all(isinstance(word, str) for word in words)):
+            raise LexiconError(name, "words必须是字符串数组")
+    short_answer = lexicons["short_answer"]
+    if not isinstance(short_answer["max_length"], int) or short_answer["max_length"] < 0:
+        raise LexiconError("short_answer", "max_length必须是非负整数")
+    if not isinstance(short_answer["score"], (int, float)):
+        raise LexiconError("short_answer", "score必须是数字")
+
+
+class ResponseScorer:
+    """本地回答评分器 - 模糊回避/情绪攻击/话题转移/否定词表编译成同一个正则
+
+    评分规则与原先逐个词表做 in 判断一致：每个维度按命中的不同词计分，出现任一否定词
+    或回答过短时模糊回避额外加分。
+    正则在每个位置用前瞻匹配最长的词，短词若是命中词的子串（如"不"之于"不清楚"）按包含关系补回，
+    因此能得到与逐词查找相同的命中集合。score_batch 把一批回答用分隔符拼接后一次 findall 完成扫描。
+    """
+
+    def __init__(self, lexicons: Optional[Dict] = None):
+        """词表写法有误时抛出LexiconError，配置接口写入前用同一逻辑校验"""
+        if lexicons is not None and not isinstance(lexicons, dict):
+            raise LexiconError("*", "response_lexicons必须是对象")
+        for name, lexicon in (lexicons or {}).items():
+            if lexicon is not None and not isinstance(lexicon, dict):
+                raise LexiconError(name, "词表配置必须是对象")
+        # 未配置的维度沿用默认值
+        lexicons = {
+            name: {**default, **((lexicons or {}).get(name) or {})}
+            for name, default in DEFAULT_RESPONSE_LEXICONS.items()
+        }
+        _validate_lexicons(lexicons)
+        self.scores = {name: lexicons[name]["score"] for name in (*SCORED_DIMENSIONS, "negative")}
+        short_answer = lexicons["short_answer"]
+        self.short_answer_length = short_answer["max_length"]
+        self.short_answer_score = short_answer["score"]
+
+        # 命中词 -> 所属维度（同一个词可以属于多个维度）
+        self._owners: Dict[str, List[str]] = {}
+        for name in (*SCORED_DIMENSIONS, "negative"):
+            for word in lexicons[name].get("words") or []:
+                if not word or _SEPARATOR in word or _SEPARATOR_REPLACEMENT in word:
+                    continue
+                owners = self._owners.setdefault(word, [])
+                if name not in owners:
+                    owners.append(name)
+        # 命中词 -> 它包含的所有词（含自身）的位掩码
+        self._vocabulary = list(self._owners)
+        self._masks: Dict[str, int] = {
+            word: sum(1 << bit for bit, other in enumerate(self._vocabulary) if other in word)
+            for word in self._vocabulary
+        }
+        # (命中掩码, 是否过短) -> 评分结果；分数只取决于这两项
+        self._results: Dict[Tuple[int, bool], Dict] = {}
+        words = sorted(self._owners, key=len, reverse=True)
+        self._pattern = re.compile(
+            "(?=(" + "|".join([re.escape(_SEPARATOR)] + [re.escape(word) for word in words]) + "))"
+        )
+
+    @property
+    def word_count(self) -> int:
+        return len(self._owners)
+
+    def score(self, response_text: str) -> Dict:
+        return self.score_batch([response_text])[0]
+
+    def score_batch(self, texts: Sequence[str]) -> List[Dict]:
+        """批量评分，结果顺序与输入一致"""
+        if not texts:
+            return []
+        masks = self._masks
+        matched = [0]
+        joined = _SEPARATOR.join(
+            text.replace(_SEPARATOR, _SEPARATOR_REPLACEMENT) if _SEPARATOR in text else text for text in texts
+        )
+        for word in self._pattern.findall(joined):
+            if word == _SEPARATOR:
+                matched.append(0)
+            else:
+                matched[-1] |= masks[word]
+        results = []
+        for text, mask in zip(texts, matched):
+            key = (mask, len(text.strip()) < self.short_answer_length)
+            result = self._results.get(key)
+            if result is None:
+                if len(self._results) >= RESULT_CACHE_SIZE:
+                    self._results.clear()
+                result = self._results[key] = self._result(*key)
+            results.append({**result, "risk_tags": list(result["risk_tags"])})
+        return results
+
+    def _result(self, mask: int, short: bool) -> Dict:
+        dimensions = dict.fromkeys(SCORED_DIMENSIONS, 0)
+        negative = False
+        for bit, word in enumerate(self._vocabulary):
+            if not mask >> bit & 1:
+                continue
+            for name in self._owners[word]:
+                if name == "negative":
+                    negative = True
+                else:
+                    dimensions[name] += self.scores[name]
+
+        fuzzy_score = dimensions["fuzzy_evasion"]
+        # 回答太短时增加模糊回避分数
+        if short:
+            fuzzy_score += self.short_answer_score
+        # 包含否定词时增加模糊回避分数
+        if negative:
+            fuzzy_score += self.scores["negative"]
+        attack_score = dimensions["emotional_attack"]
+        topic_shift_score = dimensions["topic_shift"]
+
+        total_risk = fuzzy_score + attack_score + topic_shift_score
+        precise_score = max(0, 100 - total_risk)
+
+        risk_tags = []
+        if fuzzy_score > 0:
+            risk_tags.append("模糊回避")
+        if attack_score > 0:
+            risk_tags.append("情绪攻击")
+        if topic_shift_score > 0:
+            risk_tags.append("话题转移")
+        if precise_score < 50:
+            risk_tags.append("信息不足")
+
+        return {
+            "fuzzy_evasion": min(fuzzy_score, 100),
+            "emotional_attack": min(attack_score, 100),
+            "topic_shift": min(topic_shift_score, 100),
+            "precise_answer": precise_score,
+            "risk_tags": risk_tags,
+            "overall_risk_score": min(total_risk, 100)
+        }
@@ -1,12 +1,27 @@
 import json
 import yaml
-import random
+import asyncio
+import threading
 import traceback
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple, Optional
 from pathlib import Path
 from datetime import datetime
+from app.services.analysis_log import get_analysis_log
 from app.services.deepseek_service import DeepSeekService
+from app.services.degradation import current_degradation, mark_degraded, reports_degradation
+from app.services.keyword_matcher import ContradictionMatcher
+from app.services.knowledge_index import KnowledgeIndex
+from app.services.knowledge_store import KnowledgeTable, load_knowledge_table, share_knowledge_table
+from app.services.preclassifier import AIPrecheck, load_preclassifier
+from app.services.repeat_detector import DEFAULT_REPETITION_CONFIG, find_repeated_substrings
+from app.services.response_scorer import ResponseScorer
+from app.services.rule_compiler import CompiledRuleSet
+from app.services.stage_graph import StageGraph
 from app.core.config import settings
+from app.core.metrics import (
+    AI_PRECHECK_DECISIONS, DEEPSEEK_CALLS, DYNAMIC_SHORT_CIRCUITS, RISK_ANALYSIS_IN_FLIGHT, RISK_STAGE_DURATION, track_in_progress
+)
 import time # Added for performance monitoring
 
 # 尝试导入pandas，如果失败则使用替代方案
@@ -17,20 +32,207 @@ except ImportError:
     PANDAS_AVAILABLE = False
     print("Warning: pandas not available, using alternative timestamp")
 
+# 阶段事件回调: (事件名, 数据)
+EventCallback = Callable[[str, Any], None]
+
+# 动态分析总体风险分的取值范围
+DYNAMIC_SCORE_MIN, DYNAMIC_SCORE_MAX = 0, 100
+
+# 超过该长度的文本在线程中做重复片段检测，不阻塞事件循环
+REPEAT_DETECTION_INLINE_CHARS = 5000
+
+RISK_RULES_FILE = "risk_rules.json"
+WEIGHT_CONFIG_FILE = "weight_config.yaml"
+CONTRADICTION_RULES_FILE = "contradiction_rules.json"
+
+
+@dataclass(frozen=True)
+class EngineSnapshot:
+    """引擎配置快照 - 构建完成后只读，重载时整体替换"""
+    version: int
+    risk_rules: Dict
+    weight_config: Dict
+    knowledge_base: Dict[str, KnowledgeTable]
+    # 由risk_rules编译出的单遍规则求值器
+    rule_matcher: CompiledRuleSet
+    # 数据来源文件签名: 路径 -> (mtime_ns, size)
+    sources: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    loaded_at: float = 0.0
+    # 知识库表对应的倒排索引，与表同时构建/复用
+    knowledge_indexes: Dict[str, KnowledgeIndex] = field(default_factory=dict)
+    # 由weight_config中response_lexicons编译出的本地回答评分器
+    response_scorer: ResponseScorer = field(default_factory=ResponseScorer)
+    # 由contradiction_rules编译出的互斥词自动机
+    contradiction_matcher: ContradictionMatcher = field(default_factory=lambda: ContradictionMatcher({}))
+
+
 class RiskEngine:
-    def __init__(self):
+    def __init__(self, deepseek_service: Optional[DeepSeekService] = None):
         self.config_dir = Path(settings.config_dir)
         self.knowledge_dir = Path(settings.knowledge_dir)
-        self.deepseek_service = DeepSeekService()
+        # 知识库内存映射目录，为空时知识库保存在进程内存中
+        self.knowledge_mmap_dir = Path(settings.knowledge_mmap_dir) if settings.knowledge_mmap_dir else None
+        self.deepseek_service = deepseek_service or DeepSeekService()
+        # AI分析前置预判（本地分数饱和 + 可选的离线模型）
+        self.ai_precheck = AIPrecheck(
+            saturation_score=settings.ai_precheck_saturation_score,
+            model=load_preclassifier(settings.preclassifier_model_path),
+            confidence=settings.preclassifier_confidence
+        )
         
-        # 加载配置
-        self.risk_rules = self._load_risk_rules()
-        self.weight_config = self._load_weight_config()
-        self.knowledge_base = self._load_knowledge_base()
+        # 加载配置（快照只通过整体替换更新，读取方无需加锁）
+        self._reload_lock = threading.Lock()
+        self._snapshot = self._build_snapshot()
+        self.deepseek_service.response_scorer = self._snapshot.response_scorer
+    
+    @property
+    def snapshot(self) -> EngineSnapshot:
+        """当前配置快照，单次分析应只取一次以保证前后一致"""
+        return self._snapshot
+    
+    @property
+    def risk_rules(self) -> Dict:
+        return self._snapshot.risk_rules
+    
+    @property
+    def weight_config(self) -> Dict:
+        return self._snapshot.weight_config
+    
+    @property
+    def knowledge_base(self) -> Dict[str, KnowledgeTable]:
+        return self._snapshot.knowledge_base
+    
+    def _scan_sources(self) -> Dict[str, Tuple[int, int]]:
+        """收集配置与知识库文件的签名"""
+        sources = {}
+        candidates = [
+            self.config_dir / RISK_RULES_FILE,
+            self.config_dir / WEIGHT_CONFIG_FILE,
+            self.config_dir / CONTRADICTION_RULES_FILE
+        ]
+        if self.knowledge_dir.exists():
+            candidates.extend(sorted(self.knowledge_dir.glob("*.csv")))
+        for path in candidates:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            sources[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return sources
+    
+    def _build_snapshot(self, previous: Optional[EngineSnapshot] = None) -> EngineSnapshot:
+        """构建新快照，未变化的部分直接复用上一个快照"""
+        sources = self._scan_sources()
+        old_sources = previous.sources if previous else {}
+        
+        def unchanged(path: Path) -> bool:
+            key = str(path)
+            return previous is not None and key in sources and old_sources.get(key) == sources[key]
+        
+        rules_file = self.config_dir / RISK_RULES_FILE
+        weight_file = self.config_dir / WEIGHT_CONFIG_FILE
+        contradiction_file = self.config_dir / CONTRADICTION_RULES_FILE
+        if unchanged(rules_file):
+            risk_rules = previous.risk_rules
+            rule_matcher = previous.rule_matcher
+        else:
+            risk_rules = self._load_risk_rules()
+            rule_matcher = CompiledRuleSet(risk_rules)
+        if unchanged(weight_file):
+            weight_config = previous.weight_config
+            response_scorer = previous.response_scorer
+        else:
+            weight_config = self._load_weight_config()
+            response_scorer = ResponseScorer(weight_config.get("response_lexicons"))
+        if unchanged(contradiction_file):
+            contradiction_matcher = previous.contradiction_matcher
+        else:
+            contradiction_matcher = ContradictionMatcher(self._load_contradiction_rules())
+        
+        knowledge_base = {}
+        for key in sources:
+            path = Path(key)
+            if path.suffix != ".csv":
+                continue
+            if unchanged(path) and path.stem in previous.knowledge_base:
+                knowledge_base[path.stem] = previous.knowledge_base[path.stem]
+            else:
+                knowledge_base.update(self._load_knowledge_file(path))
+        
+        knowledge_indexes = {}
+        for name, table in knowledge_base.items():
+            if previous is not None and previous.knowledge_base.get(name) is table and name in previous.knowledge_indexes:
+                knowledge_indexes[name] = previous.knowledge_indexes[name]
+            else:
+                knowledge_indexes[name] = KnowledgeIndex(table)
+        
+        return EngineSnapshot(
+            version=previous.version + 1 if previous else 1,
+            risk_rules=risk_rules,
+            weight_config=weight_config,
+            knowledge_base=knowledge_base,
+            rule_matcher=rule_matcher,
+            sources=sources,
+            loaded_at=time.time(),
+            knowledge_indexes=knowledge_indexes,
+            response_scorer=response_scorer,
+            contradiction_matcher=contradiction_matcher
+        )
+    
+    def reload(self) -> EngineSnapshot:
+        """重新加载已变化的配置文件并原子替换快照"""
+        with self._reload_lock:
+            previous = self._snapshot
+            snapshot = self._build_snapshot(previous)
+            self._snapshot = snapshot
+            self.deepseek_service.response_scorer = snapshot.response_scorer
+        print(f"🔄 风控引擎配置已重载: v{previous.version} -> v{snapshot.version}")
+        return snapshot
+    
+    def update_knowledge_table(self, csv_file: Path, table: KnowledgeTable) -> EngineSnapshot:
+        """替换单个知识库表（如上传时已边接收边构建），只重建该表的索引，其他配置和表原样复用"""
+        table = share_knowledge_table(csv_file, table, self.knowledge_mmap_dir)
+        index = KnowledgeIndex(table)
+        with self._reload_lock:
+            previous = self._snapshot
+            sources = dict(previous.sources)
+            if table.source is not None:
+                sources[str(csv_file)] = table.source
+            snapshot = replace(
+                previous,
+                version=previous.version + 1,
+                knowledge_base={**previous.knowledge_base, csv_file.stem: table},
+                knowledge_indexes={**previous.knowledge_indexes, csv_file.stem: index},
+                sources=sources,
+                loaded_at=time.time()
+            )
+            self._snapshot = snapshot
+        skipped = f"，跳过{table.skipped_rows}行列数不符的数据" if table.skipped_rows else ""
+        print(f"📚 知识库表{csv_file.stem}已更新({len(table)}行{skipped}): v{previous.version} -> v{snapshot.version}")
+        return snapshot
+    
+    def reload_if_changed(self) -> bool:
+        """文件签名变化时重载，返回是否发生了重载"""
+        if self._scan_sources() == self._snapshot.sources:
+            return False
+        try:
+            self.reload()
+            return True
+        except Exception as e:
+            # 新文件有误时保留旧快照继续服务
+            print(f"❌ 配置热重载失败，继续使用v{self._snapshot.version}: {e}")
+            return False
+    
+    async def watch_config_files(self, interval: float):
+        """后台轮询配置文件变化"""
+        print(f"👀 开始监听配置文件变化，间隔{interval}秒")
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.reload_if_changed)
     
     def _load_risk_rules(self) -> Dict:
         """加载风险规则"""
-        rules_file = self.config_dir / "risk_rules.json"
+        rules_file = self.config_dir / RISK_RULES_FILE
         if rules_file.exists():
             with open(rules_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -38,78 +240,137 @@ class RiskEngine:
     
     def _load_weight_config(self) -> Dict:
         """加载权重配置"""
-        config_file = self.config_dir / "weight_config.yaml"
+        config_file = self.config_dir / WEIGHT_CONFIG_FILE
         if config_file.exists():
             with open(config_file, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+                return yaml.safe_load(f) or {}
         return {}
     
-    def _load_knowledge_base(self) -> Dict[str, List[Dict]]:
+    def _load_contradiction_rules(self) -> Dict:
+        """加载矛盾规则（互斥词组）"""
+        rules_file = self.config_dir / CONTRADICTION_RULES_FILE
+        if rules_file.exists():
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    
+    def _load_knowledge_base(self) -> Dict[str, KnowledgeTable]:
         """加载知识库"""
         knowledge = {}
         if self.knowledge_dir.exists():
             for csv_file in self.knowledge_dir.glob("*.csv"):
-                try:
-                    if PANDAS_AVAILABLE:
-                        df = pd.read_csv(csv_file, encoding='utf-8')
-                        knowledge[csv_file.stem] = df.to_dict('records')
-                    else:
-                        # 简单的CSV解析替代方案
-                        knowledge[csv_file.stem] = self._simple_csv_parse(csv_file)
-                except Exception as e:
-                    print(f"加载知识库文件失败 {csv_file}: {e}")
+                knowledge.update(self._load_knowledge_file(csv_file))
         return knowledge
     
-    def _simple_csv_parse(self, csv_file: Path) -> List[Dict]:
-        """简单的CSV解析替代方案"""
+    def _load_knowledge_file(self, csv_file: Path) -> Dict[str, KnowledgeTable]:
+        """加载单个知识库文件为列式表，失败时返回空字典"""
         try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if len(lines) < 2:
-                    return []
-                
-                headers = lines[0].strip().split(',')
-                data = []
-                
-                for line in lines[1:]:
-                    values = line.strip().split(',')
-                    if len(values) == len(headers):
-                        row = {}
-                        for i, header in enumerate(headers):
-                            row[header] = values[i]
-                        data.append(row)
-                
-                return data
+            return {csv_file.stem: load_knowledge_table(csv_file, self.knowledge_mmap_dir)}
         except Exception as e:
-            print(f"简单CSV解析失败: {e}")
-            return []
+            print(f"加载知识库文件失败 {csv_file}: {e}")
+            return {}
     
-    async def static_risk_scan(self, text: str) -> Dict:
-        """增强的静态风险扫描 - 结合AI分析"""
+    @staticmethod
+    def _emit(on_event: Optional[EventCallback], event: str, data):
+        """向调用方推送阶段事件（用于流式接口），返回原数据便于链式使用"""
+        if on_event is not None:
+            try:
+                on_event(event, data)
+            except Exception as e:
+                print(f"⚠️ 事件推送失败 {event}: {e}")
+        return data
+    
+    @track_in_progress(RISK_ANALYSIS_IN_FLIGHT, operation="static_scan")
+    @reports_degradation
+    async def static_risk_scan(
+        self,
+        text: str,
+        on_event: Optional[EventCallback] = None,
+        fused: bool = False,
+        snapshot: Optional[EngineSnapshot] = None
+    ) -> Dict:
+        """增强的静态风险扫描 - 结合AI分析
+        
+        各阶段按依赖关系调度：AI分析请求发出后，关键词匹配和模式识别在等待期间
+        本地完成，只有规则合并需要等待AI结果。每个阶段完成时通过on_event推送。
+        fused为True时AI阶段改用融合提示词（依赖本地规则），结果中附带话术。
+        启用前置预判时AI阶段在本地阶段之后做决定：只有分数饱和判断时AI请求仍最先发出，
+        本地分数饱和则取消；加载了预判模型时先预判，明显不需要AI的文本不发出LLM请求。
+        各阶段都使用同一个配置快照（未传入时取当前快照），分析期间热重载不会混用两个版本。
+        """
         print(f"🔍 开始静态风险扫描，文本长度: {len(text)}")
         print(f"📝 扫描文本: {text[:100]}...")
         
-        risk_score = 0
-        triggered_rules = []
-        
-        # 1. 传统关键词匹配
-        print("🔍 步骤1: 传统关键词匹配")
-        for rule_name, rule_config in self.risk_rules.items():
-            if any(keyword in text for keyword in rule_config["触发词"]):
-                risk_score += rule_config["风险值"]
-                triggered_rules.append({
-                    "rule_name": rule_name,
-                    "risk_value": rule_config["风险值"],
-                    "keywords": [k for k in rule_config["触发词"] if k in text],
-                    "detection_method": "keyword_match"
-                })
-                print(f"✅ 触发关键词规则: {rule_name}, 风险值: {rule_config['风险值']}")
-        
+        snapshot = snapshot or self.snapshot
+        
+        async def emit_when_done(event: str, coro):
+            return self._emit(on_event, event, await coro)
+        
+        precheck = not fused and self.ai_precheck.active
+        # 只做饱和判断时不值得让请求等待本地阶段，先发出，饱和后再取消
+        speculative_ai = None
+        if precheck and self.ai_precheck.model is None:
+            speculative_ai = asyncio.create_task(self._ai_risk_analysis(text, snapshot))
+        graph = StageGraph()
+        if not fused and not precheck:
+            # AI分析最先启动，让网络请求尽早发出
+            graph.add("ai_analysis", lambda results: emit_when_done("ai_rules", self._ai_risk_analysis(text, snapshot)))
+        graph.add(
+            "keyword_match",
+            lambda results: self._emit(on_event, "keyword_hits", snapshot.rule_matcher.scan(text))
+        )
+        graph.add(
+            "pattern_analysis",
+            lambda results: emit_when_done("pattern_hits", self._detect_risk_patterns(text, snapshot))
+        )
+        if fused:
+            # 融合提示词需要本地规则，本地阶段耗时可忽略
+            graph.add(
+                "ai_analysis",
+                lambda results: emit_when_done("ai_rules", self._fused_risk_analysis(
+                    text,
+                    snapshot,
+                    results["keyword_match"],
+                    results["pattern_analysis"].get("pattern_rules", [])
+                )),
+                deps=("keyword_match", "pattern_analysis")
+            )
+        elif precheck:
+            # 预判只依赖本地阶段（亚毫秒级），需要AI时再发出请求
+            graph.add(
+                "ai_analysis",
+                lambda results: emit_when_done("ai_rules", self._prechecked_ai_analysis(
+                    text,
+                    snapshot,
+                    results["keyword_match"],
+                    results["pattern_analysis"],
+                    speculative_ai
+                )),
+                deps=("keyword_match", "pattern_analysis")
+            )
+        graph.add(
+            "merge",
+            lambda results: self._merge_rules(
+                results["keyword_match"],
+                (results["ai_analysis"] or {}).get("ai_rules", [])
+            ),
+            deps=("keyword_match", "ai_analysis")
+        )
+        try:
+            results, timeline = await graph.run()
+        finally:
+            if speculative_ai is not None and not speculative_ai.done():
+                speculative_ai.cancel()
+        
+        # 1. 传统关键词匹配 - 预编译自动机单次扫描
+        triggered_rules = results["keyword_match"]
+        risk_score = sum(rule["risk_value"] for rule in triggered_rules)
+        for rule in triggered_rules:
+            print(f"✅ 触发关键词规则: {rule['rule_name']}, 风险值: {rule['risk_value']}")
         print(f"📊 关键词匹配结果: 触发{len(triggered_rules)}条规则, 当前风险分: {risk_score}")
         
         # 2. AI智能风险分析
-        print("🤖 步骤2: AI智能风险分析")
-        ai_analysis = await self._ai_risk_analysis(text)
+        ai_analysis = results["ai_analysis"]
         if ai_analysis:
             ai_risk_score = ai_analysis.get("risk_score", 0)
             ai_rules = ai_analysis.get("ai_rules", [])
@@ -121,13 +382,11 @@ class RiskEngine:
             ai_rules = []
         
         # 3. 规则合并 - 合并关键词匹配和AI分析的规则
-        print("🔗 步骤3: 规则合并")
-        merged_rules = self._merge_rules(triggered_rules, ai_rules)
+        merged_rules = results["merge"]
         print(f"✅ 规则合并完成: 从{len(triggered_rules) + len(ai_rules)}条合并为{len(merged_rules)}条")
         
         # 4. 风险模式识别
-        print("🔍 步骤4: 风险模式识别")
-        pattern_rules = await self._detect_risk_patterns(text)
+        pattern_rules = results["pattern_analysis"]
         pattern_risk_score = pattern_rules.get("risk_score", 0)
         pattern_rules_list = pattern_rules.get("pattern_rules", [])
         risk_score += pattern_risk_score
@@ -137,32 +396,97 @@ class RiskEngine:
         final_score = min(risk_score, 100)
         print(f"🎯 扫描完成: 总风险分 {risk_score} -> 最终分 {final_score}")
         print(f"📊 总计触发 {len(merged_rules)} 条规则")
+        print(f"⏱️ 阶段耗时: {timeline['stages']}, 关键路径: {' -> '.join(timeline['critical_path'])}")
+        for stage, timing in timeline["stages"].items():
+            RISK_STAGE_DURATION.observe(timing["duration_ms"] / 1000, stage=stage)
         
         result = {
             "score": final_score,
             "rules": merged_rules,
             "total_rules": len(merged_rules),
             "ai_analysis": ai_analysis,
-            "pattern_analysis": pattern_rules
+            "pattern_analysis": pattern_rules,
+            "stage_timings": timeline
         }
         
+        self._emit(on_event, "merged_rules", {"score": final_score, "rules": merged_rules})
+        if not fused:
+            await self._log_analysis(snapshot, text, triggered_rules, pattern_rules, ai_analysis)
         print(f"📤 返回结果: {result}")
         return result
     
-    async def _ai_risk_analysis(self, text: str) -> Dict:
+    async def _prechecked_ai_analysis(
+        self,
+        text: str,
+        snapshot: EngineSnapshot,
+        keyword_rules: List[Dict],
+        pattern_result: Dict,
+        pending_ai: Optional[asyncio.Task] = None
+    ) -> Dict:
+        """先做前置预判，只有需要时才调用AI风险分析；pending_ai为已提前发出的AI分析，不需要时取消"""
+        keyword_score = sum(rule["risk_value"] for rule in keyword_rules)
+        pattern_score = pattern_result.get("risk_score", 0)
+        decision = self.ai_precheck.decide(
+            text,
+            keyword_score,
+            pattern_score,
+            len(keyword_rules) + len(pattern_result.get("pattern_rules", [])),
+            snapshot.weight_config.get("risk_levels", {}).get("warning", 40)
+        )
+        AI_PRECHECK_DECISIONS.inc(outcome=decision.outcome)
+        RISK_STAGE_DURATION.observe(decision.elapsed_ms / 1000, stage="ai_precheck")
+        if decision.run_ai:
+            ai_result = await (pending_ai if pending_ai is not None else self._ai_risk_analysis(text, snapshot))
+        else:
+            if pending_ai is not None:
+                pending_ai.cancel()
+            print(f"⏭️ {decision.reason}")
+            ai_result = {
+                "risk_score": 0,
+                "risk_reasons": [decision.reason],
+                "ai_rules": [],
+                "verification_suggestions": []
+            }
+        ai_result["precheck"] = decision.to_dict()
+        return ai_result
+    
+    async def _log_analysis(
+        self,
+        snapshot: EngineSnapshot,
+        text: str,
+        keyword_rules: List[Dict],
+        pattern_result: Dict,
+        ai_analysis: Optional[Dict]
+    ):
+        """记录AI实际参与且未降级的扫描，作为预判模型的训练样本"""
+        analysis_log = get_analysis_log()
+        if analysis_log is None or not ai_analysis or ai_analysis.get("precheck", {}).get("skipped"):
+            return
+        tracker = current_degradation()
+        if tracker is not None and tracker.degraded:
+            return
+        record = {
+            "text": text,
+            "keyword_score": sum(rule["risk_value"] for rule in keyword_rules),
+            "pattern_score": pattern_result.get("risk_score", 0),
+            "rule_count": len(keyword_rules) + len(pattern_result.get("pattern_rules", [])),
+            "ai_score": ai_analysis.get("risk_score", 0),
+            "ai_rule_count": len(ai_analysis.get("ai_rules", [])),
+            "warning_threshold": snapshot.weight_config.get("risk_levels", {}).get("warning", 40),
+            "terminate_threshold": snapshot.weight_config.get("risk_levels", {}).get("terminate", 75)
+        }
+        try:
+            await asyncio.to_thread(analysis_log.append, record)
+        except OSError as e:
+            print(f"⚠️ 分析记录写入失败: {e}")
+    
+    async def _ai_risk_analysis(self, text: str, snapshot: EngineSnapshot) -> Dict:
         """AI智能风险分析 - 判断是否匹配配置文件中的风险规则"""
         print(f"🤖 开始AI风险分析，文本: {text[:50]}...")
         
         try:
             # 构建风险规则信息，让AI判断是否匹配
-            risk_rules_info = []
-            for rule_name, rule_config in self.risk_rules.items():
-                risk_rules_info.append({
-                    "rule_name": rule_name,
-                    "keywords": rule_config["触发词"],
-                    "risk_value": rule_config["风险值"],
-                    "description": f"检测{rule_name}相关的风险"
-                })
+            risk_rules_info = self._build_risk_rules_info(snapshot.risk_rules)
             
             prompt = f"""
             你是一个专业的风险分析专家，请分析以下个人信息是否匹配已知的风险规则。
@@ -208,10 +532,19 @@ class RiskEngine:
             print(f"🌐 API地址: {self.deepseek_service.api_base}")
             
             result = await self.deepseek_service.generate_verification_tactic(
-                "AI风险分析", {"prompt": prompt}
+                "AI风险分析", {"prompt": prompt}, expect_json=True
             )
             
             print(f"📥 AI返回结果: {result}")
+            if result is None:
+                # 熔断、超出预算或接口失败，原因已计入DeepSeek调用指标，不按解析失败处理
+                mark_degraded("ai_analysis_fallback")
+                return {
+                    "risk_score": 0,
+                    "risk_reasons": ["AI服务暂不可用，仅使用本地规则分析"],
+                    "ai_rules": [],
+                    "verification_suggestions": ["请手动验证信息"]
+                }
             
             # 尝试解析AI返回的JSON
             try:
@@ -230,23 +563,15 @@ class RiskEngine:
                 print(f"✅ AI结果JSON解析成功: {ai_result}")
                 
                 # 验证AI返回的风险值是否与配置文件一致
-                for rule in ai_result.get("ai_rules", []):
-                    rule_name = rule.get("rule_name", "")
-                    ai_risk_value = rule.get("risk_value", 0)
-                    matched_rule = rule.get("matched_rule", "")
-                    
-                    if matched_rule and matched_rule in self.risk_rules:
-                        config_risk_value = self.risk_rules[matched_rule]["风险值"]
-                        if ai_risk_value != config_risk_value:
-                            print(f"⚠️ 风险值不一致: AI返回{ai_risk_value}, 配置文件{config_risk_value}, 使用配置文件值")
-                            rule["risk_value"] = config_risk_value
-                
+                self._enforce_config_risk_values(ai_result, snapshot.risk_rules)
                 return ai_result
             except json.JSONDecodeError as e:
+                DEEPSEEK_CALLS.inc(outcome="json_parse_failure")
                 print(f"❌ AI返回结果JSON解析失败: {e}")
                 print(f"📝 原始返回内容: {result}")
                 print(f"🧹 清理后内容: {cleaned_result if 'cleaned_result' in locals() else '未清理'}")
                 # 如果AI返回的不是JSON，使用默认分析
+                mark_degraded("ai_analysis_fallback")
                 return {
                     "risk_score": 0,
                     "risk_reasons": ["AI分析完成，但返回格式异常"],
@@ -258,6 +583,7 @@ class RiskEngine:
             print(f"❌ AI风险分析异常: {e}")
             import traceback
             print(f"📋 异常堆栈: {traceback.format_exc()}")
+            mark_degraded("ai_analysis_fallback")
             return {
                 "risk_score": 0,
                 "risk_reasons": [f"AI分析失败: {str(e)}"],
@@ -265,6 +591,151 @@ class RiskEngine:
                 "verification_suggestions": ["请手动验证信息"]
             }
     
+    def _build_risk_rules_info(self, risk_rules: Dict) -> List[Dict]:
+        """构建提示词中的已知风险规则列表"""
+        risk_rules_info = []
+        for rule_name, rule_config in risk_rules.items():
+            risk_rules_info.append({
+                "rule_name": rule_name,
+                "keywords": rule_config.get("触发词", []),
+                "risk_value": rule_config.get("风险值", 0),
+                "description": f"检测{rule_name}相关的风险"
+            })
+        return risk_rules_info
+    
+    def _enforce_config_risk_values(self, ai_result: Dict, risk_rules: Dict):
+        """AI匹配到配置规则时，风险值以配置文件为准"""
+        for rule in ai_result.get("ai_rules", []):
+            ai_risk_value = rule.get("risk_value", 0)
+            matched_rule = rule.get("matched_rule", "")
+            
+            if matched_rule and matched_rule in risk_rules:
+                config_risk_value = risk_rules[matched_rule].get("风险值", 0)
+                if ai_risk_value != config_risk_value:
+                    print(f"⚠️ 风险值不一致: AI返回{ai_risk_value}, 配置文件{config_risk_value}, 使用配置文件值")
+                    rule["risk_value"] = config_risk_value
+    
+    async def _fused_risk_analysis(
+        self,
+        text: str,
+        snapshot: EngineSnapshot,
+        keyword_rules: List[Dict],
+        pattern_rules: List[Dict]
+    ) -> Dict:
+        """融合模式 - 一次LLM调用同时完成风险分析和话术生成
+        
+        本地已识别的关键词规则和模式规则随提示词一起发送，让模型为最终的每条规则
+        （本地规则 + 新发现的AI规则）直接给出优化后的验证话术。
+        """
+        print(f"🤖 开始融合模式AI分析，文本: {text[:50]}...")
+        risk_rules = snapshot.risk_rules
+        local_rules = [
+            {
+                "rule_name": rule.get("rule_name", ""),
+                "keywords": rule.get("keywords", []),
+                "description": rule.get("description", "")
+            }
+            for rule in keyword_rules + pattern_rules
+        ]
+        
+        prompt = f"""
+你是一个专业的婚恋风控专家，需要一次性完成风险分析和验证话术生成。
+
+## 已知风险规则：
+{json.dumps(self._build_risk_rules_info(risk_rules), ensure_ascii=False, indent=2)}
+
+## 本地已识别的风险规则：
+{json.dumps(local_rules, ensure_ascii=False, indent=2)}
+
+## 个人信息：
+{text}
+
+## 任务一：风险分析
+1. 判断个人信息是否匹配已知风险规则（语义相关也算匹配）
+2. 匹配到已知规则时必须使用配置文件中的风险值，并在matched_rule字段中标注
+3. 不匹配任何已知规则时提出新的风险点（风险值设为5-15）
+4. 必须返回至少1条ai_rules
+
+## 任务二：验证话术
+为"本地已识别的风险规则"和ai_rules中的每条规则各生成1条验证问题，要求：
+1. 像朋友聊天一样自然委婉，不用"请提供"、"需要验证"等命令式语言
+2. 用"能否分享一下"、"方便了解一下"等引导性表达
+3. 针对具体风险点；rule_name必须与对应规则的rule_name完全一致
+
+请严格按照以下JSON格式返回，不要有其他文字：
+{{
+    "risk_score": 总风险评分(累加ai_rules的风险值),
+    "risk_reasons": ["风险原因1"],
+    "ai_rules": [
+        {{
+            "rule_name": "规则名称",
+            "risk_value": 风险值,
+            "detection_method": "ai_analysis",
+            "description": "AI分析描述",
+            "matched_rule": "匹配的配置文件规则名称(如果匹配到)"
+        }}
+    ],
+    "verification_suggestions": ["建议验证的问题1"],
+    "tactics": [
+        {{
+            "rule_name": "规则名称",
+            "tactic": "自然委婉的验证问题",
+            "priority": "high"
+        }}
+    ]
+}}
+"""
+        result = await self.deepseek_service.generate_verification_tactic(
+            "AI风险分析", {"prompt": prompt}, expect_json=True
+        )
+        ai_result = self._parse_ai_result(result)
+        if not isinstance(ai_result, dict):
+            print(f"❌ 融合模式结果解析失败，AI分析按空结果处理")
+            mark_degraded("ai_analysis_fallback")
+            return {
+                "risk_score": 0,
+                "risk_reasons": ["AI分析完成，但返回格式异常"],
+                "ai_rules": [],
+                "verification_suggestions": ["请进一步验证信息真实性"],
+                "mode": "fused"
+            }
+        
+        self._enforce_config_risk_values(ai_result, risk_rules)
+        ai_result["mode"] = "fused"
+        print(f"✅ 融合模式AI分析完成: {len(ai_result.get('ai_rules', []))}条AI规则, {len(ai_result.get('tactics', []))}条话术")
+        return ai_result
+    
+    def _resolve_fused_tactics(self, triggered_rules: List[Dict], ai_tactics: List[Dict]) -> Optional[List[Dict]]:
+        """把融合模式返回的话术对齐到最终规则，缺失的规则补默认话术
+        
+        一条规则都对不上时返回None，由调用方走常规话术生成。
+        """
+        by_rule = {}
+        for tactic in ai_tactics or []:
+            if isinstance(tactic, dict) and tactic.get("rule_name") and tactic.get("tactic"):
+                by_rule.setdefault(tactic["rule_name"], tactic)
+        
+        tactics = []
+        matched = 0
+        for rule in triggered_rules:
+            rule_name = rule.get("rule_name", "")
+            tactic = by_rule.get(rule_name) or by_rule.get(rule.get("matched_rule", ""))
+            if tactic:
+                matched += 1
+                tactics.append({
+                    "rule_name": rule_name,
+                    "tactic": tactic["tactic"],
+                    "knowledge": rule.get("description") or "AI生成话术",
+                    "priority": tactic.get("priority", "medium")
+                })
+            else:
+                tactics.append(self._generate_default_tactic_for_rule(rule))
+        
+        if not matched:
+            return None
+        print(f"✅ 复用融合模式话术: {matched}/{len(triggered_rules)}条")
+        return tactics
+    
     def _merge_rules(self, keyword_rules: List[Dict], ai_rules: List[Dict]) -> List[Dict]:
         """合并关键词匹配和AI分析的规则 - 智能合并策略"""
         print(f"🔗 开始合并规则: 关键词规则{len(keyword_rules)}条, AI规则{len(ai_rules)}条")
@@ -278,6 +749,7 @@ class RiskEngine:
                 'rule_name': rule_name,
                 'risk_value': rule['risk_value'],
                 'keywords': rule['keywords'],
+                'keyword_offsets': rule.get('keyword_offsets', {}),
                 'detection_method': 'keyword_match',
                 'description': '',
                 'matched_rule': rule_name,
@@ -330,7 +802,7 @@ class RiskEngine:
         print(f"✅ 规则合并完成: 最终{len(result)}条规则")
         return result
     
-    async def _detect_risk_patterns(self, text: str) -> Dict:
+    async def _detect_risk_patterns(self, text: str, snapshot: EngineSnapshot) -> Dict:
         """风险模式识别"""
         patterns = []
         risk_score = 0
@@ -347,46 +819,54 @@ class RiskEngine:
             })
             risk_score += 10
         
-        # 2. 重复信息检测
-        words = text.split()
-        word_freq = {}
-        for word in words:
-            if len(word) > 2:  # 只统计长度>2的词
-                word_freq[word] = word_freq.get(word, 0) + 1
-        
-        repeated_words = [word for word, freq in word_freq.items() if freq > 3]
-        if repeated_words:
+        # 2. 重复信息检测 - 后缀自动机线性时间找出重复片段，不依赖空格分词
+        repetition = {
+            **DEFAULT_REPETITION_CONFIG,
+            **(snapshot.weight_config.get("pattern_analysis", {}).get("repetition") or {})
+        }
+        detect_args = (text, repetition["min_length"], repetition["min_count"], repetition["max_results"])
+        with RISK_STAGE_DURATION.time(stage="repeat_detection"):
+            if len(text) > REPEAT_DETECTION_INLINE_CHARS:
+                repeats = await asyncio.to_thread(find_repeated_substrings, *detect_args)
+            else:
+                repeats = find_repeated_substrings(*detect_args)
+        if repeats:
             patterns.append({
                 "rule_name": "重复信息模式",
-                "risk_value": 5,
+                "risk_value": repetition["risk_value"],
                 "detection_method": "pattern_analysis",
-                "description": f"存在重复词汇: {', '.join(repeated_words[:3])}"
+                "description": f"存在重复内容: {', '.join(f'{item.text}（{item.count}次）' for item in repeats)}",
+                "repeats": [item.to_dict() for item in repeats]
             })
-            risk_score += 5
-        
-        # 3. 矛盾信息检测
-        contradictions = []
-        if "未婚" in text and "离异" in text:
-            contradictions.append("婚姻状态矛盾")
-        if "独生子" in text and "兄弟" in text:
-            contradictions.append("家庭结构矛盾")
+            risk_score += repetition["risk_value"]
         
+        # 3. 矛盾信息检测 - 所有互斥词组编译在同一个自动机中，单次扫描
+        contradictions = snapshot.contradiction_matcher.scan(text)
         if contradictions:
+            contradiction_risk = max(item["risk_value"] for item in contradictions)
             patterns.append({
                 "rule_name": "信息矛盾模式",
-                "risk_value": 15,
+                "risk_value": contradiction_risk,
                 "detection_method": "pattern_analysis",
-                "description": f"信息存在矛盾: {', '.join(contradictions)}"
+                "description": f"信息存在矛盾: {', '.join(item['rule_name'] for item in contradictions)}",
+                "contradictions": contradictions
             })
-            risk_score += 15
+            risk_score += contradiction_risk
         
         return {
             "risk_score": risk_score,
             "pattern_rules": patterns
         }
     
-    async def generate_verification_tactics(self, triggered_rules: List[Dict], ai_analysis: Dict = None) -> List[Dict]:
-        """生成验证话术 - 调用话术优化服务"""
+    @track_in_progress(RISK_ANALYSIS_IN_FLIGHT, operation="generate_tactics")
+    async def generate_verification_tactics(
+        self,
+        triggered_rules: List[Dict],
+        ai_analysis: Dict = None,
+        profile_text: str = "",
+        snapshot: Optional[EngineSnapshot] = None
+    ) -> List[Dict]:
+        """生成验证话术 - 调用话术优化服务；profile_text为个人信息原文，用于检索相关政策知识"""
         print(f"🤖 开始生成验证话术")
         print(f"📋 触发规则数量: {len(triggered_rules)}")
         
@@ -397,27 +877,94 @@ class RiskEngine:
             print("❌ 没有识别到风险规则，无法生成话术")
             return []
         
+        # 融合模式的AI分析已附带话术，无需再次调用LLM
+        if ai_analysis and ai_analysis.get("tactics"):
+            fused_tactics = self._resolve_fused_tactics(triggered_rules, ai_analysis["tactics"])
+            if fused_tactics is not None:
+                return fused_tactics
+        
         # 调用话术优化服务
         print(f"🚀 调用话术优化服务，基于AI分析结果生成自然委婉的验证问题")
-        optimized_tactics = await self._optimize_verification_tactics(triggered_rules, ai_analysis)
+        optimized_tactics = await self._optimize_verification_tactics(
+            triggered_rules, ai_analysis, profile_text, snapshot or self.snapshot
+        )
         
         total_time = time.time() - start_time
+        RISK_STAGE_DURATION.observe(total_time, stage="tactic_generation")
         print(f"⏱️ 话术生成总耗时: {total_time:.2f}秒")
         print(f"🎉 话术生成完成，总共{len(optimized_tactics)}条")
         
         return optimized_tactics
 
-    async def _optimize_verification_tactics(self, triggered_rules: List[Dict], ai_analysis: Dict) -> List[Dict]:
+    async def stream_verification_tactics(
+        self,
+        triggered_rules: List[Dict],
+        ai_analysis: Dict = None,
+        profile_text: str = "",
+        snapshot: Optional[EngineSnapshot] = None
+    ) -> AsyncIterator[Dict]:
+        """流式生成验证话术 - LLM每输出完一条话术就立即产出
+
+        已产出的话术无法撤回，因此LLM漏掉的规则在最后用默认话术补齐（而非整体降级）。
+        """
+        if not triggered_rules:
+            print("❌ 没有识别到风险规则，无法生成话术")
+            return
+        
+        if ai_analysis and ai_analysis.get("tactics"):
+            fused_tactics = self._resolve_fused_tactics(triggered_rules, ai_analysis["tactics"])
+            if fused_tactics is not None:
+                for tactic in fused_tactics:
+                    yield tactic
+                return
+        
+        start_time = time.time()
+        prompt = self._build_tactics_optimization_prompt(
+            triggered_rules, ai_analysis, profile_text, snapshot or self.snapshot
+        )
+        rules_by_name = {rule.get("rule_name", ""): rule for rule in triggered_rules}
+        emitted = set()
+        print(f"🚀 流式调用话术优化服务，规则数量: {len(triggered_rules)}")
+        async for tactic in self.deepseek_service.stream_json_array(prompt, "tactics"):
+            rule_name = tactic.get("rule_name", "") if isinstance(tactic, dict) else ""
+            if rule_name not in rules_by_name or rule_name in emitted or not tactic.get("tactic"):
+                print(f"⚠️ 跳过无效或重复的流式话术: {tactic}")
+                continue
+            emitted.add(rule_name)
+            yield self._convert_tactics_to_standard([tactic], triggered_rules)[0]
+        
+        missing = [rule for name, rule in rules_by_name.items() if name not in emitted]
+        if missing:
+            print(f"⚠️ 流式话术缺少{len(missing)}条，使用默认话术补齐")
+            if emitted:
+                mark_degraded("partial_default_tactics")
+                default_tactics = [self._generate_default_tactic_for_rule(rule) for rule in missing]
+            else:
+                default_tactics = self._generate_default_tactics(missing)
+            for tactic in default_tactics:
+                yield tactic
+        
+        total_time = time.time() - start_time
+        RISK_STAGE_DURATION.observe(total_time, stage="tactic_generation")
+        print(f"⏱️ 流式话术生成总耗时: {total_time:.2f}秒")
+    
+    async def _optimize_verification_tactics(
+        self,
+        triggered_rules: List[Dict],
+        ai_analysis: Dict,
+        profile_text: str,
+        snapshot: EngineSnapshot
+    ) -> List[Dict]:
         """话术优化服务 - 基于AI分析结果生成自然委婉的验证问题"""
         print(f"🔧 开始话术优化，基于{len(triggered_rules)}条规则和AI分析结果")
         
         try:
             # 构建话术优化prompt
-            prompt = self._build_tactics_optimization_prompt(triggered_rules, ai_analysis)
+            prompt = self._build_tactics_optimization_prompt(triggered_rules, ai_analysis, profile_text, snapshot)
             
             print(f"📤 调用DeepSeek API进行话术优化")
             result = await self.deepseek_service.generate_verification_tactic(
-                "话术优化服务", {"prompt": prompt}
+                "话术优化服务", {"prompt": prompt}, expect_json=True
             )
             print(f"✅ 话术优化成功: {result}")
             
@@ -444,7 +991,13 @@ class RiskEngine:
             # 降级到默认话术
             return self._generate_default_tactics(triggered_rules)
 
-    def _build_tactics_optimization_prompt(self, triggered_rules: List[Dict], ai_analysis: Dict) -> str:
+    def _build_tactics_optimization_prompt(
+        self,
+        triggered_rules: List[Dict],
+        ai_analysis: Dict,
+        profile_text: str,
+        snapshot: EngineSnapshot
+    ) -> str:
         """构建话术优化提示词"""
         
         # 构建规则信息
@@ -461,6 +1014,15 @@ class RiskEngine:
         # 获取AI分析中的验证建议
         ai_suggestions = ai_analysis.get("verification_suggestions", []) if ai_analysis else []
         
+        # 检索与各规则相关的政策知识，作为提问背景
+        knowledge_info = self._retrieve_rule_knowledge(triggered_rules, profile_text, snapshot)
+        knowledge_section = ""
+        if knowledge_info:
+            knowledge_section = f"""
+## 相关政策知识（可作为提问背景自然融入，不要生硬引用）：
+{json.dumps(knowledge_info, ensure_ascii=False, indent=2)}
+"""
+        
         prompt = f"""
 你是一个专业的婚恋风控话术优化专家。请基于以下信息，生成自然、委婉的验证问题：
 
@@ -469,7 +1031,7 @@ class RiskEngine:
 
 ## AI分析的验证建议：
 {json.dumps(ai_suggestions, ensure_ascii=False, indent=2)}
-
+{knowledge_section}
 ## 优化要求：
 1. **自然委婉**：问题要像朋友聊天一样自然，不能太直接或生硬
 2. **避免质疑**：不要用"请提供"、"需要验证"等命令式语言
@@ -500,8 +1062,11 @@ class RiskEngine:
         
         return prompt
     
-    def _parse_ai_result(self, result: str) -> Optional[Dict]:
-        """解析AI结果，失败立即返回None"""
+    def _parse_ai_result(self, result: Optional[str]) -> Optional[Dict]:
+        """解析AI结果，失败立即返回None；result为None表示AI调用本身未成功"""
+        if result is None:
+            print(f"❌ AI调用未返回结果")
+            return None
         try:
             # 清理markdown代码块标记
             cleaned_result = result.strip()
@@ -517,6 +1082,7 @@ class RiskEngine:
             return parsed_result
             
         except Exception as e:
+            DEEPSEEK_CALLS.inc(outcome="json_parse_failure")
             print(f"❌ AI结果解析失败: {e}")
             print(f"📋 原始结果: {result}")
             return None
@@ -618,11 +1184,14 @@ class RiskEngine:
             print(f"🌐 开始调用DeepSeek API，批量处理{len(ai_rules)}条规则")
             
             result = await self.deepseek_service.generate_verification_tactic(
-                "批量话术生成", {"prompt": prompt}
+                "批量话术生成", {"prompt": prompt}, expect_json=True
             )
             
             api_time = time.time() - api_start
             print(f"⏱️ AI API调用耗时: {api_time:.2f}秒")
+            if result is None:
+                print(f"❌ 批量AI话术生成未返回结果，使用默认话术")
+                return self._generate_default_tactics(ai_rules)
             print(f"✅ 批量AI话术生成成功: {result}")
             
             # 解析返回结果
@@ -669,12 +1238,14 @@ class RiskEngine:
                 print(f"⏱️ 结果解析耗时: {parse_time:.2f}秒")
                 
                 total_time = time.time() - start_time
+                RISK_STAGE_DURATION.observe(total_time, stage="batch_tactic_generation")
                 print(f"⏱️ 批量话术生成总耗时: {total_time:.2f}秒")
                 print(f"✅ 成功生成{len(result_tactics)}条话术")
                 
                 return result_tactics
                 
             except json.JSONDecodeError as e:
+                DEEPSEEK_CALLS.inc(outcome="json_parse_failure")
                 print(f"❌ 批量话术JSON解析失败: {e}")
                 print(f"📋 原始返回内容: {result}")
                 return self._generate_default_tactics(ai_rules)
@@ -710,6 +1281,7 @@ class RiskEngine:
     
     def _generate_default_tactics(self, ai_rules: List[Dict]) -> List[Dict]:
         """生成默认话术（备用方案）"""
+        mark_degraded("default_tactics")
         tactics = []
         for rule in ai_rules:
             tactic = self._generate_default_tactic_for_rule(rule)
@@ -777,8 +1349,53 @@ class RiskEngine:
         )
         return tactic
     
-    def _select_knowledge_item(self, rule_name: str) -> Dict[str, str]:
-        """选择知识库条目"""
+    def search_knowledge(
+        self,
+        query: str,
+        top_k: int = 3,
+        snapshot: Optional[EngineSnapshot] = None
+    ) -> List[Dict[str, str]]:
+        """在全部知识库表中检索与query最相关的条目"""
+        snapshot = snapshot or self.snapshot
+        hits = []
+        for name, index in snapshot.knowledge_indexes.items():
+            for row, score in index.search(query, top_k):
+                hits.append((score, name, row))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [snapshot.knowledge_base[name].row(row) for _, name, row in hits[:top_k]]
+    
+    def _retrieve_rule_knowledge(
+        self,
+        triggered_rules: List[Dict],
+        profile_text: str,
+        snapshot: EngineSnapshot
+    ) -> List[Dict]:
+        """为每条规则检索相关政策知识（规则名、触发词、描述和个人信息共同作为检索词）"""
+        top_k = settings.knowledge_top_k
+        if top_k <= 0:
+            return []
+        start_time = time.perf_counter()
+        knowledge_info = []
+        for rule in triggered_rules:
+            query = " ".join([
+                rule.get("rule_name") or "",
+                " ".join(str(keyword) for keyword in rule.get("keywords") or []),
+                rule.get("description") or "",
+                profile_text or ""
+            ])
+            items = self.search_knowledge(query, top_k, snapshot)
+            if items:
+                knowledge_info.append({"规则": rule.get("rule_name", ""), "相关知识": items})
+        RISK_STAGE_DURATION.observe(time.perf_counter() - start_time, stage="knowledge_retrieval")
+        return knowledge_info
+    
+    def _select_knowledge_item(self, rule_name: str, profile_text: str = "") -> Dict[str, str]:
+        """选择知识库条目：优先按相关度检索，无命中时按规则类别随机选择"""
+        snapshot = self.snapshot
+        items = self.search_knowledge(f"{rule_name} {profile_text}", top_k=1, snapshot=snapshot)
+        if items:
+            return items[0]
+        
         # 根据规则名称匹配知识库
         if "职业" in rule_name or "金融" in rule_name:
             knowledge_key = "finance_policies"
@@ -787,8 +1404,9 @@ class RiskEngine:
         else:
             knowledge_key = "finance_policies"  # 默认使用金融政策
         
-        if knowledge_key in self.knowledge_base and self.knowledge_base[knowledge_key]:
-            return random.choice(self.knowledge_base[knowledge_key])
+        table = snapshot.knowledge_base.get(knowledge_key)
+        if table:
+            return table.random_row()
         
         # 返回默认知识
         return {
@@ -797,59 +1415,137 @@ class RiskEngine:
             "关键条款": "重要条款"
         }
     
+    @track_in_progress(RISK_ANALYSIS_IN_FLIGHT, operation="dynamic_analysis")
+    @reports_degradation
     async def analyze_response(self, response_text: str, verification_tactics: List[Dict] = None) -> Dict:
         """分析用户回答"""
-        return await self.deepseek_service.analyze_response_risk(response_text, verification_tactics)
+        with RISK_STAGE_DURATION.time(stage="dynamic_analysis"):
+            return await self.deepseek_service.analyze_response_risk(response_text, verification_tactics)
+    
+    def score_responses(self, texts: List[str]) -> List[Dict]:
+        """本地词表批量评分（不调用AI），用于历史回答回溯等批量场景"""
+        with RISK_STAGE_DURATION.time(stage="response_scoring"):
+            return self.snapshot.response_scorer.score_batch(texts)
     
-    def make_decision(self, static_score: int, dynamic_score: int) -> Dict:
+    @staticmethod
+    def _decision_params(weight_config: Dict) -> Dict:
+        """决策权重与阈值"""
+        return {
+            "static_weight": weight_config.get("decision_engine", {}).get("static_weight", 0.6),
+            "dynamic_weight": weight_config.get("decision_engine", {}).get("dynamic_weight", 0.4),
+            "terminate_threshold": weight_config.get("risk_levels", {}).get("terminate", 75),
+            "warning_threshold": weight_config.get("risk_levels", {}).get("warning", 40)
+        }
+    
+    @staticmethod
+    def _classify(total_score: float, params: Dict) -> Tuple[str, str]:
+        """总分 -> (决策, 风险等级)"""
+        if total_score >= params["terminate_threshold"]:
+            return "TERMINATE", "高风险"
+        if total_score >= params["warning_threshold"]:
+            return "WARNING", "中风险"
+        return "PASS", "低风险"
+    
+    def decision_bounds(self, static_score: float, snapshot: Optional[EngineSnapshot] = None) -> Dict:
+        """动态分在0~100范围内取任意值时总分和决策的可能范围；fixed为True表示决策已与回答无关"""
+        params = self._decision_params((snapshot or self.snapshot).weight_config)
+        totals = sorted(
+            static_score * params["static_weight"] + dynamic_score * params["dynamic_weight"]
+            for dynamic_score in (DYNAMIC_SCORE_MIN, DYNAMIC_SCORE_MAX)
+        )
+        # 决策随总分单调，只需比较两端
+        decisions = [self._classify(total, params)[0] for total in totals]
+        return {
+            "fixed": decisions[0] == decisions[1],
+            "decisions": decisions,
+            "total_range": [round(total, 2) for total in totals]
+        }
+    
+    def make_decision(
+        self,
+        static_score: int,
+        dynamic_score: int,
+        snapshot: Optional[EngineSnapshot] = None
+    ) -> Dict:
         """决策引擎"""
-        # 获取权重配置
-        static_weight = self.weight_config.get("decision_engine", {}).get("static_weight", 0.6)
-        dynamic_weight = self.weight_config.get("decision_engine", {}).get("dynamic_weight", 0.4)
+        start_time = time.perf_counter()
+        # 获取权重和阈值配置
+        params = self._decision_params((snapshot or self.snapshot).weight_config)
         
         # 计算总分
-        total_score = static_score * static_weight + dynamic_score * dynamic_weight
-        
-        # 获取阈值配置
-        terminate_threshold = self.weight_config.get("risk_levels", {}).get("terminate", 75)
-        warning_threshold = self.weight_config.get("risk_levels", {}).get("warning", 40)
+        total_score = static_score * params["static_weight"] + dynamic_score * params["dynamic_weight"]
         
         # 决策
-        if total_score >= terminate_threshold:
-            decision = "TERMINATE"
-            risk_level = "高风险"
-        elif total_score >= warning_threshold:
-            decision = "WARNING"
-            risk_level = "中风险"
-        else:
-            decision = "PASS"
-            risk_level = "低风险"
+        decision, risk_level = self._classify(total_score, params)
         
+        RISK_STAGE_DURATION.observe(time.perf_counter() - start_time, stage="decision")
         return {
             "decision": decision,
             "risk_level": risk_level,
             "total_score": round(total_score, 2),
             "static_score": static_score,
             "dynamic_score": dynamic_score,
-            "static_weight": static_weight,
-            "dynamic_weight": dynamic_weight,
-            "terminate_threshold": terminate_threshold,
-            "warning_threshold": warning_threshold
+            **params
         }
     
+    async def _bounded_dynamic_analysis(
+        self,
+        snapshot: EngineSnapshot,
+        static_score: Optional[float],
+        user_response: str,
+        verification_tactics: List[Dict]
+    ) -> Dict:
+        """动态分析前先计算决策范围：无论回答如何决策都不变时不调用AI，只用本地词表评分并标注short_circuit"""
+        if settings.dynamic_short_circuit and static_score is not None:
+            bounds = self.decision_bounds(static_score, snapshot)
+            if bounds["fixed"]:
+                decision = bounds["decisions"][0]
+                DYNAMIC_SHORT_CIRCUITS.inc(decision=decision)
+                print(f"⏭️ 静态分{static_score}下决策恒为{decision}，跳过AI动态分析")
+                with RISK_STAGE_DURATION.time(stage="dynamic_analysis_local"):
+                    result = snapshot.response_scorer.score(user_response)
+                result["short_circuit"] = {
+                    "decision": decision,
+                    "total_range": bounds["total_range"],
+                    "reason": f"静态分{static_score}时动态分取0~100决策均为{decision}，未调用AI动态分析，动态分为本地词表评分"
+                }
+                return result
+        return await self.analyze_response(user_response, verification_tactics)
+    
+    @staticmethod
+    def _extract_static_score(static_result: Dict) -> float:
+        """兼容三种结构：包含static_scan的完整结果、静态扫描结果本身、只有rules"""
+        if "static_scan" in static_result:
+            return static_result["static_scan"]["score"]
+        if "score" in static_result:
+            return static_result["score"]
+        return sum(rule.get("risk_value", 0) for rule in static_result.get("rules", []))
+    
+    @track_in_progress(RISK_ANALYSIS_IN_FLIGHT, operation="full_analysis")
+    @reports_degradation
     async def full_risk_analysis(
         self, 
         input_text: str, 
-        user_response: str = None
+        user_response: str = None,
+        on_event: Optional[EventCallback] = None,
+        fused: Optional[bool] = None
     ) -> Dict:
-        """完整风控分析流程"""
+        """完整风控分析流程；传入on_event时每个阶段完成即推送事件
+        
+        fused为True时风险分析与话术生成合并为一次LLM调用，None时使用配置默认值。
+        """
+        if fused is None:
+            fused = settings.fused_analysis_default
         print(f"🚀 开始完整风控分析流程")
         print(f"📝 输入文本: {input_text[:50]}...")
         print(f"💬 用户回答: {user_response if user_response else '无'}")
         
+        # 整个流程使用同一个配置快照
+        snapshot = self.snapshot
+        
         # 1. 静态风险扫描
         print(f"🔍 步骤1: 开始静态风险扫描")
-        static_result = await self.static_risk_scan(input_text)
+        static_result = await self.static_risk_scan(input_text, on_event=on_event, fused=fused, snapshot=snapshot)
         print(f"✅ 静态扫描完成: {static_result}")
         
         # 2. 生成验证话术
@@ -858,12 +1554,17 @@ class RiskEngine:
         print(f"📋 AI分析结果: {static_result.get('ai_analysis', {})}")
         
         try:
-            tactics = await self.generate_verification_tactics(static_result["rules"], static_result["ai_analysis"])
+            tactics = await self.generate_verification_tactics(
+                static_result["rules"], static_result["ai_analysis"], input_text, snapshot
+            )
             print(f"✅ 话术生成完成: {tactics}")
+            for tactic in tactics:
+                self._emit(on_event, "tactic", tactic)
         except Exception as e:
             print(f"❌ 话术生成失败: {e}")
             import traceback
             print(f"📋 异常堆栈: {traceback.format_exc()}")
+            mark_degraded("tactics_failed")
             tactics = []
         
         # 3. 动态分析（如果有用户回答）
@@ -871,24 +1572,32 @@ class RiskEngine:
         if user_response:
             print(f"💬 步骤3: 开始动态分析用户回答")
             try:
-                # 传入验证话术，让AI知道用户在回答什么
-                dynamic_result = await self.analyze_response(user_response, tactics)
+                # 传入验证话术，让AI知道用户在回答什么；决策已确定时只做本地评分
+                dynamic_result = await self._bounded_dynamic_analysis(
+                    snapshot, static_result["score"], user_response, tactics
+                )
                 print(f"✅ 动态分析完成: {dynamic_result}")
             except Exception as e:
                 print(f"❌ 动态分析失败: {e}")
+                mark_degraded("dynamic_analysis_failed")
                 dynamic_result = None
+            self._emit(on_event, "dynamic", dynamic_result)
         
         # 4. 决策
         print(f"🎯 步骤4: 开始决策分析")
         try:
             decision_result = self.make_decision(
                 static_result["score"],
-                dynamic_result["overall_risk_score"] if dynamic_result else 0
+                dynamic_result["overall_risk_score"] if dynamic_result else 0,
+                snapshot
             )
+            if dynamic_result and dynamic_result.get("short_circuit"):
+                decision_result["dynamic_short_circuit"] = True
             print(f"✅ 决策分析完成: {decision_result}")
         except Exception as e:
             print(f"❌ 决策分析失败: {e}")
             decision_result = {"decision": "ERROR", "risk_level": "分析失败", "total_score": 0}
+        self._emit(on_event, "decision", decision_result)
         
         # 5. 构建证据链
         print(f"🔗 步骤5: 构建证据链")
@@ -940,30 +1649,8 @@ class RiskEngine:
         print(f"📤 返回结果: {final_result}")
         return final_result
     
-    def _generate_default_tactics(self, rules: List[Dict]) -> List[Dict]:
-        """生成默认话术（备用方案）"""
-        tactics = []
-        for rule in rules:
-            rule_name = rule.get("rule_name", "")
-            if "职业" in rule_name:
-                tactic = "能否详细介绍一下您的工作内容和公司情况？"
-            elif "收入" in rule_name or "学历" in rule_name:
-                tactic = "能否具体说明一下您的收入来源和学历背景？"
-            elif "家庭" in rule_name:
-                tactic = "能否详细介绍一下您的家庭情况？"
-            elif "资产" in rule_name:
-                tactic = "能否具体说明一下您的资产状况？"
-            else:
-                tactic = f"请详细说明一下关于{rule_name}的具体情况，这样我们可以更好地了解。"
-            
-            tactics.append({
-                "rule_name": rule_name,
-                "tactic": tactic,
-                "knowledge": "默认话术",
-                "priority": "medium"
-            })
-        return tactics
-
+    @track_in_progress(RISK_ANALYSIS_IN_FLIGHT, operation="comprehensive_analysis")
+    @reports_degradation
     async def comprehensive_risk_analysis(
         self,
         static_result: Dict,
@@ -976,14 +1663,23 @@ class RiskEngine:
         print(f"📝 复用话术结果: {len(verification_tactics)}条话术")
         print(f"💬 用户回答: {user_response[:50]}...")
         
+        snapshot = self.snapshot
+        try:
+            static_score = self._extract_static_score(static_result)
+        except (KeyError, TypeError):
+            static_score = None
+        
         # 1. 动态分析用户回答
         print(f"💬 步骤1: 开始动态分析用户回答")
         try:
-            # 传入验证话术，让AI知道用户在回答什么
-            dynamic_result = await self.analyze_response(user_response, verification_tactics)
+            # 传入验证话术，让AI知道用户在回答什么；决策已确定时只做本地评分
+            dynamic_result = await self._bounded_dynamic_analysis(
+                snapshot, static_score, user_response, verification_tactics
+            )
             print(f"✅ 动态分析完成: {dynamic_result}")
         except Exception as e:
             print(f"❌ 动态分析失败: {e}")
+            mark_degraded("dynamic_analysis_failed")
             dynamic_result = {"overall_risk_score": 0, "risk_tags": ["动态分析失败"]}
         
         # 2. 决策分析
@@ -999,29 +1695,20 @@ class RiskEngine:
                 print(f"🔍 调试: static_scan.score = {static_result['static_scan']['score']}")
         
         try:
-            # 处理不同的数据结构
-            if "static_scan" in static_result:
-                # 如果传入的是包含static_scan的对象
-                static_score = static_result["static_scan"]["score"]
-                print(f"📊 从static_scan中获取分数: {static_score}")
-            elif "score" in static_result:
-                # 如果传入的是直接的static_result
-                static_score = static_result["score"]
-                print(f"📊 直接从static_result获取分数: {static_score}")
-            else:
-                # 如果都没有，尝试从rules计算分数
-                rules = static_result.get("rules", [])
-                print(f"🔍 调试: rules内容: {rules}")
-                static_score = sum(rule.get("risk_value", 0) for rule in rules)
-                print(f"📊 从rules计算分数: {static_score}")
+            if static_score is None:
+                # 结构异常时再取一次，失败则走下方默认决策
+                static_score = self._extract_static_score(static_result)
             
             print(f"🔍 调试: 最终使用的static_score: {static_score}")
             print(f"🔍 调试: dynamic_result: {dynamic_result}")
             
             decision_result = self.make_decision(
                 static_score,
-                dynamic_result["overall_risk_score"]
+                dynamic_result["overall_risk_score"],
+                snapshot
             )
+            if dynamic_result.get("short_circuit"):
+                decision_result["dynamic_short_circuit"] = True
             print(f"✅ 决策分析完成: {decision_result}")
         except Exception as e:
             print(f"❌ 决策分析失败: {e}")
@@ -1108,3 +1795,41 @@ class RiskEngine:
         
         print(f"🎉 综合风控分析完成（复用前两步结果）")
         return final_result
+
+
+# 进程级共享引擎（每个worker一个），由应用lifespan创建
+_shared_engine: Optional[RiskEngine] = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_shared_risk_engine() -> RiskEngine:
+    """获取进程级共享风控引擎，首次调用时创建"""
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = RiskEngine()
+                print(f"✅ 风控引擎已创建，配置版本v{_shared_engine.snapshot.version}")
+    return _shared_engine
+
+
+def update_shared_knowledge_table(csv_file: Path, table: KnowledgeTable) -> Optional[EngineSnapshot]:
+    """知识库文件写入后直接更新共享引擎中的对应表；引擎尚未创建时不做任何事"""
+    if _shared_engine is None:
+        return None
+    try:
+        return _shared_engine.update_knowledge_table(csv_file, table)
+    except Exception as e:
+        print(f"❌ 知识库表更新失败，改为完整重载: {e}")
+        return reload_shared_risk_engine()
+
+
+def reload_shared_risk_engine() -> Optional[EngineSnapshot]:
+    """配置写入后通知共享引擎重载；引擎尚未创建时不做任何事"""
+    if _shared_engine is None:
+        return None
+    try:
+        return _shared_engine.reload()
+    except Exception as e:
+        print(f"❌ 风控引擎重载失败: {e}")
+        return None
@@ -0,0 +1,354 @@
+import operator
+import re
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from app.services.keyword_matcher import AhoCorasick
+
+# 数值条件支持的比较符
+COMPARATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+# 数值单位换算（k/w为常见口语写法）
+UNIT_SCALES = {
+    "": 1, "千": 1e3, "k": 1e3, "K": 1e3, "万": 1e4, "w": 1e4, "W": 1e4,
+    "十万": 1e5, "百万": 1e6, "千万": 1e7, "亿": 1e8,
+}
+# 文本中的数值（允许千分位逗号）及紧随的单位
+NUMBER_PATTERN = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(十万|百万|千万|万|亿|千|[kKwW])?")
+# 共现、数值条件的默认窗口（字数）
+DEFAULT_WINDOW = 10
+
+
+class RuleSyntaxError(ValueError):
+    """risk_rules.json 中的规则写法有误"""
+
+    def __init__(self, rule_name: str, message: str):
+        super().__init__(f"规则「{rule_name}」: {message}")
+        self.rule_name = rule_name
+
+
+@dataclass(frozen=True)
+class Proximity:
+    """共现条件：所有词在window字以内同时出现（ordered为True时需按顺序出现）"""
+    terms: Tuple[str, ...]
+    window: int
+    ordered: bool = False
+
+
+@dataclass(frozen=True)
+class NumericCondition:
+    """数值条件：锚点词之后window字以内的数值（按单位换算后）与阈值比较"""
+    anchors: Tuple[str, ...]
+    window: int
+    op: str
+    threshold: float
+    unit: str
+
+
+@dataclass
+class CompiledRule:
+    name: str
+    risk_value: float
+    keywords: List[str]
+    regexes: List[Pattern]
+    excludes: List[str]
+    proximities: List[Proximity]
+    numerics: List[NumericCondition]
+    # True: 所有条件都满足才触发；False: 任一条件满足即触发
+    require_all: bool = False
+    # 累计评估次数和耗时（纳秒）
+    evaluations: int = field(default=0, compare=False)
+    cost_ns: int = field(default=0, compare=False)
+
+    @property
+    def extended(self) -> bool:
+        """是否使用了触发词以外的扩展语法"""
+        return bool(self.regexes or self.excludes or self.proximities or self.numerics or self.require_all)
+
+    @property
+    def literals(self) -> List[str]:
+        terms = list(self.keywords) + list(self.excludes)
+        for proximity in self.proximities:
+            terms.extend(proximity.terms)
+        for numeric in self.numerics:
+            terms.extend(numeric.anchors)
+        return terms
+
+
+def _terms(rule_name: str, value, key: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(term, str) for term in value):
+        raise RuleSyntaxError(rule_name, f"{key}必须是字符串或字符串数组")
+    return [term for term in value if term]
+
+
+def _window(rule_name: str, condition: Dict) -> int:
+    window = condition.get("窗口", DEFAULT_WINDOW)
+    if not isinstance(window, int) or window < 0:
+        raise RuleSyntaxError(rule_name, "窗口必须是非负整数")
+    return window
+
+
+def compile_rule(rule_name: str, rule_config: Dict) -> CompiledRule:
+    """把一条规则配置编译为CompiledRule，写法有误时抛出RuleSyntaxError"""
+    if not isinstance(rule_config, dict):
+        raise RuleSyntaxError(rule_name, "规则配置必须是对象")
+    risk_value = rule_config.get("风险值", 0)
+    if not isinstance(risk_value, (int, float)):
+        raise RuleSyntaxError(rule_name, "风险值必须是数字")
+
+    regexes = []
+    for pattern in _terms(rule_name, rule_config.get("正则"), "正则"):
+        try:
+            regexes.append(re.compile(pattern))
+        except re.error as e:
+            raise RuleSyntaxError(rule_name, f"正则「{pattern}」无效: {e}")
+
+    proximities = []
+    for condition in rule_config.get("共现") or []:
+        if not isinstance(condition, dict):
+            raise RuleSyntaxError(rule_name, "共现条件必须是对象")
+        terms = _terms(rule_name, condition.get("词"), "共现.词")
+        if len(terms) < 2:
+            raise RuleSyntaxError(rule_name, "共现条件至少需要两个词")
+        proximities.append(Proximity(tuple(terms), _window(rule_name, condition), bool(condition.get("有序", False))))
+
+    numerics = []
+    for condition in rule_config.get("数值") or []:
+        if not isinstance(condition, dict):
+            raise RuleSyntaxError(rule_name, "数值条件必须是对象")
+        anchors = _terms(rule_name, condition.get("前缀词"), "数值.前缀词")
+        if not anchors:
+            raise RuleSyntaxError(rule_name, "数值条件缺少前缀词")
+        op = condition.get("比较", ">=")
+        if op not in COMPARATORS:
+            raise RuleSyntaxError(rule_name, f"不支持的比较符「{op}」，可选: {' '.join(COMPARATORS)}")
+        value = condition.get("值")
+        unit = condition.get("单位", "")
+        if not isinstance(value, (int, float)):
+            raise RuleSyntaxError(rule_name, "数值条件的值必须是数字")
+        if unit not in UNIT_SCALES:
+            raise RuleSyntaxError(rule_name, f"不支持的单位「{unit}」")
+        numerics.append(NumericCondition(tuple(anchors), _window(rule_name, condition), op, value * UNIT_SCALES[unit], unit))
+
+    mode = rule_config.get("匹配方式", "任一")
+    if mode not in ("任一", "全部"):
+        raise RuleSyntaxError(rule_name, "匹配方式只能是「任一」或「全部」")
+
+    return CompiledRule(
+        name=rule_name,
+        risk_value=risk_value,
+        keywords=_terms(rule_name, rule_config.get("触发词"), "触发词"),
+        regexes=regexes,
+        excludes=_terms(rule_name, rule_config.get("排除词"), "排除词"),
+        proximities=proximities,
+        numerics=numerics,
+        require_all=mode == "全部"
+    )
+
+
+def _parse_number(match: re.Match) -> float:
+    return float(match.group(1).replace(",", "")) * UNIT_SCALES[match.group(2) or ""]
+
+
+class CompiledRuleSet:
+    """risk_rules.json 的编译结果 - 所有规则的字面量（触发词、排除词、共现词、数值锚点）
+    编译进同一个Aho-Corasick自动机，文本只扫描一遍；需要时再做一次数值提取，
+    之后每条规则只在命中表上求值，正则条件各自预编译。
+
+    规则写法（均为可选，只有触发词/风险值的旧格式保持原有行为）:
+        触发词:   ["某公司"]                  任一出现即满足
+        正则:     ["年薪\\d+万"]              任一匹配即满足
+        排除词:   ["上市公司"]                任一出现则整条规则不触发
+        共现:     [{"词": ["某公司", "高管"], "窗口": 10, "有序": false}]
+        数值:     [{"前缀词": "年薪", "窗口": 10, "比较": ">=", "值": 100, "单位": "万"}]
+        匹配方式: "任一"（默认，任一条件满足）或 "全部"（所有条件都满足）
+    """
+
+    def __init__(self, risk_rules: Dict):
+        self.rules: List[CompiledRule] = [compile_rule(name, config) for name, config in risk_rules.items()]
+        automaton = AhoCorasick()
+        # 字面量 -> 引用它的规则序号
+        self._literal_rules: Dict[str, List[int]] = {}
+        for index, rule in enumerate(self.rules):
+            for term in rule.literals:
+                rules = self._literal_rules.setdefault(term, [])
+                if not rules or rules[-1] != index:
+                    rules.append(index)
+                automaton.add(term)
+        self._automaton = automaton.build()
+        # 带正则条件的规则不一定有字面量命中，每次都要求值
+        self._always = [index for index, rule in enumerate(self.rules) if rule.regexes]
+        self._needs_numbers = any(rule.numerics for rule in self.rules)
+        self.scans = 0
+        self.scan_cost_ns = 0
+
+    @property
+    def keyword_count(self) -> int:
+        return len(self._literal_rules)
+
+    def scan(self, text: str) -> List[Dict]:
+        """单次扫描文本，按规则配置顺序返回触发的规则、命中内容及其位置"""
+        start = time.perf_counter_ns()
+        offsets: Dict[str, List[int]] = {}
+        for position, term in self._automaton.finditer(text):
+            offsets.setdefault(term, []).append(position)
+        candidates = set(self._always)
+        for term in offsets:
+            candidates.update(self._literal_rules[term])
+        numbers = None
+        if self._needs_numbers and candidates:
+            numbers = [(match.start(), match) for match in NUMBER_PATTERN.finditer(text)]
+        self.scans += 1
+        self.scan_cost_ns += time.perf_counter_ns() - start
+
+        triggered = []
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            rule_start = time.perf_counter_ns()
+            result = self._evaluate(rule, text, offsets, numbers)
+            rule.evaluations += 1
+            rule.cost_ns += time.perf_counter_ns() - rule_start
+            if result is not None:
+                triggered.append(result)
+        return triggered
+
+    def _evaluate(self, rule: CompiledRule, text: str, offsets: Dict[str, List[int]], numbers) -> Optional[Dict]:
+        if any(term in offsets for term in rule.excludes):
+            return None
+
+        # 每个条件的结果: None表示未满足，否则为命中的 (内容, 位置) 列表
+        outcomes: List[Optional[List[Tuple[str, int]]]] = []
+        conditions: List[Dict] = []
+        if rule.keywords:
+            hits = [(keyword, offsets[keyword][0]) for keyword in rule.keywords if keyword in offsets]
+            outcomes.append(hits or None)
+        for regex in rule.regexes:
+            match = regex.search(text)
+            outcomes.append([(match.group(0), match.start())] if match else None)
+            if match:
+                conditions.append({"type": "regex", "pattern": regex.pattern, "text": match.group(0), "offset": match.start()})
+        for proximity in rule.proximities:
+            hits = self._match_proximity(proximity, offsets)
+            outcomes.append(hits)
+            if hits:
+                conditions.append({"type": "proximity", "terms": [term for term, _ in hits], "window": proximity.window})
+        for numeric in rule.numerics:
+            hit = self._match_numeric(numeric, offsets, numbers)
+            outcomes.append([hit[:2]] if hit else None)
+            if hit:
+                conditions.append({"type": "numeric", "text": hit[0], "offset": hit[1], "value": hit[2], "op": numeric.op})
+
+        satisfied = [outcome for outcome in outcomes if outcome is not None]
+        if not satisfied or (rule.require_all and len(satisfied) != len(outcomes)):
+            return None
+
+        # 命中内容按条件顺序去重，触发词排在最前，与旧格式的输出一致
+        keywords: List[str] = []
+        keyword_offsets: Dict[str, List[int]] = {}
+        for outcome in satisfied:
+            for content, position in outcome:
+                if content not in keyword_offsets:
+                    keywords.append(content)
+                    keyword_offsets[content] = offsets.get(content, [position])
+        result = {
+            "rule_name": rule.name,
+            "risk_value": rule.risk_value,
+            "keywords": keywords,
+            "keyword_offsets": keyword_offsets,
+            "detection_method": "keyword_match"
+        }
+        if rule.extended:
+            result["matched_conditions"] = conditions
+        return result
+
+    @staticmethod
+    def _match_proximity(proximity: Proximity, offsets: Dict[str, List[int]]) -> Optional[List[Tuple[str, int]]]:
+        """找出所有词起始位置跨度不超过窗口的一组出现"""
+        if not all(term in offsets for term in proximity.terms):
+            return None
+        if proximity.ordered:
+            # 以第一个词的每次出现为起点，依次取后续词在前一个词之后最早的出现
+            for first in offsets[proximity.terms[0]]:
+                chain = [(proximity.terms[0], first)]
+                for term in proximity.terms[1:]:
+                    previous_term, previous = chain[-1]
+                    positions = offsets[term]
+                    i = bisect_left(positions, previous + len(previous_term))
+                    if i == len(positions):
+                        break
+                    chain.append((term, positions[i]))
+                else:
+                    if chain[-1][1] - first <= proximity.window:
+                        return chain
+            return None
+        # 无序：按位置合并后滑动窗口，找覆盖所有词的最小区间
+        events = sorted((position, term) for term in proximity.terms for position in offsets[term])
+        counts: Dict[str, int] = {}
+        left = 0
+        for right, (position, term) in enumerate(events):
+            counts[term] = counts.get(term, 0) + 1
+            while len(counts) == len(proximity.terms):
+                if position - events[left][0] <= proximity.window:
+                    latest = {}
+                    for event_position, event_term in events[left:right + 1]:
+                        latest[event_term] = event_position
+                    return sorted(((term, pos) for term, pos in latest.items()), key=lambda item: item[1])
+                left_term = events[left][1]
+                counts[left_term] -= 1
+                if not counts[left_term]:
+                    del counts[left_term]
+                left += 1
+        return None
+
+    @staticmethod
+    def _match_numeric(numeric: NumericCondition, offsets: Dict[str, List[int]], numbers) -> Optional[Tuple[str, int, float]]:
+        """锚点词之后窗口内第一个数值满足比较条件时返回 (原文, 位置, 换算后数值)"""
+        if not numbers:
+            return None
+        compare = COMPARATORS[numeric.op]
+        starts = [position for position, _ in numbers]
+        for anchor in numeric.anchors:
+            for position in offsets.get(anchor, ()):
+                anchor_end = position + len(anchor)
+                i = bisect_left(starts, anchor_end)
+                if i < len(numbers) and numbers[i][0] - anchor_end <= numeric.window:
+                    match = numbers[i][1]
+                    value = _parse_number(match)
+                    if compare(value, numeric.threshold):
+                        return match.group(0).strip(), match.start(), value
+        return None
+
+    def costs(self) -> Dict:
+        """每条规则的累计评估次数和耗时，以及共享扫描的耗时"""
+        return {
+            "scan": {
+                "scans": self.scans,
+                "total_ms": round(self.scan_cost_ns / 1e6, 3),
+                "avg_us": round(self.scan_cost_ns / self.scans / 1e3, 2) if self.scans else 0.0,
+                "literals": self.keyword_count
+            },
+            "rules": [
+                {
+                    "rule_name": rule.name,
+                    "evaluations": rule.evaluations,
+                    "total_ms": round(rule.cost_ns / 1e6, 3),
+                    "avg_us": round(rule.cost_ns / rule.evaluations / 1e3, 2) if rule.evaluations else 0.0,
+                    "literals": len(rule.literals),
+                    "regexes": len(rule.regexes),
+                    "extended": rule.extended
+                }
+                for rule in self.rules
+            ]
+        }
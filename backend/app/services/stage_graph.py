@@ -0,0 +1,71 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+class StageGraph:
+    """按依赖关系并发执行分析阶段，并记录每个阶段的时间线"""
+
+    def __init__(self):
+        # 阶段名 -> (执行函数, 依赖阶段)；执行函数接收已完成阶段的结果字典
+        self._stages: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()) -> "StageGraph":
+        """添加阶段，依赖的阶段必须先添加；添加顺序即启动顺序"""
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"阶段{name}依赖的{dep}尚未添加")
+        self._stages[name] = (func, deps)
+        return self
+
+    async def run(self) -> Tuple[Dict[str, Any], Dict]:
+        """执行所有阶段，返回 (各阶段结果, 时间线)"""
+        origin = time.perf_counter()
+        results: Dict[str, Any] = {}
+        stages: Dict[str, Dict[str, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str):
+            func, deps = self._stages[name]
+            if deps:
+                await asyncio.gather(*(tasks[dep] for dep in deps))
+            start = time.perf_counter()
+            result = func(results)
+            if inspect.isawaitable(result):
+                result = await result
+            end = time.perf_counter()
+            results[name] = result
+            stages[name] = {
+                "start_ms": round((start - origin) * 1000, 2),
+                "end_ms": round((end - origin) * 1000, 2),
+                "duration_ms": round((end - start) * 1000, 2)
+            }
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        timeline = {
+            "total_ms": round((time.perf_counter() - origin) * 1000, 2),
+            "stages": stages,
+            "critical_path": self._critical_path(stages)
+        }
+        return results, timeline
+
+    def _critical_path(self, stages: Dict[str, Dict[str, float]]) -> List[str]:
+        """从最晚结束的阶段沿最晚完成的依赖回溯"""
+        if not stages:
+            return []
+        current = max(stages, key=lambda name: stages[name]["end_ms"])
+        path = [current]
+        while self._stages[current][1]:
+            current = max(self._stages[current][1], key=lambda name: stages[name]["end_ms"])
+            path.append(current)
+        return list(reversed(path))
@@ -0,0 +1,283 @@
+"""
+接口压测 - 本地 DeepSeek 替身 + 真实后端，按并发等级压测各分析接口
+
+替身服务和被测后端在本进程的后台线程中通过 uvicorn 运行，请求走真实 HTTP。
+每个场景（接口 × 并发）输出吞吐、p50/p95/p99 延迟、进程内存以及每个请求触发的上游调用数，
+可用 --json 保存结果，下次用 --compare 对比回归。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_endpoints --concurrency 1 8 32 --requests 200 --latency 0.2 --latency-dist lognormal
+    python -m benchmarks.bench_endpoints --json before.json
+    python -m benchmarks.bench_endpoints --json after.json --compare before.json
+
+注意：内存为整个进程（后端 + 替身 + 压测客户端）的RSS，用于同一机器上的前后对比。
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-benchmark")
+
+import httpx  # noqa: E402
+
+from benchmarks.mock_deepseek import MockServer, add_mock_arguments, create_app_from_args  # noqa: E402
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+ENDPOINTS = ("static-scan", "generate-tactics", "comprehensive-analysis", "full-analysis")
+SAMPLE_TEXT = "我在海外做投资理财，年薪百万，名下有多套房产，最近在国外出差，工作比较忙。"
+SAMPLE_RESPONSE = "这个不太方便说，以后再聊吧，反正收入挺高的。"
+
+
+def rss_bytes() -> int:
+    """当前进程RSS"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # 无 /proc 时退回峰值RSS（Linux为KB，macOS为字节）
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class RssSampler:
+    """后台线程定期采样RSS，记录场景期间的峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def build_payloads(client: httpx.AsyncClient, base_url: str) -> Dict[str, dict]:
+    """先跑一遍静态扫描和话术生成，得到后两个接口所需的上游结果"""
+    api = f"{base_url}/api/v1"
+    scan = (await client.post(f"{api}/static-scan", json={"text": SAMPLE_TEXT})).json()["data"]
+    tactics_body = {"input_text": SAMPLE_TEXT, "rules": scan["rules"], "ai_analysis": scan["ai_analysis"]}
+    tactics = (await client.post(f"{api}/generate-tactics", json=tactics_body)).json()["data"]
+    return {
+        "static-scan": {"text": SAMPLE_TEXT},
+        "generate-tactics": tactics_body,
+        "comprehensive-analysis": {
+            "static_result": scan,
+            "verification_tactics": tactics["verification_tactics"],
+            "user_response": SAMPLE_RESPONSE
+        },
+        "full-analysis": {"input_text": SAMPLE_TEXT, "user_response": SAMPLE_RESPONSE}
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    mock_app
+) -> Dict:
+    """闭环压测：concurrency个worker循环发请求，直到总数达到requests"""
+    for _ in range(warmup):
+        await client.post(url, json=payload)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    upstream_before = mock_app.state.calls
+    rss_start = rss_bytes()
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    rss_end = rss_bytes()
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "requests": requests,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2)
+        },
+        "rss_mb": {
+            "start": round(rss_start / 2 ** 20, 1),
+            "end": round(rss_end / 2 ** 20, 1),
+            "peak": round(sampler.peak / 2 ** 20, 1)
+        },
+        "upstream_calls_per_request": round((mock_app.state.calls - upstream_before) / requests, 2)
+    }
+
+
+async def bench(args, backend_url: str, mock_app, out) -> List[Dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        payloads = await build_payloads(client, backend_url)
+        scenarios = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                result = await run_scenario(
+                    client, f"{backend_url}/api/v1/{endpoint}", payloads[endpoint],
+                    args.requests, concurrency, args.warmup, mock_app
+                )
+                result = {"endpoint": endpoint, "concurrency": concurrency, **result}
+                scenarios.append(result)
+                print(format_row(result), file=out, flush=True)
+        return scenarios
+
+
+def format_row(result: Dict) -> str:
+    latency = result["latency_ms"]
+    return (f"{result['endpoint']:<24} c={result['concurrency']:<4} "
+            f"ok={result['ok']:<5} err={result['errors']:<4} "
+            f"rps={result['throughput_rps']:8.1f} "
+            f"p50={latency['p50']:8.1f}ms p95={latency['p95']:8.1f}ms p99={latency['p99']:8.1f}ms "
+            f"rss_peak={result['rss_mb']['peak']:7.1f}MB "
+            f"llm/req={result['upstream_calls_per_request']:.2f}")
+
+
+def compare(current: List[Dict], baseline_path: str, out):
+    """与基线结果按（接口, 并发）对比，输出各指标相对基线的变化百分比"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(s["endpoint"], s["concurrency"]): s for s in json.load(f)["scenarios"]}
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+    print(f"\n对比基线 {baseline_path}:", file=out)
+    for result in current:
+        old = baseline.get((result["endpoint"], result["concurrency"]))
+        if old is None:
+            continue
+        print(f"{result['endpoint']:<24} c={result['concurrency']:<4} "
+              f"rps {delta(result['throughput_rps'], old['throughput_rps'])} "
+              f"p50 {delta(result['latency_ms']['p50'], old['latency_ms']['p50'])} "
+              f"p95 {delta(result['latency_ms']['p95'], old['latency_ms']['p95'])} "
+              f"p99 {delta(result['latency_ms']['p99'], old['latency_ms']['p99'])} "
+              f"rss_peak {delta(result['rss_mb']['peak'], old['rss_mb']['peak'])}", file=out)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="风控接口压测（本地DeepSeek替身）")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个场景的预热请求数（不计入结果）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("--port", type=int, default=9200, help="被测后端端口")
+    parser.add_argument("--mock-port", type=int, default=9100, help="替身服务端口")
+    parser.add_argument("--cache", action="store_true", help="开启LLM缓存（默认关闭，否则相同请求全部命中缓存）")
+    parser.add_argument("--json", help="结果保存路径")
+    parser.add_argument("--compare", help="基线结果JSON路径")
+    parser.add_argument("--verbose", action="store_true", help="保留后端日志输出")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock_app = create_app_from_args(args)
+    out = sys.stdout
+    with MockServer(mock_app, port=args.mock_port) as mock:
+        # 配置在导入时读取环境变量，必须先设置再导入后端
+        os.environ["DEEPSEEK_API_BASE"] = mock.base_url
+        os.environ["LLM_CACHE_ENABLED"] = "true" if args.cache else "false"
+        os.environ["CONFIG_WATCH_INTERVAL"] = "0"
+        from app.main import app
+
+        with MockServer(app, port=args.port) as backend, open(os.devnull, "w") as devnull:
+            print(f"🚀 后端 {backend.base_url}，替身 {mock.base_url}，"
+                  f"延迟 {args.latency}s/{args.latency_dist}，错误率 {args.error_rate}", file=out, flush=True)
+            # 后端日志量很大，默认丢弃（写入内存会影响RSS统计）
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+            with quiet:
+                scenarios = asyncio.run(bench(args, backend.base_url, mock_app, out))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        },
+        "scenarios": scenarios
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存到 {args.json}", file=out)
+    if args.compare:
+        compare(scenarios, args.compare, out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+DeepSeek 调用延迟基准 - 每次新建客户端 vs 共享连接池
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_http_pool --calls 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-benchmark")
+
+import httpx  # noqa: E402
+
+from benchmarks.mock_deepseek import MockServer, create_app  # noqa: E402
+
+
+def _summary(name: str, latencies: list, elapsed: float) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (f"{name:<16} calls={len(latencies):<5} "
+            f"mean={statistics.mean(latencies) * 1000:7.2f}ms "
+            f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+            f"p95={p95 * 1000:7.2f}ms "
+            f"throughput={len(latencies) / elapsed:8.1f}/s")
+
+
+async def _run(call, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies, time.perf_counter() - start
+
+
+async def bench(base_url: str, calls: int, concurrency: int):
+    from app.services.deepseek_service import DeepSeekService
+    from app.services.http_client import build_http_client
+
+    payload = {"model": "mock", "messages": [{"role": "user", "content": "hi"}]}
+    url = f"{base_url}/v1/chat/completions"
+
+    async def unpooled():
+        # 旧实现：每次调用新建并关闭客户端
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=payload, timeout=30.0)
+
+    pooled_client = build_http_client()
+
+    async def pooled():
+        await pooled_client.post(url, json=payload)
+
+    service = DeepSeekService(client=pooled_client)
+    service.api_base = base_url
+
+    async def service_call():
+        await service.generate_verification_tactic("职业模糊", {"影响行业": "金融"})
+
+    # 预热，确保连接池里已有连接
+    await pooled()
+    for name, call in (("unpooled", unpooled), ("pooled", pooled), ("service+pool", service_call)):
+        # 服务内部日志较多，压测期间整体屏蔽
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, elapsed = await _run(call, calls, concurrency)
+        print(_summary(name, latencies, elapsed))
+    await pooled_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeepSeek 连接池基准")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务响应延迟（秒）")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    with MockServer(create_app(args.latency), port=args.port) as server:
+        asyncio.run(bench(server.base_url, args.calls, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+触发词匹配基准 - 逐规则逐词 `in` 判断 vs 编译规则集（CompiledRuleSet，单个 Aho-Corasick 自动机单遍扫描）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_keyword_matcher --rules 10 100 500 --keywords 10 --text-lengths 200 2000 20000
+"""
+import argparse
+import random
+import time
+
+from app.services.rule_compiler import CompiledRuleSet
+
+# 常用汉字区间，用于生成合成触发词和文本
+CJK_START, CJK_END = 0x4E00, 0x4E00 + 2000
+
+
+def _random_word(rng: random.Random, min_len: int = 2, max_len: int = 5) -> str:
+    return "".join(chr(rng.randint(CJK_START, CJK_END)) for _ in range(rng.randint(min_len, max_len)))
+
+
+def build_rules(rng: random.Random, rule_count: int, keywords_per_rule: int) -> dict:
+    return {
+        f"规则{i}": {"触发词": [_random_word(rng) for _ in range(keywords_per_rule)], "风险值": rng.randint(5, 50)}
+        for i in range(rule_count)
+    }
+
+
+def build_text(rng: random.Random, rules: dict, length: int, planted: int = 20) -> str:
+    """生成随机文本并植入若干触发词"""
+    chars = [chr(rng.randint(CJK_START, CJK_END)) for _ in range(length)]
+    keywords = [k for rule in rules.values() for k in rule["触发词"]]
+    for _ in range(min(planted, length // 10)):
+        keyword = rng.choice(keywords)
+        pos = rng.randint(0, max(0, length - len(keyword)))
+        chars[pos:pos + len(keyword)] = keyword
+    return "".join(chars)[:length]
+
+
+def naive_scan(rules: dict, text: str) -> list:
+    """原实现：每条规则每个触发词各做一次子串查找"""
+    triggered = []
+    for rule_name, rule_config in rules.items():
+        if any(keyword in text for keyword in rule_config["触发词"]):
+            triggered.append({
+                "rule_name": rule_name,
+                "keywords": [k for k in rule_config["触发词"] if k in text]
+            })
+    return triggered
+
+
+def _time(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="触发词匹配基准")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--keywords", type=int, default=10, help="每条规则的触发词数量")
+    parser.add_argument("--text-lengths", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'rules':>6} {'keywords':>9} {'text_len':>9} {'compile_ms':>11} {'naive_ms':>10} {'compiled_ms':>12} {'speedup':>8}")
+    for rule_count in args.rules:
+        rules = build_rules(rng, rule_count, args.keywords)
+        start = time.perf_counter()
+        compiled = CompiledRuleSet(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+        for length in args.text_lengths:
+            text = build_text(rng, rules, length)
+            expected = naive_scan(rules, text)
+            actual = [{"rule_name": r["rule_name"], "keywords": r["keywords"]} for r in compiled.scan(text)]
+            assert actual == expected, "编译规则集结果与逐词匹配结果不一致"
+
+            naive = _time(lambda: naive_scan(rules, text), args.repeat) * 1000
+            compiled_ms = _time(lambda: compiled.scan(text), args.repeat) * 1000
+            print(f"{rule_count:>6} {rule_count * args.keywords:>9} {length:>9} {compile_ms:>11.2f} "
+                  f"{naive:>10.3f} {compiled_ms:>12.3f} {naive / compiled_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+知识库内存基准 - 每行一个dict（原实现）vs 列式去重存储 vs 多worker共享的内存映射文件
+
+每种存储方式启动若干个worker进程，各自加载同一份合成政策CSV后同时驻留，
+报告每个worker的加载耗时、RSS、PSS（共享页按进程数均摊，仅Linux）以及随机取一行的耗时。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_knowledge --rows 100000 300000 --workers 4
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.knowledge_store import load_knowledge_table
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+MODES = ("dicts", "columnar", "mmap")
+COLUMNS = ["政策名称", "生效日期", "影响行业", "关键条款"]
+INDUSTRIES = ["金融", "互联网", "医疗", "教育", "房地产", "制造业", "能源", "零售"]
+POLICY_KINDS = ["条例", "新规", "办法", "通知", "细则", "指引"]
+CLAUSES = [
+    "要求披露最终受益人", "追缴三年税款", "个人账户分级管理", "内幕交易处罚加重",
+    "加强资金流向监测", "限制关联交易", "提高准入门槛", "强化信息披露义务",
+]
+
+
+def write_policies(path: Path, rows: int, seed: int = 42, vocabulary: int = 0):
+    """生成合成政策库：名称基本唯一，日期/行业/条款大量重复，接近真实政策语料
+
+    vocabulary>0时每条条款再附加一个取自该规模随机词表的词，模拟用词更分散的语料。
+    """
+    rng = random.Random(seed)
+    words = [
+        "".join(chr(rng.randint(0x4E00, 0x4E00 + 3000)) for _ in range(rng.randint(2, 4)))
+        for _ in range(vocabulary)
+    ]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            industry = rng.choice(INDUSTRIES)
+            writer.writerow([
+                f"{industry}{rng.choice(POLICY_KINDS)}第{i}号",
+                f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-01",
+                industry,
+                f"{rng.choice(CLAUSES)}，{rng.choice(CLAUSES)}" + (f"，{rng.choice(words)}" if words else ""),
+            ])
+
+
+def memory_usage() -> dict:
+    """当前进程RSS/PSS（字节），无法读取时为None"""
+    usage = {"rss": None, "pss": None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    usage[key.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        try:
+            with open("/proc/self/statm") as f:
+                usage["rss"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            pass
+    return usage
+
+
+def load(mode: str, csv_file: Path, mmap_dir: Path):
+    if mode == "dicts":
+        if PANDAS_AVAILABLE:
+            return pd.read_csv(csv_file, encoding="utf-8").to_dict("records")
+        with open(csv_file, encoding="utf-8", newline="") as f:
+            return list(csv.DictReader(f))
+    return load_knowledge_table(csv_file, mmap_dir if mode == "mmap" else None)
+
+
+def pick(store, rng: random.Random) -> dict:
+    if isinstance(store, list):
+        return rng.choice(store)
+    return store.random_row(rng)
+
+
+def worker(mode: str, csv_file: str, mmap_dir: str, barrier, results):
+    before = memory_usage()
+    start = time.perf_counter()
+    store = load(mode, Path(csv_file), Path(mmap_dir))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(os.getpid())
+    picks = 10000
+    start = time.perf_counter()
+    for _ in range(picks):
+        pick(store, rng)
+    pick_us = (time.perf_counter() - start) / picks * 1e6
+
+    # 所有worker加载完成后再采样，共享页才会按进程数均摊到PSS
+    barrier.wait()
+    after = memory_usage()
+    barrier.wait()
+    results.put({
+        "load_ms": load_ms,
+        "pick_us": pick_us,
+        "rss": after["rss"],
+        "rss_delta": after["rss"] - before["rss"] if after["rss"] and before["rss"] else None,
+        "pss": after["pss"],
+        "rows": len(store),
+    })
+
+
+def run_mode(mode: str, csv_file: Path, mmap_dir: Path, workers: int) -> list:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(mode, str(csv_file), str(mmap_dir), barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def _mb(value) -> str:
+    return f"{value / 1024 / 1024:9.1f}" if value is not None else f"{'n/a':>9}"
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库内存基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 300000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_knowledge_"))
+    try:
+        print(f"每种存储方式 {args.workers} 个worker同时驻留，数值为每个worker的均值（MB / 毫秒 / 微秒）")
+        print(f"{'rows':>8} {'mode':>9} {'load_ms':>9} {'rss':>9} {'rss_delta':>9} {'pss':>9} {'pick_us':>8}")
+        for rows in args.rows:
+            csv_file = workdir / f"policies_{rows}.csv"
+            write_policies(csv_file, rows, args.seed)
+            for mode in args.modes:
+                mmap_dir = workdir / f"mmap_{rows}"
+                if mode == "mmap":
+                    # 预先转换一次，测量的是worker直接映射已有文件的情况
+                    load_knowledge_table(csv_file, mmap_dir)
+                samples = run_mode(mode, csv_file, mmap_dir, args.workers)
+                assert all(s["rows"] == rows for s in samples), "加载行数不一致"
+                print(
+                    f"{rows:>8} {mode:>9} {_mean([s['load_ms'] for s in samples]):9.1f}"
+                    f" {_mb(_mean([s['rss'] for s in samples]))} {_mb(_mean([s['rss_delta'] for s in samples]))}"
+                    f" {_mb(_mean([s['pss'] for s in samples]))} {_mean([s['pick_us'] for s in samples]):8.2f}"
+                )
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+知识检索基准 - 倒排索引 top-k 检索 vs 逐行打分全表扫描
+
+检索词取自 config/risk_rules.json 中的规则名与触发词，加上示例个人信息，与话术生成时的检索方式一致。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_knowledge_index --rows 10000 100000 300000
+"""
+import argparse
+import heapq
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.knowledge_index import KnowledgeIndex, text_terms
+from app.services.knowledge_store import KnowledgeTable
+from benchmarks.bench_knowledge import write_policies
+
+PROFILES = [
+    "我在海外做投资理财，年薪百万，名下有多套房产，最近在国外出差。",
+    "在某券商工作，收入还可以，家里父母务农，没有社保。",
+    "知名企业中层，月薪三万，有车有房，有房贷。",
+]
+
+
+def build_queries(rules_file: Path) -> list:
+    with open(rules_file, encoding="utf-8") as f:
+        rules = json.load(f)
+    return [
+        " ".join([name, " ".join(config.get("触发词", [])), profile])
+        for name, config in rules.items()
+        for profile in PROFILES
+    ]
+
+
+def full_scan(table: KnowledgeTable, query: str, top_k: int) -> list:
+    """逐行切分并打分（不建索引时的做法）"""
+    terms = text_terms(query)
+    scores = []
+    for row in range(len(table)):
+        row_terms = set()
+        for column in table.columns:
+            row_terms |= text_terms(table.value(row, column))
+        score = len(terms & row_terms)
+        if score:
+            scores.append((score, row))
+    return heapq.nlargest(top_k, scores)
+
+
+def _percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识检索基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--scan-rows", type=int, default=20000, help="超过该行数不跑全表扫描对照")
+    parser.add_argument("--vocabulary", type=int, nargs="+", default=[0, 50000],
+                        help="条款附加随机词表规模，0为高度重复的政策语料")
+    parser.add_argument("--rules", default="config/risk_rules.json")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    queries = build_queries(Path(args.rules))
+    rng = random.Random(args.seed)
+    print(f"{'rows':>8} {'vocab':>6} {'docs':>7} {'terms':>7} {'build_ms':>9} {'p50_us':>8} {'p99_us':>8} {'scan_ms':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows, vocabulary in [(r, v) for v in args.vocabulary for r in args.rows]:
+            csv_file = Path(workdir) / f"policies_{rows}_{vocabulary}.csv"
+            write_policies(csv_file, rows, args.seed, vocabulary)
+            table = KnowledgeTable.from_csv(csv_file)
+            start = time.perf_counter()
+            index = KnowledgeIndex(table)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            samples = []
+            for _ in range(args.repeat):
+                query = rng.choice(queries)
+                start = time.perf_counter()
+                index.search(query, args.top_k)
+                samples.append((time.perf_counter() - start) * 1e6)
+
+            scan_ms = float("nan")
+            if rows <= args.scan_rows:
+                scan_samples = []
+                for query in queries[:5]:
+                    start = time.perf_counter()
+                    full_scan(table, query, args.top_k)
+                    scan_samples.append((time.perf_counter() - start) * 1000)
+                scan_ms = statistics.mean(scan_samples)
+
+            print(
+                f"{rows:>8} {vocabulary:>6} {index.documents:>7} {len(index):>7} {build_ms:9.1f}"
+                f" {statistics.median(samples):8.1f} {_percentile(samples, 0.99):8.1f} {scan_ms:9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
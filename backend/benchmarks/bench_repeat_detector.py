@@ -0,0 +1,83 @@
+"""
+重复片段检测基准 - 朴素子串计数（O(n²)）vs 后缀自动机（线性）
+
+合成个人资料由常见句子随机拼接（无空格），并植入若干次重复的片段，长度从1KB到100KB；
+另用同一句话首尾相接的周期文本（最坏情况：几乎每个状态都是候选）检验耗时仍为线性。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_repeat_detector --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from app.services.repeat_detector import find_repeated_substrings
+
+SENTENCES = [
+    "我在一家互联网公司做产品经理", "年薪大概四十万左右", "父母都是退休教师", "名下有一套房子",
+    "平时喜欢跑步和看书", "本科毕业于师范大学", "目前单身没有婚史", "家里还有一个妹妹",
+    "周末经常和朋友聚会", "打算三年内换一套大房子", "工作比较稳定", "偶尔会出国旅游",
+]
+PLANTED = "我是独生子家里条件很好"
+PERIODIC_UNIT = "我在北京工作，"
+
+
+def build_profile(rng: random.Random, size: int, planted: int = 5) -> str:
+    parts = []
+    while sum(map(len, parts)) < size:
+        parts.append(rng.choice(SENTENCES) + "，")
+    for _ in range(planted):
+        parts.insert(rng.randint(0, len(parts)), PLANTED)
+    return "".join(parts)[:size]
+
+
+def build_periodic(size: int) -> str:
+    return (PERIODIC_UNIT * (size // len(PERIODIC_UNIT) + 1))[:size]
+
+
+def naive_repeats(text: str, min_length: int, min_count: int, max_length: int = 30) -> dict:
+    """朴素做法：统计所有长度在[min_length, max_length]之间的子串出现次数"""
+    counts = Counter(
+        text[start:start + length]
+        for length in range(min_length, max_length + 1)
+        for start in range(len(text) - length + 1)
+    )
+    return {fragment: count for fragment, count in counts.items() if count >= min_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重复片段检测基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--min-length", type=int, default=3)
+    parser.add_argument("--min-count", type=int, default=4)
+    parser.add_argument("--naive-max", type=int, default=10000, help="超过该长度不跑朴素对照")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'kind':>8} {'size':>7} {'automaton_ms':>13} {'us_per_char':>12} {'naive_ms':>9} {'planted_found':>14}  top")
+    for kind, size in [(kind, size) for kind in ("profile", "periodic") for size in args.sizes]:
+        text = build_profile(rng, size) if kind == "profile" else build_periodic(size)
+        planted = PLANTED if kind == "profile" else PERIODIC_UNIT.strip("，")
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            repeats = find_repeated_substrings(text, args.min_length, args.min_count)
+        automaton_ms = (time.perf_counter() - start) / args.repeat * 1000
+        all_repeats = find_repeated_substrings(text, args.min_length, args.min_count, max_results=10 ** 9)
+        found = any(planted in item.text for item in all_repeats)
+
+        naive_ms = float("nan")
+        if size <= args.naive_max:
+            start = time.perf_counter()
+            naive = naive_repeats(text, args.min_length, args.min_count)
+            naive_ms = (time.perf_counter() - start) * 1000
+            assert all(naive.get(item.text, item.count) == item.count for item in all_repeats), "出现次数与朴素计数不一致"
+
+        top = repeats[0].text[:30] if repeats else "-"
+        print(f"{kind:>8} {size:>7} {automaton_ms:>13.1f} {automaton_ms * 1000 / size:>12.2f} {naive_ms:>9.1f} {str(found):>14}  {top}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+回答评分基准 - 原降级实现（逐词表 `in` 判断，一次一条）vs 预编译评分器单条/批量评分
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_response_scorer --batch-sizes 100 1000 10000
+"""
+import argparse
+import random
+import time
+
+from app.services.response_scorer import DEFAULT_RESPONSE_LEXICONS, ResponseScorer
+
+FILLERS = [
+    "我在一家公司上班", "收入还行", "家里人都挺好的", "平时喜欢运动", "最近工作比较忙",
+    "有房有车", "年薪三十万左右", "周末一般在家", "父母都退休了", "打算明年换工作",
+]
+
+
+def build_responses(rng: random.Random, count: int) -> list:
+    """合成回答：若干常见句子，随机混入各词表中的词"""
+    words = [word for name in ("fuzzy_evasion", "emotional_attack", "topic_shift")
+             for word in DEFAULT_RESPONSE_LEXICONS[name]["words"]]
+    responses = []
+    for _ in range(count):
+        parts = rng.sample(FILLERS, rng.randint(0, 3))
+        parts.extend(rng.sample(words, rng.randint(0, 3)))
+        rng.shuffle(parts)
+        responses.append("，".join(parts))
+    return responses
+
+
+def legacy_score(response_text: str) -> dict:
+    """原实现：每个词表逐词做子串查找"""
+    lexicons = DEFAULT_RESPONSE_LEXICONS
+    fuzzy_score = sum(25 for word in lexicons["fuzzy_evasion"]["words"] if word in response_text)
+    attack_score = sum(40 for word in lexicons["emotional_attack"]["words"] if word in response_text)
+    topic_shift_score = sum(30 for word in lexicons["topic_shift"]["words"] if word in response_text)
+    if len(response_text.strip()) < 5:
+        fuzzy_score += 20
+    if any(word in response_text for word in lexicons["negative"]["words"]):
+        fuzzy_score += 15
+    total_risk = fuzzy_score + attack_score + topic_shift_score
+    precise_score = max(0, 100 - total_risk)
+    risk_tags = []
+    if fuzzy_score > 0:
+        risk_tags.append("模糊回避")
+    if attack_score > 0:
+        risk_tags.append("情绪攻击")
+    if topic_shift_score > 0:
+        risk_tags.append("话题转移")
+    if precise_score < 50:
+        risk_tags.append("信息不足")
+    return {
+        "fuzzy_evasion": min(fuzzy_score, 100),
+        "emotional_attack": min(attack_score, 100),
+        "topic_shift": min(topic_shift_score, 100),
+        "precise_answer": precise_score,
+        "risk_tags": risk_tags,
+        "overall_risk_score": min(total_risk, 100)
+    }
+
+
+def _time(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回答评分基准")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    scorer = ResponseScorer()
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"评分器编译 {scorer.word_count} 个词耗时 {compile_ms:.2f}ms")
+    print(f"{'batch':>7} {'legacy_ms':>10} {'single_ms':>10} {'batch_ms':>9} {'per_item_us':>12} {'speedup':>8}")
+    for size in args.batch_sizes:
+        responses = build_responses(rng, size)
+        assert scorer.score_batch(responses) == [legacy_score(text) for text in responses], "评分结果与原实现不一致"
+
+        legacy = _time(lambda: [legacy_score(text) for text in responses], args.repeat) * 1000
+        single = _time(lambda: [scorer.score(text) for text in responses], args.repeat) * 1000
+        batch = _time(lambda: scorer.score_batch(responses), args.repeat) * 1000
+        print(f"{size:>7} {legacy:>10.2f} {single:>10.2f} {batch:>9.2f} "
+              f"{batch / size * 1000:>12.2f} {legacy / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+本地 DeepSeek 替身服务 - 模拟 /v1/chat/completions，压测时不消耗API额度
+
+根据提示词内容返回对应格式的假结果（风险分析/融合分析/话术/动态分析JSON，其余为纯文本话术），
+可配置延迟分布、错误率以及JSON被```json代码块包裹的比例。
+请求带 stream=true 时按 OpenAI 兼容的 SSE 格式分块返回，块间隔由 chunk_delay 控制。
+
+用法:
+    python -m benchmarks.mock_deepseek --port 9100 --latency 0.05 --latency-dist lognormal --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_CONTENT = "最近工作忙吗？听说行业变化挺大的。"
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# 提示词中规则名称的写法：json.dumps 的 "rule_name": "x"、Python repr 的 'rule_name': 'x'，
+# 以及提示词整体再被 json.dumps 一次后的 \"rule_name\": \"x\"
+_RULE_NAME_PATTERN = re.compile(r"""\\?["']rule_name\\?["']:\s*\\?["']([^"'\\]+)\\?["']""")
+_PLACEHOLDER_RULE_NAMES = {"规则名称"}
+
+
+def sample_latency(rng: random.Random, latency: float, distribution: str = "fixed", jitter: float = 0.0) -> float:
+    """按分布采样一次延迟（秒）
+
+    latency 为中位数量级，jitter 为离散程度：uniform 为 ±jitter 秒，lognormal 为对数标准差，
+    exponential 以 latency 为均值（忽略jitter）。
+    """
+    if latency <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(latency - jitter, latency + jitter))
+    if distribution == "exponential":
+        return rng.expovariate(1 / latency)
+    if distribution == "lognormal":
+        return rng.lognormvariate(math.log(latency), jitter or 0.5)
+    return latency
+
+
+def _rule_names(prompt: str) -> List[str]:
+    names = []
+    for name in _RULE_NAME_PATTERN.findall(prompt):
+        if name not in _PLACEHOLDER_RULE_NAMES and name not in names:
+            names.append(name)
+    return names
+
+
+def _ai_rules(names: List[str]) -> List[dict]:
+    matched = names[:1]
+    if not matched:
+        return [{
+            "rule_name": "信息模糊",
+            "risk_value": 10,
+            "detection_method": "ai_analysis",
+            "description": "替身服务生成的AI规则",
+            "matched_rule": ""
+        }]
+    return [{
+        "rule_name": name,
+        "risk_value": 10,
+        "detection_method": "ai_analysis",
+        "description": "替身服务生成的AI规则",
+        "matched_rule": name
+    } for name in matched]
+
+
+def _tactics(names: List[str]) -> List[dict]:
+    return [{
+        "rule_name": name,
+        "tactic": f"关于{name}，方便多聊一些具体情况吗？",
+        "priority": "high"
+    } for name in names]
+
+
+def canned_content(prompt: str) -> Optional[dict]:
+    """按提示词类型构造结构化结果，纯文本话术请求返回None"""
+    if "任务二" in prompt:
+        # 融合分析：风险分析 + 话术
+        ai_rules = _ai_rules(_rule_names(prompt))
+        return {
+            "risk_score": sum(rule["risk_value"] for rule in ai_rules),
+            "risk_reasons": ["替身服务风险原因"],
+            "ai_rules": ai_rules,
+            "verification_suggestions": ["替身服务验证建议"],
+            "tactics": _tactics([rule["rule_name"] for rule in ai_rules])
+        }
+    if "overall_risk_score" in prompt:
+        return {
+            "fuzzy_evasion": 40,
+            "emotional_attack": 10,
+            "topic_shift": 30,
+            "precise_answer": 50,
+            "risk_tags": ["模糊回避", "信息不足"],
+            "overall_risk_score": 45
+        }
+    if "ai_rules" in prompt:
+        ai_rules = _ai_rules(_rule_names(prompt))
+        return {
+            "risk_score": sum(rule["risk_value"] for rule in ai_rules),
+            "risk_reasons": ["替身服务风险原因"],
+            "ai_rules": ai_rules,
+            "verification_suggestions": ["替身服务验证建议"]
+        }
+    if "tactics" in prompt:
+        return {"tactics": _tactics(_rule_names(prompt))}
+    return None
+
+
+def create_app(
+    latency: float = 0.0,
+    latency_dist: str = "fixed",
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    fence_rate: float = 0.0,
+    seed: Optional[int] = None,
+    chunk_size: int = 8,
+    chunk_delay: float = 0.0
+) -> FastAPI:
+    """创建替身应用
+
+    latency/latency_dist/jitter 控制每次响应前的延迟（流式时为首块延迟），error_rate 为返回 500/429 的概率，
+    fence_rate 为JSON结果包裹```json代码块的概率，chunk_size/chunk_delay 控制流式分块。
+    """
+    if latency_dist not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"未知延迟分布: {latency_dist}")
+    rng = random.Random(seed)
+    app = FastAPI(title="Mock DeepSeek")
+    app.state.calls = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.calls += 1
+        delay = sample_latency(rng, latency, latency_dist, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if error_rate > 0 and rng.random() < error_rate:
+            status = rng.choice((500, 429))
+            return JSONResponse(status_code=status, content={"error": {"message": "mock error", "code": status}})
+
+        prompt = "".join(message.get("content", "") for message in payload.get("messages", []))
+        structured = canned_content(prompt)
+        if structured is None:
+            content = CANNED_CONTENT
+        else:
+            content = json.dumps(structured, ensure_ascii=False)
+            if fence_rate > 0 and rng.random() < fence_rate:
+                content = f"```json\n{content}\n```"
+
+        if payload.get("stream"):
+            return StreamingResponse(
+                _stream_chunks(payload.get("model", "mock"), content, chunk_size, chunk_delay),
+                media_type="text/event-stream"
+            )
+
+        return {
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt),
+                "completion_tokens": len(content),
+                "total_tokens": len(prompt) + len(content)
+            }
+        }
+
+    return app
+
+
+async def _stream_chunks(model: str, content: str, chunk_size: int, chunk_delay: float):
+    created = int(time.time())
+    for start in range(0, len(content), max(1, chunk_size)):
+        if start and chunk_delay > 0:
+            await asyncio.sleep(chunk_delay)
+        chunk = {
+            "id": "mock-completion",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + chunk_size]}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    done = {
+        "id": "mock-completion",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+class MockServer:
+    """在后台线程中运行一个ASGI应用（替身服务或被测后端）"""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 9100):
+        self.host = host
+        self.port = port
+        config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """替身服务的命令行参数（压测脚本复用）"""
+    parser.add_argument("--latency", type=float, default=0.0, help="响应延迟中位数（秒）")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="延迟分布")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟离散程度（uniform为±秒，lognormal为对数标准差）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500/429的概率")
+    parser.add_argument("--fence-rate", type=float, default=0.0, help="JSON结果包裹```json代码块的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，便于复现")
+    parser.add_argument("--chunk-size", type=int, default=8, help="流式响应每块字符数")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="流式响应块间隔（秒）")
+
+
+def create_app_from_args(args: argparse.Namespace) -> FastAPI:
+    return create_app(
+        args.latency, args.latency_dist, args.jitter, args.error_rate, args.fence_rate, args.seed,
+        args.chunk_size, args.chunk_delay
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 DeepSeek 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app_from_args(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
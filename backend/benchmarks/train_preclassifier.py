@@ -0,0 +1,112 @@
+"""
+预判模型训练与评估 - 用静态扫描日志（ANALYSIS_LOG_PATH）训练，在留出集上报告跳过率和与LLM结果的分歧
+
+标签为"加上AI分后静态分是否达到警告阈值"。被跳过的样本中，如果LLM实际会给出相反的结论即计为分歧：
+saturated跳过时LLM结论必然为高风险；low_risk跳过时LLM结论若为高风险则为分歧。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.train_preclassifier --log logs/analysis.jsonl --output models/preclassifier.npz
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.services.analysis_log import read_analysis_log
+from app.services.preclassifier import (
+    DEFAULT_FEATURE_DIM, NUMPY_AVAILABLE, AIPrecheck, RiskPreclassifier, record_label
+)
+
+
+def _percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def evaluate(precheck: AIPrecheck, records: list) -> dict:
+    outcomes = Counter()
+    disagreements = Counter()
+    correct = 0
+    latencies = []
+    for record in records:
+        label = record_label(record)
+        start = time.perf_counter()
+        decision = precheck.decide(
+            record["text"], record["keyword_score"], record["pattern_score"],
+            record["rule_count"], record["warning_threshold"]
+        )
+        latencies.append((time.perf_counter() - start) * 1e6)
+        outcomes[decision.outcome] += 1
+        if decision.outcome == "low_risk" and label == 1:
+            disagreements["low_risk"] += 1
+        if decision.outcome == "saturated" and label == 0:
+            disagreements["saturated"] += 1
+        if decision.probability is not None and (decision.probability >= 0.5) == bool(label):
+            correct += 1
+    skipped = outcomes["saturated"] + outcomes["low_risk"]
+    scored = sum(count for outcome, count in outcomes.items() if outcome in ("low_risk", "uncertain"))
+    return {
+        "outcomes": outcomes,
+        "skip_rate": skipped / len(records),
+        "disagreements": sum(disagreements.values()),
+        "disagreement_rate": sum(disagreements.values()) / skipped if skipped else 0.0,
+        "accuracy": correct / scored if scored else float("nan"),
+        "p50_us": statistics.median(latencies),
+        "p99_us": _percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预判模型训练与评估")
+    parser.add_argument("--log", required=True, help="静态扫描日志（JSONL）")
+    parser.add_argument("--output", help="模型输出路径（.npz），不指定则只评估")
+    parser.add_argument("--holdout", type=float, default=0.2, help="留出集比例")
+    parser.add_argument("--confidence", type=float, nargs="+", default=[0.8, 0.9, 0.95, 0.99])
+    parser.add_argument("--saturation", type=float, default=100)
+    parser.add_argument("--dim", type=int, default=DEFAULT_FEATURE_DIM)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        parser.error("训练需要安装numpy")
+    records = list(read_analysis_log(Path(args.log)))
+    if len(records) < 10:
+        parser.error(f"有效样本只有{len(records)}条，无法训练")
+    random.Random(args.seed).shuffle(records)
+    split = max(1, int(len(records) * args.holdout))
+    holdout, train = records[:split], records[split:]
+
+    start = time.perf_counter()
+    model = RiskPreclassifier.train(
+        train, dim=args.dim, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2
+    )
+    train_s = time.perf_counter() - start
+    positives = sum(record_label(record) for record in records)
+    print(f"样本 {len(records)} 条（高风险 {positives}），训练 {len(train)} 条 / 留出 {len(holdout)} 条，训练耗时 {train_s:.1f}s")
+
+    print(f"{'confidence':>10} {'skip_rate':>10} {'saturated':>10} {'low_risk':>9} {'disagree':>9} "
+          f"{'disagree_rate':>14} {'accuracy':>9} {'p50_us':>8} {'p99_us':>8}")
+    for confidence in args.confidence:
+        report = evaluate(AIPrecheck(args.saturation, model, confidence), holdout)
+        print(
+            f"{confidence:>10.2f} {report['skip_rate']:>10.1%} {report['outcomes']['saturated']:>10}"
+            f" {report['outcomes']['low_risk']:>9} {report['disagreements']:>9} {report['disagreement_rate']:>14.1%}"
+            f" {report['accuracy']:>9.1%} {report['p50_us']:>8.1f} {report['p99_us']:>8.1f}"
+        )
+    tier1 = evaluate(AIPrecheck(args.saturation, None), holdout)
+    print(f"仅第一级（分数饱和）: 跳过率 {tier1['skip_rate']:.1%}，分歧 {tier1['disagreements']} 条，"
+          f"p99 {tier1['p99_us']:.1f}us")
+
+    if args.output:
+        model.metadata.update({"holdout": len(holdout), "seed": args.seed})
+        model.save(Path(args.output))
+        print(f"模型已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def backend_settings(monkeypatch):
+    """配置和知识库按相对路径加载，测试统一在backend目录下运行，并使用假的API密钥"""
+    monkeypatch.chdir(BACKEND_DIR)
+    monkeypatch.setattr(settings, "deepseek_api_key", "sk-test")
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+from app.services.preclassifier import AIPrecheck, RiskPreclassifier, load_preclassifier
+from app.services.risk_engine import RiskEngine
+
+AI_RESULT = {
+    "risk_score": 5,
+    "risk_reasons": ["测试"],
+    "ai_rules": [{"rule_name": "AI规则", "risk_value": 5, "detection_method": "ai_analysis"}],
+    "verification_suggestions": []
+}
+
+
+class _SlowService:
+    """模拟DeepSeek：固定延迟后返回AI分析结果"""
+    api_base = "http://llm"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        self.response_scorer = None
+
+    async def generate_verification_tactic(self, rule_name, knowledge_item, expect_json=False):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return json.dumps(AI_RESULT, ensure_ascii=False)
+
+
+def _engine(delay: float, saturation_score: float) -> tuple:
+    service = _SlowService(delay)
+    engine = RiskEngine(deepseek_service=service)
+    engine.ai_precheck.saturation_score = saturation_score
+    engine.ai_precheck.model = None
+    return engine, service
+
+
+def test_ai_request_overlaps_local_stages():
+    engine, service = _engine(0.1, saturation_score=100)
+    detect = engine._detect_risk_patterns
+
+    async def slow_patterns(text, snapshot):
+        await asyncio.sleep(0.1)
+        return await detect(text, snapshot)
+
+    engine._detect_risk_patterns = slow_patterns
+    started = time.perf_counter()
+    result = asyncio.run(engine.static_risk_scan("在某公司上班"))
+    # 串行执行需要0.2秒以上
+    assert time.perf_counter() - started < 0.18
+    assert service.calls == 1 and service.cancelled == 0
+    assert result["ai_analysis"]["precheck"]["outcome"] == "disabled"
+    assert any(rule["rule_name"] == "AI规则" for rule in result["rules"])
+
+
+def test_saturated_scan_cancels_ai_request():
+    engine, service = _engine(5.0, saturation_score=10)
+    started = time.perf_counter()
+    result = asyncio.run(engine.static_risk_scan("在某公司上班"))
+    assert time.perf_counter() - started < 1.0
+    assert service.calls == 1 and service.cancelled == 1
+    assert result["ai_analysis"]["precheck"]["skipped"]
+    assert result["ai_analysis"]["ai_rules"] == []
+
+
+def test_precheck_disabled_runs_ai_first():
+    engine, service = _engine(0.01, saturation_score=0)
+    result = asyncio.run(engine.static_risk_scan("在某公司上班"))
+    assert service.calls == 1
+    assert "precheck" not in result["ai_analysis"]
+
+
+def _record(text: str, keyword_score: float, ai_score: float) -> dict:
+    return {
+        "text": text, "keyword_score": keyword_score, "pattern_score": 0, "rule_count": int(keyword_score > 0),
+        "ai_score": ai_score, "warning_threshold": 40
+    }
+
+
+def test_preclassifier_model_tier(tmp_path):
+    records = (
+        [_record(f"女，199{i}，教师，月薪八千，有房无贷", 0, 0) for i in range(10)]
+        + [_record(f"男，198{i}，某私募MD，年薪500万+，有房贷", 40, 30) for i in range(10)]
+    )
+    path = tmp_path / "precheck.npz"
+    RiskPreclassifier.train(records, dim=1 << 12).save(path)
+    model = load_preclassifier(str(path))
+    assert model is not None and model.metadata["samples"] == 20
+
+    precheck = AIPrecheck(saturation_score=100, model=model, confidence=0.8)
+    low = precheck.decide("女，1995，教师，月薪八千，有房无贷", 0, 0, 0, 40)
+    assert not low.run_ai and low.outcome == "low_risk"
+    high = precheck.decide("男，1985，某私募MD，年薪500万+，有房贷", 40, 0, 1, 40)
+    assert high.run_ai and high.outcome == "uncertain"
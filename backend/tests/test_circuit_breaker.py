@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+
+from app.core.metrics import DEEPSEEK_CALLS
+from app.services import circuit_breaker as breaker_module
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.deepseek_service import DeepSeekService
+from app.services.llm_governor import LLMGovernor
+from app.services.risk_engine import RiskEngine
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _breaker(monkeypatch, **kwargs) -> tuple:
+    clock = _Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock.monotonic)
+    options = dict(failure_threshold=2, recovery_timeout=10, slow_call_threshold=1.0, name="test")
+    options.update(kwargs)
+    return CircuitBreaker(**options), clock
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, name="test")
+    breaker.record_failure()
+    return breaker
+
+
+def _service(handler, breaker: CircuitBreaker, **governor_options) -> DeepSeekService:
+    options = dict(rate=0, backoff_base=0, backoff_max=1)
+    options.update(governor_options)
+    return DeepSeekService(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        governor=LLMGovernor(**options),
+        breaker=breaker
+    )
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = _breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=1)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # 只放行一个探测请求
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_cancelled_probe_returns_slot(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=1)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.record_cancelled()
+    assert breaker.allow_request()
+
+
+def test_slow_call_counts_as_failure(monkeypatch):
+    breaker, _ = _breaker(monkeypatch, failure_threshold=1)
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+
+def test_queue_and_backoff_time_is_not_a_slow_call():
+    statuses = iter([503, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), json={"choices": [{"message": {"content": "ok"}}]})
+
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_threshold=0.05, name="test")
+    service = _service(handler, breaker, max_retries=1)
+    service.governor._backoff = lambda attempt: 0.1
+    content = asyncio.run(service._request_completion("prompt", 0.3))
+    assert content == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_open_breaker_returns_none_for_json_callers():
+    def handler(request):
+        raise AssertionError("熔断时不应发出请求")
+
+    service = _service(handler, _open_breaker())
+    rejected = DEEPSEEK_CALLS.value(outcome="circuit_open")
+    assert asyncio.run(service.generate_verification_tactic("AI风险分析", {"prompt": "p"}, expect_json=True)) is None
+    assert DEEPSEEK_CALLS.value(outcome="circuit_open") == rejected + 1
+    # 普通话术仍返回本地备用话术
+    assert "您有了解吗" in asyncio.run(service.generate_verification_tactic("职业模糊", {"影响行业": "金融"}))
+
+
+def test_engine_reports_open_breaker_without_parse_failure():
+    def handler(request):
+        raise AssertionError("熔断时不应发出请求")
+
+    engine = RiskEngine(deepseek_service=_service(handler, _open_breaker()))
+    parse_failures = DEEPSEEK_CALLS.value(outcome="json_parse_failure")
+    result = asyncio.run(engine._ai_risk_analysis("小国企负责人力工作", engine.snapshot))
+    assert result["ai_rules"] == []
+    assert "不可用" in result["risk_reasons"][0]
+    assert DEEPSEEK_CALLS.value(outcome="json_parse_failure") == parse_failures
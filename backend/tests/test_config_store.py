@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import config_management
+from app.services.config_store import ConfigStore, PreconditionFailed, etag_matches
+
+
+def _rules(*words):
+    return {"职业模糊": {"触发词": list(words), "风险值": 40}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "risk_rules.json").write_text(json.dumps(_rules("自由职业"), ensure_ascii=False), "utf-8")
+    (tmp_path / "weight_config.yaml").write_text("weights:\n  keyword: 1.0\n", "utf-8")
+    return ConfigStore(tmp_path)
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(config_management, "get_config_store", lambda: store)
+    monkeypatch.setattr(config_management, "reload_shared_risk_engine", lambda: None)
+    monkeypatch.setattr(config_management, "_rendered_configs", {})
+    app = FastAPI()
+    app.include_router(config_management.router, prefix="/api/v1")
+    return TestClient(app)
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    # 文件不存在时没有ETag，*也不匹配
+    assert not etag_matches("*", None)
+
+
+def test_missing_file_has_no_etag(store):
+    document = store.get("contradiction-rules")
+    assert document.data is None and document.etag is None
+
+
+def test_update_bumps_version_and_etag(store):
+    before = store.get("risk-rules")
+    document = asyncio.run(store.update("risk-rules", _rules("待业")))
+    assert document.version > before.version
+    assert document.etag != before.etag
+    assert store.get("risk-rules") == document
+    # 相同内容再次写入不产生新版本
+    again = asyncio.run(store.update("risk-rules", _rules("待业"), if_match=document.etag))
+    assert again.version == document.version and again.etag == document.etag
+
+
+def test_stale_if_match_rejected(store):
+    original = store.get("risk-rules")
+    updated = asyncio.run(store.update("risk-rules", _rules("待业"), if_match=original.etag))
+    with pytest.raises(PreconditionFailed) as excinfo:
+        asyncio.run(store.update("risk-rules", _rules("兼职"), if_match=original.etag))
+    assert excinfo.value.current_etag == updated.etag
+    assert store.get("risk-rules").data == _rules("待业")
+
+
+def test_external_write_reloaded(store, tmp_path):
+    before = store.get("risk-rules")
+    path = tmp_path / "risk_rules.json"
+    path.write_text(json.dumps(_rules("保密单位"), ensure_ascii=False), "utf-8")
+    os.utime(path, ns=(before.signature[0] + 10**9, before.signature[0] + 10**9))
+    assert store.refresh() == ["risk-rules"]
+    document = store.get("risk-rules")
+    assert document.data == _rules("保密单位")
+    assert document.version > before.version
+
+
+def test_wait_for_changes(store):
+    async def run():
+        since = store.version
+        assert await store.wait_for_changes(since, timeout=0.01) == []
+        waiter = asyncio.create_task(store.wait_for_changes(since, timeout=5))
+        await asyncio.sleep(0)
+        await store.update("weight-config", {"weights": {"keyword": 2.0}})
+        changes = await waiter
+        assert [change["name"] for change in changes] == ["weight-config"]
+        assert changes[0]["version"] == store.version
+
+    asyncio.run(run())
+
+
+def test_get_supports_if_none_match(client):
+    response = client.get("/api/v1/risk-rules")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.json()["data"]["rules"] == _rules("自由职业")
+
+    cached = client.get("/api/v1/risk-rules", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+
+def test_post_with_stale_if_match_conflicts(client):
+    etag = client.get("/api/v1/risk-rules").headers["ETag"]
+    first = client.post("/api/v1/risk-rules", json=_rules("待业"), headers={"If-Match": etag})
+    assert first.status_code == 200
+    new_etag = first.headers["ETag"]
+    assert new_etag != etag
+
+    # 基于旧版本的并发修改被拒绝，返回当前ETag供客户端刷新后重试
+    conflict = client.post("/api/v1/risk-rules", json=_rules("兼职"), headers={"If-Match": etag})
+    assert conflict.status_code == 412
+    assert conflict.headers["ETag"] == new_etag
+    assert client.get("/api/v1/risk-rules").json()["data"]["rules"] == _rules("待业")
+
+
+def test_config_changes_long_poll(client, store):
+    version = client.get("/api/v1/config-changes", params={"since": 0, "timeout": 0}).json()["version"]
+    assert client.get("/api/v1/config-changes", params={"since": version, "timeout": 0}).json()["changes"] == []
+    assert client.post("/api/v1/weight-config", json={"weights": {"keyword": 2.0}}).status_code == 200
+    changes = client.get("/api/v1/config-changes", params={"since": version, "timeout": 0}).json()["changes"]
+    assert [change["name"] for change in changes] == ["weight-config"]
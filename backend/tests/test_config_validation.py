@@ -0,0 +1,59 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.config_management import router
+from app.services.keyword_matcher import ContradictionMatcher, ContradictionRuleError
+from app.services.response_scorer import LexiconError, ResponseScorer
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("rules", [
+    {"婚姻状态矛盾": ["未婚", "离异"]},
+    {"婚姻状态矛盾": {"互斥词组": "未婚,离异"}},
+    {"婚姻状态矛盾": {"互斥词组": [["未婚"], [1]]}},
+    {"婚姻状态矛盾": {"互斥词组": [["未婚"], []]}},
+    {"婚姻状态矛盾": {"互斥词组": [["未婚"], ["离异"]], "风险值": "高"}},
+])
+def test_invalid_contradiction_rules(rules):
+    with pytest.raises(ContradictionRuleError):
+        ContradictionMatcher(rules)
+
+
+@pytest.mark.parametrize("lexicons", [
+    ["大概"],
+    {"fuzzy_evasion": ["大概"]},
+    {"fuzzy_evasion": {"words": "大概"}},
+    {"fuzzy_evasion": {"score": "25"}},
+    {"short_answer": {"max_length": -1}},
+])
+def test_invalid_response_lexicons(lexicons):
+    with pytest.raises(LexiconError):
+        ResponseScorer(lexicons)
+
+
+def test_valid_configs_compile():
+    matcher = ContradictionMatcher({"婚姻状态矛盾": {"互斥词组": [["未婚", ""], ["离异"]], "风险值": 15}})
+    assert matcher.scan("我未婚，之前离异")[0]["risk_value"] == 15
+    assert ResponseScorer({"fuzzy_evasion": {"words": ["大概"]}, "negative": None}).word_count > 0
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/api/v1/contradiction-rules", {"婚姻状态矛盾": {"互斥词组": [["未婚"]]}}),
+    ("/api/v1/weight-config", {"response_lexicons": {"topic_shift": {"words": [1, 2]}}}),
+    ("/api/v1/risk-rules", {"职业模糊": {"正则": "("}}),
+])
+def test_invalid_config_rejected_before_write(client, monkeypatch, path, payload):
+    def fail(*args, **kwargs):
+        raise AssertionError("校验失败的配置不应写入")
+
+    monkeypatch.setattr("app.api.config_management.get_config_store", fail)
+    response = client.post(path, json=payload)
+    assert response.status_code == 400
+    assert "格式错误" in response.json()["detail"]
@@ -0,0 +1,50 @@
+import asyncio
+import json
+from dataclasses import replace
+
+from app.services.risk_engine import RiskEngine
+from app.services.rule_compiler import CompiledRuleSet
+
+
+class _ReloadingService:
+    """模拟DeepSeek：等待期间触发一次配置重载"""
+    api_base = "http://llm"
+
+    def __init__(self):
+        self.engine = None
+        self.response_scorer = None
+
+    async def generate_verification_tactic(self, rule_name, knowledge_item, expect_json=False):
+        await asyncio.sleep(0)
+        previous = self.engine.snapshot
+        risk_rules = {name: {**config, "风险值": 99} for name, config in previous.risk_rules.items()}
+        self.engine._snapshot = replace(
+            previous,
+            version=previous.version + 1,
+            risk_rules=risk_rules,
+            rule_matcher=CompiledRuleSet(risk_rules),
+            weight_config={**previous.weight_config, "decision_engine": {"static_weight": 0, "dynamic_weight": 0}}
+        )
+        return json.dumps({
+            "risk_score": 1,
+            "risk_reasons": [],
+            "ai_rules": [{"rule_name": "职业模糊", "risk_value": 1, "matched_rule": "职业模糊"}],
+            "verification_suggestions": []
+        }, ensure_ascii=False)
+
+
+def test_scan_uses_one_snapshot_across_reload():
+    service = _ReloadingService()
+    engine = RiskEngine(deepseek_service=service)
+    engine.ai_precheck.saturation_score = 0
+    service.engine = engine
+    original = engine.snapshot
+    expected = original.risk_rules["职业模糊"]["风险值"]
+
+    result = asyncio.run(engine.static_risk_scan("在某公司上班"))
+    assert engine.snapshot.version == original.version + 1
+    assert result["ai_analysis"]["ai_rules"][0]["risk_value"] == expected
+    assert result["rules"][0]["risk_value"] == expected
+    # 决策同样使用分析开始时的快照
+    decision = engine.make_decision(result["score"], 0, original)
+    assert decision["static_weight"] == original.weight_config["decision_engine"]["static_weight"]
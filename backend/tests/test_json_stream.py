@@ -0,0 +1,51 @@
+import json
+
+from app.services.json_stream import JSONArrayStreamParser
+
+RESPONSE = "```json\n" + json.dumps({
+    "summary": "说明里有 { 和 ] 以及 \"tactics\": [",
+    "meta": {"tactics": [{"rule_name": "嵌套"}]},
+    "tactics": [
+        {"rule_name": "职业模糊", "tactic": "您在\"某公司\"做什么？{笑}"},
+        {"rule_name": "收入模糊", "tactic": "收入\\稳定吗]"}
+    ],
+    "after": [{"rule_name": "之后"}]
+}, ensure_ascii=False) + "\n```"
+
+
+def _feed_all(parser: JSONArrayStreamParser, chunks) -> list:
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+def test_items_from_target_array_only():
+    items = _feed_all(JSONArrayStreamParser("tactics"), [RESPONSE])
+    assert [item["rule_name"] for item in items] == ["职业模糊", "收入模糊"]
+    assert items[0]["tactic"] == "您在\"某公司\"做什么？{笑}"
+
+
+def test_result_independent_of_chunking():
+    expected = _feed_all(JSONArrayStreamParser("tactics"), [RESPONSE])
+    for size in (1, 2, 7):
+        parser = JSONArrayStreamParser("tactics")
+        chunks = [RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)]
+        assert _feed_all(parser, chunks) == expected
+        assert parser.finished and parser.emitted == 2
+        assert parser.text == RESPONSE
+
+
+def test_element_emitted_as_soon_as_it_closes():
+    parser = JSONArrayStreamParser("tactics")
+    assert parser.feed('{"tactics": [{"rule_name": "a"}, {"rule_na') == [{"rule_name": "a"}]
+    assert parser.feed('me": "b"}') == [{"rule_name": "b"}]
+    assert not parser.finished
+    assert parser.feed("]}") == []
+    assert parser.finished
+    assert parser.feed('{"tactics": [{"x": 1}]}') == []
+
+
+def test_scalar_and_malformed_elements_are_skipped():
+    parser = JSONArrayStreamParser("tactics")
+    assert parser.feed('{"tactics": [1, "text", {"a": 1,}, [2], {"b": 2}]}') == [[2], {"b": 2}]
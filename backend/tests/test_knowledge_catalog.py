@@ -0,0 +1,10 @@
+from app.services.knowledge_catalog import describe_csv
+
+
+def test_describe_csv_strips_bom(tmp_path):
+    csv_file = tmp_path / "policies.csv"
+    csv_file.write_bytes("影响行业,政策名称\n金融,资管新规\n\n医疗,集采\n".encode("utf-8-sig"))
+    description = describe_csv(csv_file, preview_rows=1)
+    assert description["columns"] == ["影响行业", "政策名称"]
+    assert description["rows"] == 2
+    assert description["preview"] == [{"影响行业": "金融", "政策名称": "资管新规"}]
@@ -0,0 +1,37 @@
+from app.services.knowledge_store import KnowledgeTable, load_knowledge_table
+
+CSV = "影响行业,政策名称,关键条款\n金融,资管新规,打破刚兑\n医疗,集采,药价下降\n金融,理财新规, 净值化 \n坏行\n"
+
+
+def test_from_csv_strips_bom(tmp_path):
+    csv_file = tmp_path / "policies.csv"
+    # Excel导出的CSV带BOM
+    csv_file.write_bytes(CSV.encode("utf-8-sig"))
+    table = KnowledgeTable.from_csv(csv_file)
+    assert table.columns == ["影响行业", "政策名称", "关键条款"]
+    assert list(table.column("影响行业")) == ["金融", "医疗", "金融"]
+    assert table.row(2) == {"影响行业": "金融", "政策名称": "理财新规", "关键条款": "净值化"}
+
+
+def test_from_csv_reports_skipped_rows(tmp_path, capsys):
+    csv_file = tmp_path / "policies.csv"
+    csv_file.write_text(CSV + "\n医疗,集采\n", encoding="utf-8")
+    table = KnowledgeTable.from_csv(csv_file)
+    assert len(table) == 3
+    # 空行不算，列数不符的两行计入并告警
+    assert table.skipped_rows == 2
+    assert "有2行列数与表头不符，已跳过（第5、7行）" in capsys.readouterr().out
+
+
+def test_mmap_round_trip(tmp_path):
+    csv_file = tmp_path / "policies.csv"
+    csv_file.write_text(CSV, encoding="utf-8")
+    mmap_dir = tmp_path / "mmap"
+    mmap_dir.mkdir()
+    table = load_knowledge_table(csv_file, mmap_dir)
+    assert table.mmapped
+    reopened = load_knowledge_table(csv_file, mmap_dir)
+    assert [reopened.row(i) for i in range(len(reopened))] == [table.row(i) for i in range(len(table))]
+    assert reopened.skipped_rows == table.skipped_rows == 1
+    # 相同字符串只保存一份
+    assert table.string_count < len(table) * len(table.columns)
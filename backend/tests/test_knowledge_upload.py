@@ -0,0 +1,57 @@
+import pytest
+
+from app.services.knowledge_upload import CSVValidationError, StreamingCSVValidator
+
+CSV = (
+    "城市,行业,政策\n"
+    "上海,金融,\"资管新规,\n第二版\"\n"
+    "\n"
+    "北京,互联网,数据安全法\n"
+).encode("utf-8")
+
+
+def _validate(content: bytes, chunk_size: int) -> StreamingCSVValidator:
+    validator = StreamingCSVValidator(preview_rows=1)
+    for start in range(0, len(content), chunk_size):
+        validator.feed(content[start:start + chunk_size])
+    validator.finish()
+    return validator
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_result_independent_of_chunking(chunk_size):
+    # 块边界可能落在多字节字符、引号内换行和行尾之间
+    validator = _validate(CSV, chunk_size)
+    assert validator.columns == ["城市", "行业", "政策"]
+    assert validator.rows == 2
+    assert validator.preview == [{"城市": "上海", "行业": "金融", "政策": "资管新规,\n第二版"}]
+    table = validator.build_table()
+    assert len(table) == 2
+    assert table.value(1, "政策") == "数据安全法"
+
+
+def test_bom_and_crlf():
+    validator = _validate(b"\xef\xbb\xbf" + CSV.replace(b"\n", b"\r\n"), 5)
+    assert validator.columns == ["城市", "行业", "政策"]
+    assert validator.build_table().row(0)["城市"] == "上海"
+
+
+@pytest.mark.parametrize("content, line, message", [
+    ("城市,行业\n上海,金融\n北京\n", 3, "有1列"),
+    ("城市,\n上海,金融\n", 1, "空列名"),
+    ("城市,城市\n上海,金融\n", 1, "重复列名"),
+    ("城市,行业\n上海,\"金融\n", 2, "引号未闭合"),
+    ("\n\n", 0, "缺少表头"),
+])
+def test_invalid_csv(content, line, message):
+    with pytest.raises(CSVValidationError) as excinfo:
+        _validate(content.encode("utf-8"), 4)
+    assert excinfo.value.line == line
+    assert message in str(excinfo.value)
+
+
+def test_non_utf8_rejected_while_streaming():
+    validator = StreamingCSVValidator()
+    validator.feed("城市,行业\n".encode("utf-8"))
+    with pytest.raises(CSVValidationError, match="UTF-8"):
+        validator.feed("上海,金融\n".encode("gbk"))
@@ -0,0 +1,116 @@
+import asyncio
+
+from app.services import llm_cache as cache_module
+from app.services.deadline import set_deadline
+from app.services.llm_cache import LLMCache, make_cache_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class _Upstream:
+    """模拟LLM调用：按顺序返回预设结果，可设置延迟"""
+
+    def __init__(self, *values, delay: float = 0.05):
+        self.values = list(values)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.values.pop(0)
+        await asyncio.sleep(self.delay)
+        return value
+
+
+def test_cache_key_ignores_whitespace():
+    assert make_cache_key("m", 0.3, "a  b\n c") == make_cache_key("m", 0.3, " a b c ")
+    assert make_cache_key("m", 0.3, "a b") != make_cache_key("m", 0.7, "a b")
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock.monotonic)
+    cache = LLMCache(max_entries=2, ttl=10)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    # a刚被访问过，淘汰最久未使用的b
+    assert cache.get("b") is None and cache.evictions == 1
+    clock.now += 11
+    assert cache.get("a") is None and cache.expirations == 1
+
+
+def test_concurrent_requests_share_one_call():
+    async def run():
+        cache = LLMCache()
+        upstream = _Upstream("结果")
+        values = await asyncio.gather(*(cache.get_or_call("k", upstream) for _ in range(5)))
+        assert values == ["结果"] * 5
+        assert upstream.calls == 1
+        assert cache.coalesced == 4
+        assert await cache.get_or_call("k", upstream) == "结果"
+        assert cache.hits == 1
+
+    asyncio.run(run())
+
+
+def test_uncacheable_and_failed_results_are_not_stored():
+    async def run():
+        cache = LLMCache()
+        assert await cache.get_or_call("k", _Upstream(None, delay=0)) is None
+        assert await cache.get_or_call("k", _Upstream("不是JSON", delay=0), cacheable=lambda v: v.startswith("{")) == "不是JSON"
+        assert cache.get("k") is None
+
+    asyncio.run(run())
+
+
+def test_waiter_retries_when_leader_is_cancelled():
+    async def run():
+        cache = LLMCache()
+        upstream = _Upstream("领头结果", "等待方结果")
+        leader = asyncio.create_task(cache.get_or_call("k", upstream))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_call("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await waiter == "等待方结果"
+        assert upstream.calls == 2
+
+    asyncio.run(run())
+
+
+def test_waiter_retries_when_leader_gets_no_result():
+    async def run():
+        cache = LLMCache()
+        upstream = _Upstream(None, "结果")
+        values = await asyncio.gather(cache.get_or_call("k", upstream), cache.get_or_call("k", upstream))
+        assert values == [None, "结果"]
+        assert cache.get("k") == "结果"
+
+    asyncio.run(run())
+
+
+def test_waiter_stops_waiting_at_its_own_deadline():
+    async def run():
+        cache = LLMCache()
+        leader = asyncio.create_task(cache.get_or_call("k", _Upstream("慢结果", delay=1.0)))
+        await asyncio.sleep(0)
+
+        async def waiter():
+            set_deadline(50)
+            return await cache.get_or_call("k", _Upstream(None, delay=0))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await asyncio.create_task(waiter()) is None
+        assert loop.time() - started < 0.5
+        leader.cancel()
+
+    asyncio.run(run())
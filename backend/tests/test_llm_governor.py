@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+
+from app.services.llm_governor import LLMGovernor, parse_retry_after
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, chunks, closed):
+        self._chunks = chunks
+        self._closed = closed
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def aclose(self):
+        self._closed.append(True)
+
+
+def _governor(**kwargs) -> LLMGovernor:
+    options = dict(rate=0, initial_concurrency=4, min_concurrency=1, max_concurrency=4, backoff_base=0, backoff_max=1)
+    options.update(kwargs)
+    return LLMGovernor(**options)
+
+
+def _client(statuses, closed):
+    calls = iter(statuses)
+
+    def handler(request):
+        return httpx.Response(next(calls), stream=_TrackedStream([b"data: x\n\n"], closed))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _open(client):
+    return lambda: client.send(client.build_request("POST", "http://llm/v1/chat/completions"), stream=True)
+
+
+def test_retried_responses_are_closed():
+    async def run():
+        closed = []
+        governor = _governor(max_retries=2)
+        async with _client([503, 429, 200], closed) as client:
+            governed = await governor.call(_open(client))
+            assert governed.response.status_code == 200
+            # 两次被丢弃的响应在重试前已关闭
+            assert len(closed) == 2
+            await governed.response.aclose()
+        assert governor.limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_stream_holds_slot_until_closed():
+    async def run():
+        governor = _governor(max_retries=0)
+        async with _client([200], []) as client:
+            governed = await governor.open_stream(_open(client))
+            assert governor.limiter.in_flight == 1
+            await asyncio.sleep(0.05)
+            body = await governed.response.aread()
+            assert body == b"data: x\n\n"
+            await governed.aclose()
+            assert governor.limiter.in_flight == 0
+            # 耗时包含读取响应体的时间，关闭后固定
+            assert governed.duration >= 0.05
+            duration = governed.duration
+            await governed.aclose()
+            assert governed.duration == duration and governor.limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_call_duration_excludes_backoff():
+    async def run():
+        governor = _governor(max_retries=1, backoff_base=0.1)
+        governor._backoff = lambda attempt: 0.1
+        async with _client([503, 200], []) as client:
+            governed = await governor.call(_open(client))
+            await governed.response.aclose()
+        assert governed.response.status_code == 200
+        assert governed.duration < 0.1
+
+    asyncio.run(run())
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
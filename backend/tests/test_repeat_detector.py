@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from app.services.repeat_detector import find_repeated_substrings
+
+
+def _occurrences(text: str, fragment: str) -> int:
+    return sum(text.startswith(fragment, i) for i in range(len(text)))
+
+
+def test_finds_planted_fragment():
+    text = "今天天气不错，" + "我是独生子家里条件很好，".join(["工作稳定", "喜欢跑步", "本科毕业", "有一套房", "偶尔旅游"])
+    repeats = find_repeated_substrings(text, min_length=3, min_count=4)
+    assert repeats[0].text == "我是独生子家里条件很好"
+    assert repeats[0].count == 4
+    assert repeats[0].offset == text.find("我是独生子家里条件很好")
+
+
+def test_short_or_rare_text_has_no_repeats():
+    assert find_repeated_substrings("") == []
+    assert find_repeated_substrings("我在北京工作") == []
+    assert find_repeated_substrings("我在北京工作，" * 3, min_count=4) == []
+
+
+def test_punctuation_is_trimmed_and_ignored():
+    assert find_repeated_substrings("，。！" * 50) == []
+    repeats = find_repeated_substrings("，我在北京，" * 10)
+    assert repeats[0].text.startswith("我在北京") and repeats[0].text.endswith("我在北京")
+
+
+def test_periodic_text_is_capped_and_deduplicated():
+    text = "我在北京工作，" * 2000
+    repeats = find_repeated_substrings(text, max_fragment_chars=50)
+    assert len(repeats) == 1
+    assert len(repeats[0].text) <= 50
+    assert repeats[0].count == _occurrences(text, repeats[0].text)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_counts_and_offsets_match_brute_force(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("甲乙，丙") for _ in range(rng.randint(0, 80)))
+    for item in find_repeated_substrings(text, min_length=2, min_count=2, max_results=50, max_fragment_chars=8):
+        assert len(item.text) <= 8
+        assert item.text[0].isalnum() and item.text[-1].isalnum()
+        assert item.count == _occurrences(text, item.text)
+        assert item.offset == text.find(item.text)
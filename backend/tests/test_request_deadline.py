@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.risk_analysis import apply_request_deadline
+from app.core.config import settings
+from app.services.deadline import remaining
+
+
+def _budget(header=None, query=None):
+    """执行依赖后返回设置的剩余预算（秒），未设置时为None"""
+    async def run():
+        await apply_request_deadline(x_request_deadline_ms=header, deadline_ms=query)
+        return remaining()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def default_budget(monkeypatch):
+    monkeypatch.setattr(settings, "request_deadline_default_ms", 5000)
+
+
+def test_query_overrides_header_and_default(default_budget):
+    assert 1.5 < _budget(header=8000, query=2000) <= 2.0
+    assert 7.5 < _budget(header=8000) <= 8.0
+    assert 4.5 < _budget() <= 5.0
+
+
+def test_explicit_zero_disables_deadline(default_budget):
+    assert _budget(query=0) is None
+    assert _budget(header=0) is None
+    assert _budget(header=8000, query=0) is None
+
+
+@pytest.mark.parametrize("header, query", [(-1, None), (None, -1), (-1, 2000), (2000, -1)])
+def test_negative_budget_rejected(header, query):
+    with pytest.raises(HTTPException) as excinfo:
+        _budget(header=header, query=query)
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from app.services.response_scorer import DEFAULT_RESPONSE_LEXICONS, ResponseScorer
+
+FILLERS = ["我在一家公司上班", "收入还行", "家里人都挺好的", "有房有车", "年薪三十万左右", "嗯", ""]
+
+# 重叠词、同一个词属于多个维度
+CUSTOM_LEXICONS = {
+    "fuzzy_evasion": {"score": 10, "words": ["不清楚", "清楚", "大概", "大概吧"]},
+    "emotional_attack": {"score": 35, "words": ["隐私", "大概"]},
+    "topic_shift": {"score": 5, "words": ["换个话题", "话题"]},
+    "negative": {"score": 7, "words": ["不", "没"]},
+    "short_answer": {"max_length": 3, "score": 11},
+}
+
+
+def legacy_score(response_text: str, lexicons=DEFAULT_RESPONSE_LEXICONS) -> dict:
+    """原降级实现：每个词表逐词做子串查找"""
+    scores = {name: lexicons[name]["score"] for name in ("fuzzy_evasion", "emotional_attack", "topic_shift")}
+    fuzzy_score, attack_score, topic_shift_score = (
+        sum(scores[name] for word in set(lexicons[name]["words"]) if word in response_text)
+        for name in ("fuzzy_evasion", "emotional_attack", "topic_shift")
+    )
+    if len(response_text.strip()) < lexicons["short_answer"]["max_length"]:
+        fuzzy_score += lexicons["short_answer"]["score"]
+    if any(word in response_text for word in lexicons["negative"]["words"]):
+        fuzzy_score += lexicons["negative"]["score"]
+    total_risk = fuzzy_score + attack_score + topic_shift_score
+    precise_score = max(0, 100 - total_risk)
+    risk_tags = []
+    if fuzzy_score > 0:
+        risk_tags.append("模糊回避")
+    if attack_score > 0:
+        risk_tags.append("情绪攻击")
+    if topic_shift_score > 0:
+        risk_tags.append("话题转移")
+    if precise_score < 50:
+        risk_tags.append("信息不足")
+    return {
+        "fuzzy_evasion": min(fuzzy_score, 100),
+        "emotional_attack": min(attack_score, 100),
+        "topic_shift": min(topic_shift_score, 100),
+        "precise_answer": precise_score,
+        "risk_tags": risk_tags,
+        "overall_risk_score": min(total_risk, 100)
+    }
+
+
+def _responses(lexicons, count: int = 500):
+    rng = random.Random(20)
+    words = [word for lexicon in lexicons.values() for word in lexicon.get("words", [])]
+    responses = []
+    for _ in range(count):
+        parts = rng.sample(FILLERS, rng.randint(0, 2)) + rng.sample(words, rng.randint(0, 4))
+        rng.shuffle(parts)
+        responses.append(rng.choice(["", "，", " "]).join(parts))
+    return responses
+
+
+@pytest.mark.parametrize("lexicons", [DEFAULT_RESPONSE_LEXICONS, CUSTOM_LEXICONS])
+def test_matches_legacy_scorer(lexicons):
+    scorer = ResponseScorer(lexicons)
+    responses = _responses(lexicons)
+    expected = [legacy_score(text, lexicons) for text in responses]
+    assert [scorer.score(text) for text in responses] == expected
+    assert scorer.score_batch(responses) == expected
+
+
+def test_separator_in_response_does_not_shift_batch():
+    scorer = ResponseScorer()
+    responses = ["不清楚\x00换个话题", "收入还行，年薪三十万左右", "\x00", "隐私"]
+    assert scorer.score_batch(responses) == [legacy_score(text) for text in responses]
+
+
+def test_results_are_independent_copies():
+    scorer = ResponseScorer()
+    first, second = scorer.score_batch(["这是我的隐私", "这是我的隐私"])
+    first["risk_tags"].append("已修改")
+    assert second["risk_tags"] == ["情绪攻击"]
+    assert scorer.score("这是我的隐私")["risk_tags"] == ["情绪攻击"]
+
+
+def test_empty_batch():
+    assert ResponseScorer().score_batch([]) == []
@@ -0,0 +1,103 @@
+import pytest
+
+from app.services.rule_compiler import CompiledRuleSet, RuleSyntaxError
+
+
+def _names(rules: dict, text: str) -> list:
+    return [result["rule_name"] for result in CompiledRuleSet(rules).scan(text)]
+
+
+def test_legacy_keyword_rules_keep_config_order_and_offsets():
+    rules = {
+        "职业模糊": {"触发词": ["某公司", "知名企业"], "风险值": 40},
+        "收入模糊": {"触发词": ["年薪", "收入"], "风险值": 35},
+    }
+    results = CompiledRuleSet(rules).scan("年薪不错，在某公司和某公司上班")
+    assert [r["rule_name"] for r in results] == ["职业模糊", "收入模糊"]
+    assert results[0]["keywords"] == ["某公司"]
+    assert results[0]["keyword_offsets"] == {"某公司": [6, 10]}
+    assert "matched_conditions" not in results[0]
+
+
+def test_regex_condition():
+    rules = {"高收入": {"正则": [r"年薪\d+万"], "风险值": 10}}
+    result = CompiledRuleSet(rules).scan("我年薪80万")[0]
+    assert result["keywords"] == ["年薪80万"]
+    assert result["matched_conditions"][0] == {"type": "regex", "pattern": r"年薪\d+万", "text": "年薪80万", "offset": 1}
+    assert _names(rules, "年薪很高") == []
+
+
+def test_exclusion_suppresses_rule():
+    rules = {"职业模糊": {"触发词": ["某公司"], "排除词": ["上市公司"], "风险值": 40}}
+    assert _names(rules, "在某公司上班") == ["职业模糊"]
+    assert _names(rules, "在某公司上班，是一家上市公司") == []
+
+
+def test_unordered_proximity_window():
+    rules = {"高管": {"共现": [{"词": ["某公司", "高管"], "窗口": 5}], "风险值": 20}}
+    assert _names(rules, "高管，在某公司") == ["高管"]
+    assert _names(rules, "某公司" + "，" * 10 + "高管") == []
+
+
+def test_ordered_proximity():
+    rules = {"高管": {"共现": [{"词": ["某公司", "高管"], "窗口": 5, "有序": True}], "风险值": 20}}
+    assert _names(rules, "在某公司当高管") == ["高管"]
+    assert _names(rules, "高管，在某公司") == []
+
+
+@pytest.mark.parametrize("text, triggered", [
+    ("年薪150万", True),
+    ("年薪 1,200,000", True),
+    ("年薪1.5百万", True),
+    ("年薪80万", False),
+    ("年薪，说起来话长，去年才100万", False),
+])
+def test_numeric_condition_with_units(text, triggered):
+    rules = {"高收入": {"数值": [{"前缀词": "年薪", "窗口": 3, "比较": ">=", "值": 100, "单位": "万"}], "风险值": 10}}
+    assert (_names(rules, text) == ["高收入"]) is triggered
+
+
+def test_match_all_requires_every_condition():
+    rules = {
+        "收入夸大": {
+            "触发词": ["某公司"],
+            "数值": [{"前缀词": "月薪", "比较": ">", "值": 5, "单位": "万"}],
+            "匹配方式": "全部",
+            "风险值": 30
+        }
+    }
+    assert _names(rules, "在某公司，月薪10万") == ["收入夸大"]
+    assert _names(rules, "在某公司，月薪2万") == []
+    assert _names(rules, "月薪10万") == []
+
+
+@pytest.mark.parametrize("config, message", [
+    ([], "规则配置必须是对象"),
+    ({"风险值": "高"}, "风险值必须是数字"),
+    ({"正则": ["("]}, "正则"),
+    ({"共现": [{"词": ["某公司"]}]}, "至少需要两个词"),
+    ({"共现": [{"词": ["a", "b"], "窗口": -1}]}, "窗口"),
+    ({"数值": [{"值": 1}]}, "前缀词"),
+    ({"数值": [{"前缀词": "年薪", "比较": "~", "值": 1}]}, "比较符"),
+    ({"数值": [{"前缀词": "年薪", "值": 1, "单位": "元"}]}, "单位"),
+    ({"触发词": ["a"], "匹配方式": "大部分"}, "匹配方式"),
+])
+def test_syntax_errors(config, message):
+    with pytest.raises(RuleSyntaxError, match=message) as info:
+        CompiledRuleSet({"坏规则": config})
+    assert info.value.rule_name == "坏规则"
+
+
+def test_costs_track_scans_and_evaluations():
+    rule_set = CompiledRuleSet({
+        "职业模糊": {"触发词": ["某公司"], "风险值": 40},
+        "收入模糊": {"触发词": ["年薪"], "风险值": 35},
+    })
+    rule_set.scan("在某公司上班")
+    rule_set.scan("没有命中")
+    costs = rule_set.costs()
+    assert costs["scan"]["scans"] == 2
+    assert costs["scan"]["literals"] == 2
+    # 只有命中字面量的规则才会被求值
+    assert [rule["evaluations"] for rule in costs["rules"]] == [1, 0]
+    assert costs["rules"][1]["avg_us"] == 0.0
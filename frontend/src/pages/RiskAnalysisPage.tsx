@@ -42,6 +42,8 @@ const RiskAnalysisPage: React.FC = () => {
   const [loading, setLoading] = useState(false)
   const [stepLoading, setStepLoading] = useState(false)
   const [step, setStep] = useState<'input' | 'tactics' | 'response' | 'result'>('input')
+  // 流式生成话术时已收到的话术条数，显示在加载动画中
+  const [streamedTactics, setStreamedTactics] = useState(0)
 
   // 使用useRef追踪stepLoading状态变化，避免闭包问题
   const stepLoadingRef = useRef(stepLoading)
@@ -174,29 +176,35 @@ const RiskAnalysisPage: React.FC = () => {
     console.log('📊 设置stepLoading为true，立即显示加载动画')
 
     setLoading(true)
+    setStreamedTactics(0)
     const startTime = Date.now()
 
     try {
-      console.log('📤 准备调用 generateTactics API')
+      console.log('📤 准备调用 generateTacticsStream API')
       console.log('📝 输入文本:', inputText)
 
       console.log('⏰ API调用开始时间:', new Date(startTime).toISOString())
 
-      const response = await riskAnalysisAPI.generateTactics(
+      // 流式生成：每收到一条话术就更新进度，结束后得到与非流式接口相同的结果
+      const result = await riskAnalysisAPI.generateTacticsStream(
         inputText,
         riskResult.rules,
-        riskResult.ai_analysis
+        riskResult.ai_analysis,
+        (tactic) => {
+          console.log('📝 收到话术:', tactic)
+          setStreamedTactics((count) => count + 1)
+        }
       )
 
       const endTime = Date.now()
       const duration = endTime - startTime
       console.log('⏰ API调用完成时间:', new Date(endTime).toISOString())
       console.log('⏱️ API调用耗时:', duration, 'ms')
-      console.log('✅ API调用成功:', response)
+      console.log('✅ API调用成功:', result)
 
-      if (response && (response as any).success) {
+      if (result) {
         console.log('🎉 话术生成成功，更新风险结果')
-        setRiskResult((response as any).data)
+        setRiskResult(result)
         // 显示Toast，然后延迟跳转
         console.log('🍞 显示Toast消息')
         Toast.show('话术生成完成')
@@ -212,9 +220,9 @@ const RiskAnalysisPage: React.FC = () => {
             console.log('📊 跳转后关闭加载动画')
           }, 100)
         }, 1000)
-        console.log('📋 更新后的风险结果:', (response as any).data)
+        console.log('📋 更新后的风险结果:', result)
       } else {
-        console.log('❌ API返回失败:', response)
+        console.log('❌ 流式响应未返回结果')
         Toast.show('话术生成失败，请重试')
       }
     } catch (error: any) {
@@ -237,6 +245,7 @@ const RiskAnalysisPage: React.FC = () => {
       }
     } finally {
       setLoading(false)
+      setStreamedTactics(0)
       console.log('🏁 话术生成流程结束')
     }
   }
@@ -423,7 +432,7 @@ const RiskAnalysisPage: React.FC = () => {
             <div style={{
               fontSize: '14px',
               color: '#666'
-            }}>请稍候，系统正在处理...</div>
+            }}>{streamedTactics > 0 ? `已生成 ${streamedTactics} 条验证话术...` : '请稍候，系统正在处理...'}</div>
           </div>
         </div>
       )}
@@ -51,6 +51,44 @@ api.interceptors.response.use(
   }
 )
 
+// 读取POST接口返回的SSE流（EventSource不支持POST），逐个事件回调
+const readServerSentEvents = async (
+  path: string,
+  body: any,
+  onEvent: (event: string, data: any) => void
+): Promise<void> => {
+  const response = await fetch(`${api.defaults.baseURL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(body),
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`流式请求失败: ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary = buffer.indexOf('\n\n')
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let event = 'message'
+      let data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) data += line.slice(5).trim()
+      }
+      onEvent(event, data ? JSON.parse(data) : null)
+      boundary = buffer.indexOf('\n\n')
+    }
+  }
+}
+
 // 风控分析API
 export const riskAnalysisAPI = {
   // 静态风险扫描
@@ -71,6 +109,25 @@ export const riskAnalysisAPI = {
     })
   },
 
+  // 完整风控分析（流式）：每个阶段完成即回调，resolve最终结果
+  fullAnalysisStream: async (
+    inputText: string,
+    userResponse: string | undefined,
+    onEvent: (event: string, data: any) => void
+  ): Promise<any> => {
+    let result: any = null
+    await readServerSentEvents(
+      '/full-analysis/stream',
+      { input_text: inputText, user_response: userResponse },
+      (event, data) => {
+        if (event === 'error') throw new Error(data?.detail || '完整分析失败')
+        if (event === 'result') result = data
+        onEvent(event, data)
+      }
+    )
+    return result
+  },
+
   // 生成验证话术
   generateTactics: async (inputText: string, rules: any[], aiAnalysis: any): Promise<APIResponse<any>> => {
     return api.post('/generate-tactics', {
@@ -80,6 +137,26 @@ export const riskAnalysisAPI = {
     })
   },
 
+  // 生成验证话术（流式）：每生成一条话术即回调，resolve最终结果
+  generateTacticsStream: async (
+    inputText: string,
+    rules: any[],
+    aiAnalysis: any,
+    onTactic: (tactic: any) => void
+  ): Promise<any> => {
+    let result: any = null
+    await readServerSentEvents(
+      '/generate-tactics/stream',
+      { input_text: inputText, rules: rules, ai_analysis: aiAnalysis },
+      (event, data) => {
+        if (event === 'error') throw new Error(data?.detail || '话术生成失败')
+        if (event === 'tactic') onTactic(data)
+        if (event === 'result') result = data
+      }
+    )
+    return result
+  },
+
   // 综合风控分析（复用前两步结果）
   comprehensiveAnalysis: async (staticResult: any, verificationTactics: any[], userResponse: string): Promise<APIResponse<any>> => {
     return api.post('/comprehensive-analysis', {